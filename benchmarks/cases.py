@@ -0,0 +1,198 @@
+"""
+This module gathers the synthetic data and the benchmark cases of the benchmark suite.
+
+A case is a function case(params) that prepares everything it needs and returns a function without arguments that
+runs the measured operation once. The preparation is not measured.
+"""
+
+import inspect
+import itertools
+
+import matplotlib
+
+# the visualization cases call plt.show, which must not block
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import som.quality.quantization  # noqa: E402
+import som.quality.topology  # noqa: E402
+import som.visualization.density  # noqa: E402
+import som.visualization.quality.quantization  # noqa: E402
+import som.visualization.quality.topology  # noqa: E402
+from som.maps import StandardSOM  # noqa: E402
+
+
+def make_data(rows, features, dtype="float64", clusters=8, random_seed=0):
+    """
+    Generate a synthetic data set of gaussian clusters.
+
+    Parameters
+    ----------
+    rows: int
+        The number of data points.
+    features: int
+        The number of features.
+    dtype: str, default = "float64"
+        The type of the features.
+    clusters: int, default = 8
+        The number of clusters.
+    random_seed: int, default = 0
+        The random seed.
+
+    Returns
+    -------
+    data: DataFrame of shape (rows, features)
+        The data.
+    """
+    rng = np.random.default_rng(random_seed)
+    centers = rng.uniform(-10, 10, size=(clusters, features))
+    points = centers[rng.integers(clusters, size=rows)] + rng.normal(size=(rows, features))
+    return pd.DataFrame(points.astype(dtype), columns=["x" + str(i) for i in range(features)])
+
+
+def trained_som(params):
+    """
+    Train a SOM for the cases that need one.
+
+    Parameters
+    ----------
+    params: dict
+        The parameters of the case.
+
+    Returns
+    -------
+    som: StandardSOM
+        The trained SOM.
+    data: DataFrame
+        The training data.
+    """
+    data = make_data(params["rows"], params["features"], params["dtype"])
+    som = StandardSOM(tuple(params["map_size"]), max(params["map_size"]) / 4, params["topology"])
+    som.train(data, iterations=params.get("iterations", 1000))
+    return som, data
+
+
+def train_case(params):
+    """
+    Train a SOM from scratch (StandardSOM.train).
+    """
+    data = make_data(params["rows"], params["features"], params["dtype"])
+    som = StandardSOM(tuple(params["map_size"]), max(params["map_size"]) / 4, params["topology"])
+    return lambda: som.train(data, iterations=params["iterations"])
+
+
+def find_bmu_case(params):
+    """
+    Find the BMUs of the training data with a trained SOM.
+    """
+    som, data = trained_som(params)
+    # the BMU search of the training (StandardSOM.__find_bmu)
+    return lambda: som._complete_training(data)
+
+
+def get_first_bmus_case(params):
+    """
+    Get the first BMUs of a trained SOM.
+    """
+    som, _ = trained_som(params)
+    return som.get_first_bmus
+
+
+def function_case(function):
+    """
+    Build a case for a function of a trained SOM, e.g. a quality measure or a visualization.
+
+    Parameters
+    ----------
+    function: function(som)
+        The function.
+
+    Returns
+    -------
+    case: function(params)
+        The case.
+    """
+    def case(params):
+        som, _ = trained_som(params)
+
+        def run():
+            function(som)
+            # close the figures of visualizations
+            plt.close("all")
+        return run
+    return case
+
+
+def _som_functions(module):
+    """
+    Get the public functions of a module that only need a trained SOM.
+
+    Parameters
+    ----------
+    module: module
+        The module.
+
+    Returns
+    -------
+    functions: list of (str, function)
+        The qualified names and the functions.
+    """
+    functions = []
+    for name in module.__all__:
+        function = getattr(module, name)
+        required = [parameter for parameter in inspect.signature(function).parameters.values()
+                    if parameter.default is inspect.Parameter.empty]
+        if len(required) == 1:
+            functions.append((module.__name__ + "." + name, function))
+    return functions
+
+
+def cases():
+    """
+    Get all benchmark cases.
+
+    Every public function of the quality and visualization modules that only needs a trained SOM is benchmarked
+    automatically.
+
+    Returns
+    -------
+    cases: dict
+        The cases by name.
+    """
+    all_cases = {"StandardSOM.train": train_case, "StandardSOM.__find_bmu": find_bmu_case,
+                 "StandardSOM.get_first_bmus": get_first_bmus_case}
+    for module in [som.quality.quantization, som.quality.topology, som.visualization.density,
+                   som.visualization.quality.quantization, som.visualization.quality.topology]:
+        for name, function in _som_functions(module):
+            all_cases[name] = function_case(function)
+    return all_cases
+
+
+# parameter grids of the suites, every combination is run for every case
+SUITES = {
+    "quick": {"map_size": [(10, 10)], "topology": ["rectangular", "hexagonal"], "features": [4], "rows": [2000],
+              "dtype": ["float64"], "iterations": [2000]},
+    "full": {"map_size": [(10, 10), (30, 30), (60, 60)], "topology": ["rectangular", "hexagonal"],
+             "features": [4, 64], "rows": [10000, 100000], "dtype": ["float32", "float64"], "iterations": [10000]},
+}
+
+
+def grid(suite):
+    """
+    Expand the parameter grid of a suite.
+
+    Parameters
+    ----------
+    suite: str
+        The name of the suite.
+
+    Returns
+    -------
+    params: list of dict
+        Every combination of the parameters.
+    """
+    names = sorted(SUITES[suite])
+    return [dict(zip(names, values)) for values in itertools.product(*[SUITES[suite][name] for name in names])]
@@ -0,0 +1,237 @@
+"""
+Benchmark suite of the som package.
+
+Run the benchmarks and write the results to a JSON file:
+
+    python benchmarks/run.py run --suite quick --output results.json
+
+Compare two result files and fail if a case got slower or needs more memory, by the tracemalloc peak or by the
+growth of the RSS during the case:
+
+    python benchmarks/run.py compare base.json results.json --threshold 0.1
+
+Every case runs in a fresh process, so the peak resident set size (RSS) of the process is the one of the case. The
+wall time is measured over several repetitions, the allocations with tracemalloc in one additional repetition.
+"""
+
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+from cases import cases, grid  # noqa: E402
+
+
+def peak_rss_mb():
+    """
+    Get the peak resident set size of the current process in MiB, None if not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def measure(name, params, repeats, connection):
+    """
+    Measure one case with one parameter combination and send the result through a pipe.
+
+    Parameters
+    ----------
+    name: str
+        The name of the case.
+    params: dict
+        The parameters of the case.
+    repeats: int
+        The number of timed repetitions.
+    connection: Connection
+        The pipe to the parent process.
+
+    Returns
+    -------
+    None
+    """
+    try:
+        run = cases()[name](params)
+        rss_before = peak_rss_mb()
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        rss_peak = peak_rss_mb()
+        tracemalloc.start()
+        run()
+        _, allocated_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        connection.send({"time_min": min(times), "time_median": statistics.median(times), "repeats": repeats,
+                         "peak_rss_mb": rss_peak, "rss_before_mb": rss_before,
+                         "tracemalloc_peak_mb": allocated_peak / 2 ** 20})
+    except Exception as error:
+        connection.send({"error": repr(error)})
+    finally:
+        connection.close()
+
+
+def run_suite(suite, pattern, repeats):
+    """
+    Run all cases of a suite whose name matches a pattern.
+
+    Parameters
+    ----------
+    suite: str
+        The name of the suite.
+    pattern: str
+        The shell-style pattern of the case names.
+    repeats: int
+        The number of timed repetitions per case.
+
+    Returns
+    -------
+    report: dict
+        The metadata of the run and the results.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for name in sorted(cases()):
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        for params in grid(suite):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=measure, args=(name, params, repeats, sender))
+            process.start()
+            sender.close()
+            result = receiver.recv() if receiver.poll(None) else {"error": "no result"}
+            process.join()
+            result.update(name=name, params=params)
+            results.append(result)
+            print(name, params, "{:.4f}s".format(result["time_min"]) if "time_min" in result else result["error"],
+                  flush=True)
+    return {"meta": {"suite": suite, "python": platform.python_version(), "numpy": np.__version__,
+                     "platform": platform.platform(), "processor": platform.processor(),
+                     "cpus": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            "results": results}
+
+
+def rss_growth_mb(result):
+    """
+    Get the growth of the peak RSS of a case while it runs.
+
+    Parameters
+    ----------
+    result: dict
+        The result of the case.
+
+    Returns
+    -------
+    growth: float or None
+        The growth in MiB, None if the RSS is not available.
+    """
+    if result.get("peak_rss_mb") is None or result.get("rss_before_mb") is None:
+        return None
+    return result["peak_rss_mb"] - result["rss_before_mb"]
+
+
+def compare(base, new, threshold, min_seconds=0., min_rss_mb=0.):
+    """
+    Compare the results of two runs.
+
+    Parameters
+    ----------
+    base: dict
+        The report of the base run.
+    new: dict
+        The report of the new run.
+    threshold: float
+        The relative increase of the time or the memory above which a case counts as a regression.
+    min_seconds: float, default = 0
+        Cases faster than this in both runs are never regressions, since their times are dominated by noise.
+    min_rss_mb: float, default = 0
+        Cases whose RSS grows by less than this in both runs are never RSS regressions, since the growth of small
+        cases is dominated by the allocator.
+
+    Returns
+    -------
+    regressions: int
+        The number of cases that got slower or need more memory.
+    """
+    def key(result):
+        return result["name"], json.dumps(result["params"], sort_keys=True)
+
+    base_results = {key(result): result for result in base["results"] if "error" not in result}
+    regressions = 0
+    print("{:<60} {:>10} {:>10} {:>8} {:>10} {:>8}".format("case", "base [s]", "new [s]", "ratio", "memory", "rss"))
+    for result in new["results"]:
+        if "error" in result or key(result) not in base_results:
+            continue
+        previous = base_results[key(result)]
+        time_ratio = result["time_min"] / previous["time_min"] if previous["time_min"] > 0 else 1.
+        memory_ratio = result["tracemalloc_peak_mb"] / previous["tracemalloc_peak_mb"] \
+            if previous["tracemalloc_peak_mb"] > 0 else 1.
+        # the growth of the peak RSS during the case, without the imports and the preparation
+        rss_growth = rss_growth_mb(result)
+        previous_rss_growth = rss_growth_mb(previous)
+        rss_ratio = rss_growth / previous_rss_growth \
+            if rss_growth is not None and previous_rss_growth is not None and previous_rss_growth > 0 else 1.
+        slow = max(result["time_min"], previous["time_min"]) >= min_seconds
+        large = rss_growth is not None and previous_rss_growth is not None and \
+            max(rss_growth, previous_rss_growth) >= min_rss_mb
+        regressed = (slow and time_ratio > 1 + threshold) or memory_ratio > 1 + threshold or \
+            (large and rss_ratio > 1 + threshold)
+        regressions += regressed
+        label = result["name"] + " " + " ".join(str(value) for value in result["params"].values())
+        print("{:<60} {:>10.4f} {:>10.4f} {:>8.2f} {:>10.2f} {:>8.2f}{}".format(
+            label[:60], previous["time_min"], result["time_min"], time_ratio, memory_ratio, rss_ratio,
+            "  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite of the som package.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--suite", default="quick", choices=["quick", "full"], help="the parameter grid")
+    run_parser.add_argument("--filter", default="*", help="shell-style pattern of the case names")
+    run_parser.add_argument("--repeats", type=int, default=3, help="the number of timed repetitions")
+    run_parser.add_argument("--output", default="benchmark.json", help="the JSON file of the results")
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("base", help="the JSON file of the base run")
+    compare_parser.add_argument("new", help="the JSON file of the new run")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="the relative increase that counts as a regression")
+    compare_parser.add_argument("--min-seconds", type=float, default=0.01,
+                                help="the time below which a case is too fast to count as slower")
+    compare_parser.add_argument("--min-rss-mb", type=float, default=1.,
+                                help="the growth of the RSS below which a case is too small to count as larger")
+    arguments = parser.parse_args()
+
+    if arguments.command == "run":
+        report = run_suite(arguments.suite, arguments.filter, arguments.repeats)
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        with open(arguments.base) as base, open(arguments.new) as new:
+            regressions = compare(json.load(base), json.load(new), arguments.threshold,
+                                  arguments.min_seconds, arguments.min_rss_mb)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
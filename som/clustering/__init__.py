@@ -0,0 +1,8 @@
+"""
+The :mod:`som.clustering` module includes the clustering of the units of trained SOMs. The codebook is a compressed
+summary of the data, so clustering the units is far cheaper than clustering the data points, which get the cluster of
+their best-matching unit.
+"""
+from ._clustering import UnitClustering
+
+__all__ = ["UnitClustering"]
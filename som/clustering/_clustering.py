@@ -0,0 +1,253 @@
+"""
+This module gathers the clustering of the units of SOMs.
+"""
+
+import heapq
+
+import numpy as np
+
+from som.maps._distance import _euclid_k_nearest
+from som.maps._neighborhood import _grid_neighbors
+
+
+class UnitClustering:
+    """
+    Cluster the units of a trained SOM by their weight vectors and assign every data point the cluster of its
+    best-matching unit (BMU).
+
+    "ward" is agglomerative clustering with Ward's criterion under the connectivity of the grid: starting from one
+    cluster per unit, the two adjacent clusters whose merge increases the within-cluster sum of squares the least are
+    merged until n_clusters are left. Only clusters that contain adjacent units can merge, so every cluster is a
+    connected region of the map, and the merge graph stays as sparse as the grid: each merge only updates the costs of
+    the clusters adjacent to the merged one (a priority queue with lazy deletion).
+
+    "kmeans" is Lloyd's algorithm on the weight vectors with a k-means++ initialization. The clusters are not
+    necessarily connected on the map.
+
+    Parameters
+    ----------
+    som: BaseSOM
+        The trained SOM.
+    n_clusters: int, default = 8
+        The number of clusters. Must be between one and the number of units.
+    method: {"ward", "kmeans"}, default = "ward"
+        The clustering algorithm.
+    max_iter: int, default = 300
+        The maximum number of iterations of k-means. Must be greater than zero.
+    random_seed: int, default = 1
+        The random seed of the initialization of k-means.
+
+    Attributes
+    ----------
+    unit_labels: ndarray of size n_units or None
+        The cluster of each unit, numbered in the order of the first unit of each cluster.
+    labels: ndarray of size n_samples or None
+        The cluster of each training data point, the cluster of its BMU.
+    centroids: ndarray of shape (n_clusters, n_features) or None
+        The mean weight vector of the units of each cluster.
+    inertia: float or None
+        The sum of the squared distances of the weight vectors to the centroid of their cluster.
+    n_iter: int or None
+        The number of iterations of k-means, the number of merges of Ward's clustering.
+    """
+
+    def __init__(self, som, n_clusters=8, method="ward", max_iter=300, random_seed=1):
+        # parameter check
+        if not som.trained:
+            raise ValueError("SOM is not trained")
+        if not 1 <= n_clusters <= len(som.positions):
+            raise ValueError("Number of clusters must be between 1 and the number of units")
+        if method not in ["ward", "kmeans"]:
+            raise ValueError("Method " + str(method) + " not supported")
+        if max_iter <= 0:
+            raise ValueError("Maximum number of iterations must be greater 0")
+
+        self.som = som
+        self.n_clusters = n_clusters
+        self.method = method
+        self.max_iter = max_iter
+        self.random_seed = random_seed
+        self.unit_labels = None
+        self.labels = None
+        self.centroids = None
+        self.inertia = None
+        self.n_iter = None
+
+    def fit(self):
+        """
+        Cluster the units and assign the training data points the cluster of their BMU.
+
+        Returns
+        -------
+        self: UnitClustering
+            The fitted clustering.
+        """
+        codebook = np.asarray(self.som.codebook, dtype=float)
+        if self.method == "ward":
+            unit_labels, self.n_iter = _ward(codebook, _grid_neighbors(self.som.map_size, self.som.topology),
+                                             self.n_clusters)
+        else:
+            unit_labels, self.n_iter = _kmeans(codebook, self.n_clusters, self.max_iter,
+                                               np.random.default_rng(self.random_seed))
+        # number the clusters in the order of their first unit
+        _, first, unit_labels = np.unique(unit_labels, return_index=True, return_inverse=True)
+        self.unit_labels = np.argsort(np.argsort(first))[unit_labels]
+
+        n_clusters = np.max(self.unit_labels) + 1
+        sizes = np.bincount(self.unit_labels, minlength=n_clusters)
+        self.centroids = np.zeros((n_clusters, codebook.shape[1]))
+        np.add.at(self.centroids, self.unit_labels, codebook)
+        self.centroids /= sizes[:, None]
+        self.inertia = float(np.sum(np.square(codebook - self.centroids[self.unit_labels])))
+        # the clusters of the data points in one lookup
+        self.labels = self.unit_labels[self.som.bmu_indices[:, 0]]
+        return self
+
+    def predict(self, data):
+        """
+        Assign data points the cluster of their BMU. The BMUs are searched with the BMU engine of the SOM.
+
+        Parameters
+        ----------
+        data: DataFrame or array-like of shape (n_samples, n_features)
+            The data points.
+
+        Returns
+        -------
+        labels: ndarray of size n_samples
+            The cluster of each data point.
+        """
+        if self.unit_labels is None:
+            raise ValueError("UnitClustering is not fitted")
+        return self.unit_labels[self.som.predict(data)]
+
+
+def _ward(codebook, neighbors, n_clusters):
+    """
+    Agglomerative clustering with Ward's criterion, where only adjacent clusters can merge.
+
+    The cost of merging the clusters a and b is the increase of the within-cluster sum of squares,
+    :math:`\\frac{n_a n_b}{n_a + n_b} \\Vert \\mu_a - \\mu_b \\Vert^2`.
+
+    Parameters
+    ----------
+    codebook: ndarray of shape (n_units, n_features)
+        The weight vectors.
+    neighbors: ndarray of shape (n_units, n_neighbors)
+        The adjacent units of each unit, -1 for none.
+    n_clusters: int
+        The number of clusters. If the grid falls apart into more components, one cluster per component is left.
+
+    Returns
+    -------
+    labels: ndarray of size n_units
+        The cluster of each unit, the index of one of its units.
+    n_merges: int
+        The number of merges.
+    """
+    n_units = len(codebook)
+    sizes = np.ones(n_units)
+    sums = codebook.copy()
+    parent = np.arange(n_units)
+    # the adjacent clusters of each cluster and a version that invalidates the queued costs of merged clusters
+    adjacent = [set(row[row >= 0].tolist()) for row in neighbors]
+    version = np.zeros(n_units, dtype=np.int64)
+
+    def costs(a, others):
+        others = np.fromiter(others, dtype=np.intp, count=len(others))
+        means = sums[others] / sizes[others, None]
+        squared = np.sum(np.square(means - sums[a] / sizes[a]), axis=1)
+        return others, sizes[a] * sizes[others] / (sizes[a] + sizes[others]) * squared
+
+    queue = []
+    for a in range(n_units):
+        others, cost = costs(a, [b for b in adjacent[a] if b > a])
+        queue.extend(zip(cost.tolist(), [a] * len(others), others.tolist(), [0] * len(others), [0] * len(others)))
+    heapq.heapify(queue)
+
+    n_merges = 0
+    while n_units - n_merges > n_clusters and queue:
+        _, a, b, version_a, version_b = heapq.heappop(queue)
+        # skip costs of clusters that have changed since they were queued
+        if version[a] != version_a or version[b] != version_b or parent[a] != a or parent[b] != b:
+            continue
+        # merge b into a
+        parent[b] = a
+        sizes[a] += sizes[b]
+        sums[a] += sums[b]
+        adjacent[a] |= adjacent[b]
+        adjacent[a] -= {a, b}
+        for c in adjacent[b]:
+            adjacent[c].discard(b)
+            if c != a:
+                adjacent[c].add(a)
+        adjacent[b] = set()
+        version[a] += 1
+        n_merges += 1
+        if adjacent[a]:
+            others, cost = costs(a, adjacent[a])
+            for value, c in zip(cost.tolist(), others.tolist()):
+                heapq.heappush(queue, (value, a, c, version[a], version[c]))
+
+    # follow the merges to the root of every unit
+    labels = parent
+    while True:
+        roots = labels[labels]
+        if np.array_equal(roots, labels):
+            return labels, n_merges
+        labels = roots
+
+
+def _kmeans(codebook, n_clusters, max_iter, rng):
+    """
+    k-means clustering with Lloyd's algorithm and a k-means++ initialization.
+
+    Parameters
+    ----------
+    codebook: ndarray of shape (n_units, n_features)
+        The weight vectors.
+    n_clusters: int
+        The number of clusters.
+    max_iter: int
+        The maximum number of iterations.
+    rng: Generator
+        The random number generator of the initialization.
+
+    Returns
+    -------
+    labels: ndarray of size n_units
+        The cluster of each unit.
+    n_iter: int
+        The number of iterations.
+    """
+    # k-means++: draw the next centroid with a probability proportional to the squared distance to the nearest one
+    centroids = np.empty((n_clusters, codebook.shape[1]))
+    centroids[0] = codebook[rng.integers(len(codebook))]
+    squared = np.sum(np.square(codebook - centroids[0]), axis=1)
+    for i in range(1, n_clusters):
+        total = np.sum(squared)
+        index = rng.choice(len(codebook), p=squared / total) if total > 0 else rng.integers(len(codebook))
+        centroids[i] = codebook[index]
+        squared = np.minimum(squared, np.sum(np.square(codebook - centroids[i]), axis=1))
+
+    labels = None
+    n_iter = 0
+    for n_iter in range(1, max_iter + 1):
+        distances, nearest = _euclid_k_nearest(centroids, codebook, 1)
+        new_labels = nearest[:, 0]
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sizes = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, codebook)
+        # an empty cluster gets the unit farthest from its centroid, taken from a cluster with other units
+        for cluster in np.flatnonzero(sizes == 0):
+            farthest = np.argmax(np.where(sizes[labels] > 1, distances[:, 0], -1))
+            sums[labels[farthest]] -= codebook[farthest]
+            sizes[labels[farthest]] -= 1
+            sums[cluster], sizes[cluster] = codebook[farthest], 1
+            labels[farthest] = cluster
+            distances[farthest] = 0
+        centroids = sums / sizes[:, None]
+    return labels, n_iter
@@ -0,0 +1,10 @@
+"""
+The :mod:`som.distributed` module includes the distributed batch training of SOMs. A coordinator broadcasts the
+codebook to workers that hold shards of the data, e.g. on other hosts, and reduces their per-unit partial sums over
+plain TCP with a compact binary array encoding.
+"""
+from ._coordinator import BatchCoordinator
+from ._local import local_cluster
+from ._worker import BatchWorker
+
+__all__ = ["BatchCoordinator", "BatchWorker", "local_cluster"]
@@ -0,0 +1,21 @@
+"""
+Run a worker of the distributed batch training on a shard of the data saved with numpy.save.
+
+Example: python -m som.distributed shard.npy --host 0.0.0.0 --port 5000
+"""
+
+import argparse
+
+import numpy as np
+
+from ._worker import BatchWorker
+
+parser = argparse.ArgumentParser(prog="python -m som.distributed", description=__doc__.strip().splitlines()[0])
+parser.add_argument("data", help="the .npy file of the shard, memory-mapped")
+parser.add_argument("--host", default="127.0.0.1", help="the host of the TCP server")
+parser.add_argument("--port", type=int, default=5000, help="the port of the TCP server")
+parser.add_argument("--chunk-size", type=int, default=65536, help="the number of data points processed at once")
+arguments = parser.parse_args()
+worker = BatchWorker(np.load(arguments.data, mmap_mode="r"), arguments.host, arguments.port, arguments.chunk_size)
+print("Listening on " + str(worker.address[0]) + ":" + str(worker.address[1]), flush=True)
+worker.serve_forever()
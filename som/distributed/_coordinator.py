@@ -0,0 +1,268 @@
+"""
+This module gathers the coordinator of the distributed batch training.
+"""
+
+import socket
+import time
+
+import numpy as np
+import pandas as pd
+
+from ._protocol import _BMUS, _CLOSE, _EPOCH, _ERROR, _INFO, _SHUTDOWN, _recv_message, _send_message
+
+
+class BatchCoordinator:
+    """
+    Train a StandardSOM with the batch algorithm on data that is sharded over BatchWorkers, e.g. on other hosts.
+
+    In each epoch, the coordinator broadcasts the codebook to all workers over TCP. Each worker answers with the sum
+    of its data points per BMU and the number of its data points per BMU (see BatchWorker.partial_sums). The
+    coordinator adds up the answers of all workers and applies the batch update: each weight vector becomes the
+    neighborhood-weighted mean of the data points
+
+    :math:`m_i \\leftarrow \\frac{\\sum_j h_{ji} S_j}{\\sum_j h_{ji} n_j}`
+
+    where :math:`S_j` and :math:`n_j` are the sum and the number of the data points of which unit j is the BMU. The
+    result does not depend on the number of workers or on how the data is sharded. The workers compute their answers
+    in parallel, and each epoch sends two arrays of the size of the codebook per worker, independent of the number of
+    data points.
+
+    Parameters
+    ----------
+    addresses: list of tuple of (str, int)
+        The host and port of each worker.
+    timeout: float, default = 60
+        The time in seconds to wait for a worker to connect or to answer. None to wait forever.
+
+    Attributes
+    ----------
+    n_samples: int
+        The total number of data points on all workers, after connect.
+    n_features: int
+        The number of features, after connect.
+    history: DataFrame or None
+        One row per epoch of the last training with the columns "epoch", "radius", "quantization_error" (the mean
+        distance of the data points to their BMU before the update) and "seconds".
+    bytes_sent: int
+        The number of bytes sent to the workers.
+    bytes_received: int
+        The number of bytes received from the workers.
+    """
+
+    def __init__(self, addresses, timeout=60.):
+        # parameter check
+        if len(addresses) == 0:
+            raise ValueError("At least one worker address is needed")
+
+        self.addresses = [tuple(address) for address in addresses]
+        self.timeout = timeout
+        self.n_samples = None
+        self.n_features = None
+        self.history = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._sockets = None
+        self._mins = None
+        self._maxs = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect(self):
+        """
+        Connect to all workers and get the size and the range of their data.
+
+        Returns
+        -------
+        self: BatchCoordinator
+            The connected coordinator.
+        """
+        if self._sockets is None:
+            self._sockets = []
+            for address in self.addresses:
+                sock = socket.create_connection(address, timeout=self.timeout)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._sockets.append(sock)
+        answers = self.__broadcast(_INFO)
+        n_features = {len(mins) for _, mins, _ in answers}
+        if len(n_features) != 1:
+            raise ValueError("The shards of the workers have different numbers of features")
+        self.n_samples = int(sum(n for n, _, _ in answers))
+        self.n_features = n_features.pop()
+        self._mins = np.min([mins for _, mins, _ in answers], axis=0)
+        self._maxs = np.max([maxs for _, _, maxs in answers], axis=0)
+        return self
+
+    def close(self, shutdown=False):
+        """
+        Close the connections to the workers.
+
+        Parameters
+        ----------
+        shutdown: bool, default = False
+            Whether to also stop the workers. Otherwise, they wait for the next coordinator.
+
+        Returns
+        -------
+        None
+        """
+        if self._sockets is None:
+            return
+        for sock in self._sockets:
+            try:
+                _send_message(sock, _SHUTDOWN if shutdown else _CLOSE)
+            except OSError:
+                pass
+            sock.close()
+        self._sockets = None
+
+    def train(self, som, epochs=10, neighborhood_radius=None, final_radius=1., random_seed=1, codebook=None,
+              collect_bmus=True):
+        """
+        Train a SOM with the batch algorithm on the data of the workers.
+
+        Parameters
+        ----------
+        som: StandardSOM
+            The SOM to train. Its map size, topology and neighborhood function are used.
+        epochs: int, default = 10
+            The number of epochs. Each epoch is one pass over the data of all workers. Must be greater than zero.
+        neighborhood_radius: float, default = None
+            The neighborhood radius of the first epoch. If None, the neighborhood radius of the SOM. Must be greater
+            than zero.
+        final_radius: float, default = 1
+            The neighborhood radius of the last epoch. The radius decreases linearly between the first and the last
+            epoch. Must be in (0, neighborhood_radius].
+        random_seed: int, default = 1
+            The random seed of the initialization.
+        codebook: array-like of shape (n_units, n_features), default = None
+            The initial codebook. If None, random values in the range of the data of all workers.
+        collect_bmus: bool, default = True
+            Whether to collect the first and second BMU of every data point from the workers after the training, in
+            the order of the workers, e.g. for the quality measures. Otherwise, only the codebook is trained.
+
+        Returns
+        -------
+        som: StandardSOM
+            The fitted SOM.
+        """
+        if neighborhood_radius is None:
+            neighborhood_radius = som.neighborhood_radius
+        # parameter check
+        if epochs <= 0:
+            raise ValueError("Epochs must be greater 0")
+        if neighborhood_radius <= 0:
+            raise ValueError("Neighborhood radius smaller or equal 0. Must be greater than 0")
+        if not 0 < final_radius <= neighborhood_radius:
+            raise ValueError("Final radius must be in (0, neighborhood_radius]")
+        if self._sockets is None:
+            self.connect()
+        n_units = len(som.positions)
+        if codebook is not None and np.shape(codebook) != (n_units, self.n_features):
+            raise ValueError("codebook must be of shape (n_units, n_features)")
+
+        som.rng = np.random.default_rng(random_seed)
+        if codebook is None:
+            # random values in [min, max) of each feature, as the "random" initialization of StandardSOM.train
+            codebook = som.rng.random((n_units, self.n_features)) * (self._maxs - self._mins) + self._mins
+        codebook = np.array(codebook, dtype=float)
+
+        history = []
+        for epoch, radius in enumerate(np.linspace(neighborhood_radius, final_radius, epochs)):
+            start = time.perf_counter()
+            answers = self.__broadcast(_EPOCH, [codebook])
+            # reduce the partial sums of all workers
+            sums = np.sum([answer[0] for answer in answers], axis=0)
+            counts = np.sum([answer[1] for answer in answers], axis=0)
+            distance_sum = float(np.sum([answer[2] for answer in answers]))
+            codebook = _batch_update(som, codebook, sums, counts, radius)
+            history.append((epoch + 1, radius, distance_sum / self.n_samples, time.perf_counter() - start))
+        self.history = pd.DataFrame(history, columns=["epoch", "radius", "quantization_error", "seconds"])
+
+        # a fresh training state
+        som.codebook = codebook
+        som.iterations_trained = epochs
+        som.scaler = None
+        som.convergence_curve = som.timings = som.resource_usage = None
+        som.bmu_search_counts = som.bmu_refresh_counts = None
+        som._bmu_index = som._bmu_lower_bounds = som._bmu_codebook = None
+        som.bmu_distances = som.bmu_indices = None
+        if collect_bmus:
+            answers = self.__broadcast(_BMUS, [codebook])
+            som.bmu_distances = np.concatenate([distances for distances, _ in answers])
+            som.bmu_indices = np.concatenate([indices for _, indices in answers])
+        som.trained = True
+        return som
+
+    def __broadcast(self, command, arrays=()):
+        """
+        Send the same request to all workers, then wait for all answers, so the workers compute in parallel.
+
+        Parameters
+        ----------
+        command: int
+            The command of the request.
+        arrays: iterable of array-like, default = ()
+            The arrays of the request.
+
+        Returns
+        -------
+        answers: list of list of ndarray
+            The arrays of the answer of each worker, in the order of the addresses.
+        """
+        for sock in self._sockets:
+            self.bytes_sent += _send_message(sock, command, arrays)
+        answers = []
+        for address, sock in zip(self.addresses, self._sockets):
+            answer, answer_arrays, n_bytes = _recv_message(sock)
+            self.bytes_received += n_bytes
+            if answer == _ERROR:
+                raise RuntimeError("Worker " + str(address) + " failed: " + answer_arrays[0].tobytes().decode())
+            answers.append(answer_arrays)
+        return answers
+
+
+def _batch_update(som, codebook, sums, counts, radius, block_size=1024):
+    """
+    Apply the batch update to a codebook, given the sums and the numbers of the data points per BMU.
+
+    Parameters
+    ----------
+    som: StandardSOM
+        The SOM, for its positions, output space distance and neighborhood function.
+    codebook: ndarray of shape (n_units, n_features)
+        The current codebook.
+    sums: ndarray of shape (n_units, n_features)
+        The sum of the data points of which each unit is the BMU.
+    counts: ndarray of size n_units
+        The number of data points of which each unit is the BMU.
+    radius: float
+        The neighborhood radius.
+    block_size: int, default = 1024
+        The number of BMUs whose neighborhood is computed at once, so the temporary memory is block_size x n_units
+        instead of n_units x n_units.
+
+    Returns
+    -------
+    codebook: ndarray of shape (n_units, n_features)
+        The updated codebook. Units without any data point in their neighborhood keep their weight vector.
+    """
+    positions = som.positions
+    numerator = np.zeros(codebook.shape)
+    denominator = np.zeros(len(codebook))
+    # only the units that are the BMU of a data point contribute
+    hit = np.flatnonzero(counts)
+    for start in range(0, len(hit), block_size):
+        bmus = hit[start:start + block_size]
+        # the neighborhood of each BMU over all units, as in the online training
+        neighborhood = som.neighborhood_function(
+            som.output_space_distance(positions[None, :, :], positions[bmus, None, :]), radius)
+        numerator += neighborhood.T @ sums[bmus]
+        denominator += neighborhood.T @ counts[bmus]
+    updated = codebook.copy()
+    valid = denominator > 0
+    updated[valid] = numerator[valid] / denominator[valid, None]
+    return updated
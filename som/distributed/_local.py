@@ -0,0 +1,96 @@
+"""
+This module gathers a local cluster of workers for the distributed batch training, e.g. for tests without a real
+cluster.
+"""
+
+import multiprocessing
+import socket
+from contextlib import contextmanager
+
+from ._protocol import _SHUTDOWN, _send_message
+from ._worker import BatchWorker
+
+
+def _run_worker(shard, host, connection):
+    """
+    Run a worker in a child process and report its address to the parent.
+
+    Parameters
+    ----------
+    shard: array-like of shape (n_samples, n_features)
+        The shard of the data.
+    host: str
+        The host to listen on.
+    connection: Connection
+        The pipe to the parent process.
+
+    Returns
+    -------
+    None
+    """
+    worker = BatchWorker(shard, host=host)
+    connection.send(worker.address)
+    connection.close()
+    worker.serve_forever()
+
+
+@contextmanager
+def local_cluster(shards, host="127.0.0.1", timeout=60.):
+    """
+    Start one BatchWorker process per shard on the local host, each listening on a free port.
+
+    The processes are started with the "spawn" method, so they do not inherit the state of the parent process, like
+    workers on other hosts. On exit, the workers are shut down and their processes are joined.
+
+    Parameters
+    ----------
+    shards: list of array-like of shape (n_samples, n_features)
+        The shard of the data of each worker.
+    host: str, default = "127.0.0.1"
+        The host the workers listen on.
+    timeout: float, default = 60
+        The time in seconds to wait for a worker to start or to stop.
+
+    Returns
+    -------
+    addresses: list of tuple of (str, int)
+        The host and port of each worker, for BatchCoordinator.
+
+    Examples
+    --------
+    >>> with local_cluster(np.array_split(data, 4)) as addresses:
+    ...     with BatchCoordinator(addresses) as coordinator:
+    ...         coordinator.train(som, epochs=20)
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    addresses = []
+    try:
+        # start all workers before waiting for any of them
+        pipes = []
+        for shard in shards:
+            parent, child = context.Pipe(duplex=False)
+            process = context.Process(target=_run_worker, args=(shard, host, child), daemon=True)
+            process.start()
+            child.close()
+            processes.append(process)
+            pipes.append(parent)
+        for parent in pipes:
+            if not parent.poll(timeout):
+                raise RuntimeError("Worker did not start within " + str(timeout) + " seconds")
+            addresses.append(parent.recv())
+            parent.close()
+        yield addresses
+    finally:
+        for address in addresses:
+            # the worker stops once its current coordinator has closed the connection
+            try:
+                with socket.create_connection(address, timeout=timeout) as sock:
+                    _send_message(sock, _SHUTDOWN)
+            except OSError:
+                pass
+        for process in processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
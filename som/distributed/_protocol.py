@@ -0,0 +1,188 @@
+"""
+This module gathers the binary message format of the distributed batch training.
+
+A message is a header (magic bytes, command, number of arrays) followed by the arrays. Each array is a small header
+(dtype code, number of dimensions, shape) followed by its raw little-endian bytes, so the codebook, the partial sums
+and the counts are sent without any text encoding and received directly into preallocated numpy arrays.
+"""
+
+import struct
+
+import numpy as np
+
+_MAGIC = b"SOMD"
+# magic, command, number of arrays
+_HEADER = struct.Struct("!4sBI")
+# dtype code, number of dimensions
+_ARRAY_HEADER = struct.Struct("!BB")
+# the supported dtypes by their code, all little-endian
+_DTYPES = [np.dtype("<f8"), np.dtype("<f4"), np.dtype("<i8"), np.dtype("<i4"), np.dtype("u1")]
+
+_INFO = 1
+_EPOCH = 2
+_BMUS = 3
+_CLOSE = 4
+_SHUTDOWN = 5
+_RESULT = 64
+_ERROR = 65
+
+
+def _dtype_code(dtype):
+    """
+    Get the code of the wire dtype of an array.
+
+    Parameters
+    ----------
+    dtype: dtype
+        The dtype of the array. Floats are sent as float64 or float32, integers as int64 or int32, booleans as uint8.
+
+    Returns
+    -------
+    code: int
+        The index of the wire dtype in _DTYPES.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return 1 if dtype.itemsize == 4 else 0
+    if dtype.kind == "b" or dtype == np.uint8:
+        return 4
+    if dtype.kind in "iu":
+        return 3 if dtype.kind == "i" and dtype.itemsize <= 4 else 2
+    raise ValueError("dtype " + str(dtype) + " not supported")
+
+
+def _send_message(sock, command, arrays=()):
+    """
+    Send a message with a command and arrays over a socket.
+
+    Parameters
+    ----------
+    sock: socket
+        The connected socket.
+    command: int
+        The command of the message.
+    arrays: iterable of array-like, default = ()
+        The arrays of the message. Scalars are sent as arrays with zero dimensions.
+
+    Returns
+    -------
+    n_bytes: int
+        The number of bytes sent.
+    """
+    arrays = [np.asarray(array) for array in arrays]
+    arrays = [np.asarray(array, dtype=_DTYPES[_dtype_code(array.dtype)], order="C") for array in arrays]
+    # the header of each array is sent together with the preceding bytes, the raw bytes without copying them
+    header = _HEADER.pack(_MAGIC, command, len(arrays))
+    n_bytes = 0
+    for array in arrays:
+        header += _ARRAY_HEADER.pack(_dtype_code(array.dtype), array.ndim)
+        header += struct.pack("!%dQ" % array.ndim, *array.shape)
+        if array.nbytes:
+            sock.sendall(header)
+            sock.sendall(memoryview(array).cast("B"))
+            n_bytes += len(header) + array.nbytes
+            header = b""
+    if header:
+        sock.sendall(header)
+        n_bytes += len(header)
+    return n_bytes
+
+
+def _recv_into(sock, buffer):
+    """
+    Fill a buffer with bytes from a socket.
+
+    Parameters
+    ----------
+    sock: socket
+        The connected socket.
+    buffer: memoryview
+        The byte buffer to fill.
+
+    Returns
+    -------
+    None
+    """
+    received = 0
+    while received < len(buffer):
+        n = sock.recv_into(buffer[received:])
+        if n == 0:
+            raise ConnectionError("Connection closed by the peer")
+        received += n
+
+
+def _recv_exactly(sock, n):
+    """
+    Receive exactly n bytes from a socket.
+
+    Parameters
+    ----------
+    sock: socket
+        The connected socket.
+    n: int
+        The number of bytes.
+
+    Returns
+    -------
+    data: bytearray
+        The received bytes.
+    """
+    data = bytearray(n)
+    _recv_into(sock, memoryview(data))
+    return data
+
+
+def _recv_message(sock):
+    """
+    Receive a message sent with _send_message from a socket.
+
+    Parameters
+    ----------
+    sock: socket
+        The connected socket.
+
+    Returns
+    -------
+    command: int
+        The command of the message.
+    arrays: list of ndarray
+        The arrays of the message.
+    n_bytes: int
+        The number of bytes received.
+    """
+    magic, command, n_arrays = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    if magic != _MAGIC:
+        raise ConnectionError("Invalid message")
+    n_bytes = _HEADER.size
+    arrays = []
+    for _ in range(n_arrays):
+        code, ndim = _ARRAY_HEADER.unpack(_recv_exactly(sock, _ARRAY_HEADER.size))
+        if code >= len(_DTYPES):
+            raise ConnectionError("Invalid dtype code " + str(code))
+        shape = struct.unpack("!%dQ" % ndim, _recv_exactly(sock, 8 * ndim))
+        # receive the raw bytes directly into the array
+        array = np.empty(shape, dtype=_DTYPES[code])
+        if array.nbytes:
+            _recv_into(sock, memoryview(array).cast("B"))
+        arrays.append(array)
+        n_bytes += _ARRAY_HEADER.size + 8 * ndim + array.nbytes
+    return command, arrays, n_bytes
+
+
+def _send_error(sock, message):
+    """
+    Send an error message over a socket.
+
+    Parameters
+    ----------
+    sock: socket
+        The connected socket.
+    message: str
+        The description of the error.
+
+    Returns
+    -------
+    n_bytes: int
+        The number of bytes sent.
+    """
+    return _send_message(sock, _ERROR, [np.frombuffer(message.encode(), dtype=np.uint8)])
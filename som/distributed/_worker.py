@@ -0,0 +1,200 @@
+"""
+This module gathers the worker of the distributed batch training, which holds a shard of the data.
+"""
+
+import socket
+
+import numpy as np
+
+from ..maps._distance import _euclid_k_nearest
+from ._protocol import _BMUS, _CLOSE, _EPOCH, _INFO, _RESULT, _SHUTDOWN, _recv_message, _send_error, \
+    _send_message
+
+
+class BatchWorker:
+    """
+    A TCP server that holds a shard of the data and answers the requests of a BatchCoordinator.
+
+    In each epoch of the batch training, the coordinator broadcasts the codebook. The worker finds the BMU of each of
+    its data points and answers with the sum of the data points per unit, the number of data points per unit and the
+    sum of the distances to the BMUs. The data points never leave the worker, only arrays of the size of the codebook
+    are sent. The data points are processed in chunks, so the shard can be a memory-mapped array that is larger than
+    the memory.
+
+    A worker serves one coordinator at a time, one connection after the other, until a coordinator shuts it down.
+
+    Parameters
+    ----------
+    data: array-like of shape (n_samples, n_features)
+        The shard of the data, e.g. a memory-mapped array.
+    host: str, default = "127.0.0.1"
+        The host to listen on.
+    port: int, default = 0
+        The port to listen on. If 0, a free port is chosen, see address.
+    chunk_size: int, default = 65536
+        The number of data points processed at once. Must be greater than zero.
+
+    Attributes
+    ----------
+    address: tuple of (str, int)
+        The host and port the worker listens on.
+    epochs: int
+        The number of epochs the worker has answered.
+    """
+
+    def __init__(self, data, host="127.0.0.1", port=0, chunk_size=65536):
+        # parameter check
+        if np.ndim(data) != 2:
+            raise ValueError("Data must be a two-dimensional array")
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be greater 0")
+
+        self.data = data if isinstance(data, np.ndarray) else np.asarray(data, dtype=float)
+        self.chunk_size = chunk_size
+        self.epochs = 0
+        self._server = socket.create_server((host, port))
+        self.address = self._server.getsockname()[:2]
+
+    def info(self):
+        """
+        Get the size of the shard and the range of its features.
+
+        Returns
+        -------
+        n_samples: int
+            The number of data points.
+        mins: ndarray of size n_features
+            The minimum of each feature.
+        maxs: ndarray of size n_features
+            The maximum of each feature.
+        """
+        mins = np.full(self.data.shape[1], np.inf)
+        maxs = np.full(self.data.shape[1], -np.inf)
+        for start in range(0, len(self.data), self.chunk_size):
+            chunk = self.data[start:start + self.chunk_size]
+            np.minimum(mins, chunk.min(axis=0), out=mins)
+            np.maximum(maxs, chunk.max(axis=0), out=maxs)
+        return len(self.data), mins, maxs
+
+    def partial_sums(self, codebook):
+        """
+        Compute the statistics of the shard for one epoch of the batch training.
+
+        Parameters
+        ----------
+        codebook: ndarray of shape (n_units, n_features)
+            The current codebook.
+
+        Returns
+        -------
+        sums: ndarray of shape (n_units, n_features)
+            The sum of the data points of which each unit is the BMU.
+        counts: ndarray of size n_units
+            The number of data points of which each unit is the BMU.
+        distance_sum: float
+            The sum of the distances of the data points to their BMU.
+        """
+        sums = np.zeros(codebook.shape)
+        counts = np.zeros(len(codebook), dtype=np.int64)
+        distance_sum = 0.
+        for start in range(0, len(self.data), self.chunk_size):
+            chunk = np.asarray(self.data[start:start + self.chunk_size], dtype=float)
+            distances, indices = _euclid_k_nearest(codebook, chunk, k=1)
+            # one weighted bincount per feature is faster than an unbuffered np.add.at
+            for feature in range(chunk.shape[1]):
+                sums[:, feature] += np.bincount(indices[:, 0], weights=chunk[:, feature], minlength=len(codebook))
+            counts += np.bincount(indices[:, 0], minlength=len(codebook))
+            distance_sum += np.sum(distances)
+        return sums, counts, distance_sum
+
+    def bmus(self, codebook):
+        """
+        Find the first and second BMU of each data point of the shard.
+
+        Parameters
+        ----------
+        codebook: ndarray of shape (n_units, n_features)
+            The codebook.
+
+        Returns
+        -------
+        distances: ndarray of shape (n_samples, 2)
+            The distances to the first and second BMU.
+        indices: ndarray of shape (n_samples, 2)
+            The indices of the first and second BMU.
+        """
+        k = min(2, len(codebook))
+        distances = np.empty((len(self.data), k))
+        indices = np.empty((len(self.data), k), dtype=np.int64)
+        for start in range(0, len(self.data), self.chunk_size):
+            chunk = np.asarray(self.data[start:start + self.chunk_size], dtype=float)
+            distances[start:start + len(chunk)], indices[start:start + len(chunk)] = \
+                _euclid_k_nearest(codebook, chunk, k=k)
+        return distances, indices
+
+    def serve_forever(self):
+        """
+        Answer the requests of coordinators until a coordinator shuts the worker down.
+
+        Returns
+        -------
+        None
+        """
+        try:
+            while True:
+                connection, _ = self._server.accept()
+                with connection:
+                    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    if self.__handle(connection):
+                        return
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stop listening.
+
+        Returns
+        -------
+        None
+        """
+        self._server.close()
+
+    def __handle(self, connection):
+        """
+        Answer the requests of one coordinator until it closes the connection.
+
+        Parameters
+        ----------
+        connection: socket
+            The connection to the coordinator.
+
+        Returns
+        -------
+        shutdown: bool
+            Whether the coordinator shut the worker down.
+        """
+        while True:
+            try:
+                command, arrays, _ = _recv_message(connection)
+            except ConnectionError:
+                return False
+            if command == _CLOSE:
+                return False
+            if command == _SHUTDOWN:
+                return True
+            try:
+                if command == _INFO:
+                    result = self.info()
+                elif command == _EPOCH:
+                    result = self.partial_sums(arrays[0])
+                    self.epochs += 1
+                elif command == _BMUS:
+                    result = self.bmus(arrays[0])
+                else:
+                    raise ValueError("Command " + str(command) + " not supported")
+            except Exception as error:
+                # the worker keeps serving, the coordinator raises the error
+                _send_error(connection, type(error).__name__ + ": " + str(error))
+                continue
+            _send_message(connection, _RESULT, result)
@@ -0,0 +1,7 @@
+"""
+The :mod:`som.labelling` module includes the labelling of the units of trained SOMs with classes, and the
+classification of new data by the label of its best-matching unit.
+"""
+from ._labelling import SOMClassifier
+
+__all__ = ["SOMClassifier"]
@@ -0,0 +1,183 @@
+"""
+This module gathers the labelling of units and the classification by best-matching units.
+"""
+
+import numpy as np
+
+from som.maps._neighborhood import _grid_neighbors
+
+
+class SOMClassifier:
+    """
+    Label the units of a trained SOM with the majority class of the data points mapped onto them, and classify new
+    data points by the label of their best-matching unit (BMU).
+
+    The class histograms of all units are counted with one np.bincount over the (unit, class) pairs. Units without
+    data points get the label of the nearest labelled unit on the grid: the empty units adjacent to labelled units are
+    labelled first, then the ones adjacent to those and so on (a breadth-first search from all labelled units at
+    once). Among several labelled neighbors, the one with the closest weight vector wins.
+
+    Parameters
+    ----------
+    som: BaseSOM
+        The trained SOM.
+    fill_empty: bool, default = True
+        Whether to label the units without data points from their nearest labelled unit. If False, they stay
+        unlabelled and the data points mapped onto them are classified as unknown.
+    unknown: object, default = None
+        The label of data points whose BMU is unlabelled.
+
+    Attributes
+    ----------
+    classes: ndarray of size n_classes or None
+        The sorted classes.
+    histogram: ndarray of shape (n_units, n_classes) or None
+        The number of data points of each class per unit.
+    unit_labels: ndarray of size n_units or None
+        The label of each unit, unknown for unlabelled units.
+    unit_purity: ndarray of size n_units or None
+        The share of the data points of a unit that belong to its majority class, NaN for units without data points.
+        A quality measure of how well the map separates the classes.
+    purity: float or None
+        The share of all data points that belong to the majority class of their BMU.
+    filled: ndarray of size n_units or None
+        True for the units that were labelled from a neighbor.
+    """
+
+    def __init__(self, som, fill_empty=True, unknown=None):
+        # parameter check
+        if not som.trained:
+            raise ValueError("SOM is not trained")
+
+        self.som = som
+        self.fill_empty = fill_empty
+        self.unknown = unknown
+        self.classes = None
+        self.histogram = None
+        self.unit_labels = None
+        self.unit_purity = None
+        self.purity = None
+        self.filled = None
+        self._unit_codes = None
+
+    def fit(self, labels, data=None):
+        """
+        Label the units.
+
+        Parameters
+        ----------
+        labels: array-like of size n_samples
+            The class label of each data point.
+        data: DataFrame or array-like of shape (n_samples, n_features), default = None
+            The data points. Their BMUs are searched with the BMU engine of the SOM. If None, the labels belong to the
+            training data and its BMUs (bmu_indices) are used.
+
+        Returns
+        -------
+        self: SOMClassifier
+            The fitted classifier.
+        """
+        labels = np.asarray(labels)
+        bmus = self.som.bmu_indices[:, 0] if data is None else self.som.predict(data)
+        # parameter check
+        if len(labels) != len(bmus):
+            raise ValueError("labels must have one label per data point")
+        if len(labels) == 0:
+            raise ValueError("labels must not be empty")
+
+        n_units = len(self.som.positions)
+        self.classes, codes = np.unique(labels, return_inverse=True)
+        n_classes = len(self.classes)
+        # class histogram of every unit in one pass over the (unit, class) pairs
+        self.histogram = np.bincount(bmus * n_classes + codes.ravel(), minlength=n_units * n_classes) \
+            .reshape(n_units, n_classes)
+        hits = np.sum(self.histogram, axis=1)
+        majority = np.max(self.histogram, axis=1)
+        self.unit_purity = np.divide(majority, hits, out=np.full(n_units, np.nan), where=hits > 0)
+        self.purity = np.sum(majority) / len(labels)
+
+        unit_codes = np.where(hits > 0, np.argmax(self.histogram, axis=1), -1)
+        if self.fill_empty:
+            filled_codes = self.__fill(unit_codes)
+            self.filled = (unit_codes < 0) & (filled_codes >= 0)
+            unit_codes = filled_codes
+        else:
+            self.filled = np.zeros(n_units, dtype=bool)
+        self._unit_codes = unit_codes
+        self.unit_labels = self.__decode(unit_codes)
+        return self
+
+    def predict_label(self, data):
+        """
+        Classify data points by the label of their BMU. The BMUs are searched with the BMU engine of the SOM, whose
+        index is built only once per codebook.
+
+        Parameters
+        ----------
+        data: DataFrame or array-like of shape (n_samples, n_features)
+            The data points.
+
+        Returns
+        -------
+        labels: ndarray of size n_samples
+            The label of each data point, unknown if its BMU is unlabelled.
+        """
+        if self._unit_codes is None:
+            raise ValueError("SOMClassifier is not fitted")
+        return self.__decode(self._unit_codes[self.som.predict(data)])
+
+    def __decode(self, codes):
+        """
+        Get the labels of class codes.
+
+        Parameters
+        ----------
+        codes: ndarray of int
+            The indices of the classes, -1 for unlabelled.
+
+        Returns
+        -------
+        labels: ndarray
+            The labels, unknown for -1.
+        """
+        labels = self.classes[np.maximum(codes, 0)]
+        if np.all(codes >= 0):
+            return labels
+        # the unknown label may not fit into the dtype of the classes
+        labels = labels.astype(object)
+        labels[codes < 0] = self.unknown
+        return labels
+
+    def __fill(self, unit_codes):
+        """
+        Label the unlabelled units from their nearest labelled unit on the grid, breadth-first from all labelled
+        units at once.
+
+        Parameters
+        ----------
+        unit_codes: ndarray of size n_units
+            The class index of each unit, -1 for unlabelled units.
+
+        Returns
+        -------
+        unit_codes: ndarray of size n_units
+            The class index of each unit. Units that are not connected to any labelled unit stay -1.
+        """
+        neighbors = _grid_neighbors(self.som.map_size, self.som.topology)
+        codebook = np.asarray(self.som.codebook)
+        unit_codes = unit_codes.copy()
+        empty = np.flatnonzero(unit_codes < 0)
+        while len(empty) > 0:
+            # the labels of the neighbors as of the previous step
+            candidates = neighbors[empty]
+            candidate_codes = np.where(candidates >= 0, unit_codes[candidates], -1)
+            labelled = candidate_codes >= 0
+            reached = np.any(labelled, axis=1)
+            if not np.any(reached):
+                break
+            # the labelled neighbor with the closest weight vector
+            distances = np.sum(np.square(codebook[np.maximum(candidates, 0)] - codebook[empty, None, :]), axis=-1)
+            best = np.argmin(np.where(labelled, distances, np.inf), axis=1)
+            unit_codes[empty[reached]] = candidate_codes[reached, best[reached]]
+            empty = empty[~reached]
+        return unit_codes
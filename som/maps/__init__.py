@@ -3,5 +3,15 @@ The :mod:`som.maps` module includes all maps for analysis
 """
 from ._classes import StandardSOM
 from ._classes import BaseSOM
+from ._callbacks import Callback
+from ._monitor import ConvergenceMonitor
+from ._ensemble import train_ensemble
+from ._continual import ContinualTrainer
+from ._cache import TrainingCache
+from ._scaling import FeatureScaler
+from ._planner import TrainingPlan, measure_rates, plan_training
+from ._ann import HierarchicalCodebook, RandomProjectionForest
 
-__all__ = ["BaseSOM", "StandardSOM"]
+__all__ = ["BaseSOM", "StandardSOM", "Callback", "ConvergenceMonitor", "train_ensemble", "RandomProjectionForest",
+           "HierarchicalCodebook", "TrainingCache", "FeatureScaler", "TrainingPlan", "plan_training", "measure_rates",
+           "ContinualTrainer"]
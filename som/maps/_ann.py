@@ -0,0 +1,387 @@
+"""
+This module gathers approximate nearest neighbor indices for the BMU search in large, high-dimensional codebooks.
+"""
+
+import numpy as np
+
+from ._distance import _euclid_k_nearest, _rerank_candidates
+
+
+class RandomProjectionForest:
+    """
+    Approximate nearest neighbor index of a codebook based on a forest of random projection trees.
+
+    Each tree splits the units recursively at the median of their projection onto a random direction until a leaf
+    holds at most leaf_size units. All nodes on the same level of a tree share their direction, so a tree stores only
+    one direction per level, and a query computes all projections it needs with one matrix product. A query descends
+    every tree to one leaf, and the units of all reached leaves are re-ranked with the exact euclidean distance.
+    Neighbors that fall on the other side of a split in every tree are missed, so more trees and larger leaves raise
+    the recall at the cost of more exact distance computations.
+
+    Parameters
+    ----------
+    n_trees: int, default = 10
+        The number of trees. Must be greater than zero.
+    leaf_size: int, default = 32
+        The maximum number of units in a leaf. Must be greater than one.
+    random_seed: int, default = 1
+        The random seed for the directions of the splits.
+
+    Attributes
+    ----------
+    codebook: ndarray of shape (n_units, n_features) or None
+        The indexed codebook.
+    depth: int
+        The depth of the trees. All leaves are at this depth.
+    """
+
+    def __init__(self, n_trees=10, leaf_size=32, random_seed=1):
+        # parameter check
+        if n_trees <= 0:
+            raise ValueError("Number of trees must be greater 0")
+        if leaf_size <= 1:
+            raise ValueError("Leaf size must be greater 1")
+
+        self.n_trees = n_trees
+        self.leaf_size = leaf_size
+        self.random_seed = random_seed
+        self.codebook = None
+        self.depth = 0
+        self._normals = None
+        self._thresholds = None
+        self._leaves = None
+        self._norms = None
+
+    def fit(self, codebook):
+        """
+        Build the trees for a codebook.
+
+        Parameters
+        ----------
+        codebook: array-like of shape (n_units, n_features)
+            The codebook.
+
+        Returns
+        -------
+        self: RandomProjectionForest
+            The fitted index.
+        """
+        self.codebook = np.asarray(codebook, dtype=float)
+        self._norms = np.einsum("ij,ij->i", self.codebook, self.codebook)
+        n_units, n_features = self.codebook.shape
+        rng = np.random.default_rng(self.random_seed)
+        self.depth = int(max(0, np.ceil(np.log2(n_units / self.leaf_size))))
+        n_nodes = 2 ** self.depth - 1
+        n_leaves = 2 ** self.depth
+        max_leaf = int(np.ceil(n_units / n_leaves))
+
+        # the inner nodes of a tree are stored level by level, node i has the children 2i + 1 and 2i + 2
+        self._normals = rng.standard_normal((self.n_trees, self.depth, n_features))
+        self._thresholds = np.zeros((self.n_trees, n_nodes))
+        self._leaves = np.full((self.n_trees, n_leaves, max_leaf), -1, dtype=np.intp)
+        for tree in range(self.n_trees):
+            # the units of each node on the current level
+            groups = [np.arange(n_units)]
+            for level in range(self.depth):
+                level_projections = self.codebook @ self._normals[tree, level]
+                children = []
+                for offset, units in enumerate(groups):
+                    node = 2 ** level - 1 + offset
+                    projections = level_projections[units]
+                    order = np.argsort(projections, kind="stable")
+                    half = (len(units) + 1) // 2
+                    # split between the two middle projections
+                    if len(units) > 1:
+                        self._thresholds[tree, node] = (projections[order[half - 1]] +
+                                                        projections[order[min(half, len(units) - 1)]]) / 2
+                    children.extend([units[order[:half]], units[order[half:]]])
+                groups = children
+            for leaf, units in enumerate(groups):
+                self._leaves[tree, leaf, :len(units)] = units
+        return self
+
+    def query(self, vectors, k=1, chunk_size=4096):
+        """
+        Find the approximate k nearest units for many vectors.
+
+        Parameters
+        ----------
+        vectors: array-like of shape (n_vectors, n_features)
+            The vectors, e.g. data points.
+        k: int, default = 1
+            The number of nearest units.
+        chunk_size: int, default = 4096
+            The number of vectors processed at once.
+
+        Returns
+        -------
+        distances: ndarray of shape (n_vectors, k)
+            The euclidean distances to the approximate k nearest units, in increasing order.
+        indices: ndarray of shape (n_vectors, k)
+            The indices of the approximate k nearest units. Vectors whose leaves hold fewer than k distinct units are
+            searched exactly.
+        """
+        if self.codebook is None:
+            raise ValueError("Index is not fitted")
+        vectors = np.asarray(vectors, dtype=float)
+        distances = np.empty((len(vectors), k))
+        indices = np.empty((len(vectors), k), dtype=np.intp)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            candidates = np.concatenate([self._leaves[tree, self.__descend(tree, chunk)]
+                                         for tree in range(self.n_trees)], axis=1)
+            distances[start:start + chunk_size], indices[start:start + chunk_size] = \
+                _rerank_candidates(self.codebook, chunk, candidates, k, self._norms)
+        return _search_missing(self.codebook, vectors, distances, indices)
+
+    def measure_recall(self, vectors, k=1):
+        """
+        Measure the recall of the index against the exact search.
+
+        Parameters
+        ----------
+        vectors: array-like of shape (n_vectors, n_features)
+            The vectors, e.g. a sample of the data points.
+        k: int, default = 1
+            The number of nearest units.
+
+        Returns
+        -------
+        recall: float
+            The fraction of the exact k nearest units that are found by the index.
+        """
+        return _measure_recall(self, self.codebook, vectors, k)
+
+    def __descend(self, tree, vectors):
+        """
+        Descend a tree to the leaves of vectors.
+
+        Parameters
+        ----------
+        tree: int
+            The index of the tree.
+        vectors: ndarray of shape (n_vectors, n_features)
+            The vectors.
+
+        Returns
+        -------
+        leaves: ndarray of size n_vectors
+            The index of the leaf of each vector.
+        """
+        # project onto the directions of all levels at once
+        projections = vectors @ self._normals[tree].T
+        nodes = np.zeros(len(vectors), dtype=np.intp)
+        for level in range(self.depth):
+            nodes = 2 * nodes + 1 + (projections[:, level] > self._thresholds[tree, nodes])
+        return nodes - (2 ** self.depth - 1)
+
+
+class HierarchicalCodebook:
+    """
+    Two-level BMU search that exploits the topology of a trained SOM.
+
+    The grid is divided into blocks of block_size x block_size units, and every block is summarized by a super-unit,
+    the mean of the codebook vectors of its units. A query first finds the n_probes nearest super-units and then
+    searches exactly among the units of these blocks and of the blocks adjacent to them on the grid. After training,
+    neighboring units are similar, so the BMU of a vector lies almost always in the explored region, and the result
+    is exact within this region. On an untrained or badly folded map, the recall drops.
+
+    The blocks are taken on the rows and columns of the grid: the indices [i, j] for a rectangular grid and the offset
+    coordinates (row within the column, column) for a hexagonal grid.
+
+    Parameters
+    ----------
+    map_size: int, int
+        The size of the SOM (height, width).
+    topology: {"rectangular", "hexagonal"}, default = "rectangular"
+        The topology of the SOM.
+    block_size: int, default = 4
+        The height and width of a block in units. Must be greater than zero.
+    n_probes: int, default = 1
+        The number of nearest super-units whose blocks and adjacent blocks are searched. Must be greater than zero.
+
+    Attributes
+    ----------
+    codebook: ndarray of shape (n_units, n_features) or None
+        The indexed codebook.
+    super_codebook: ndarray of shape (n_blocks, n_features) or None
+        The codebook of the super-units.
+    """
+
+    def __init__(self, map_size, topology="rectangular", block_size=4, n_probes=1):
+        # parameter check
+        if topology not in ["rectangular", "hexagonal"]:
+            raise ValueError("Topology " + str(topology) + " not supported")
+        if block_size <= 0:
+            raise ValueError("Block size must be greater 0")
+        if n_probes <= 0:
+            raise ValueError("Number of probes must be greater 0")
+
+        self.map_size = map_size
+        self.topology = topology
+        self.block_size = block_size
+        self.n_probes = n_probes
+        self.codebook = None
+        self.super_codebook = None
+        self._members = None
+        self._adjacent = None
+        self._norms = None
+
+        height, width = map_size
+        # unit index at each [row, column] of the grid, see _grid_window
+        if topology == "rectangular":
+            grid = np.arange(height * width).reshape(height, width)
+        else:
+            grid = np.arange(height * width).reshape(width, height).T
+        # units of each block, padded with -1
+        block_rows = -(-height // block_size)
+        block_columns = -(-width // block_size)
+        padded = np.full((block_rows * block_size, block_columns * block_size), -1)
+        padded[:height, :width] = grid
+        members = padded.reshape(block_rows, block_size, block_columns, block_size).transpose(0, 2, 1, 3)
+        # an additional block without units, selected by the block index -1
+        self._members = np.vstack((members.reshape(block_rows * block_columns, -1),
+                                   np.full((1, block_size ** 2), -1)))
+        # each block and its (up to) eight adjacent blocks, padded with -1
+        rows, columns = np.indices((block_rows, block_columns)).reshape(2, -1, 1)
+        offsets = np.array([(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)])
+        rows = rows + offsets[:, 0]
+        columns = columns + offsets[:, 1]
+        inside = (rows >= 0) & (rows < block_rows) & (columns >= 0) & (columns < block_columns)
+        self._adjacent = np.where(inside, rows * block_columns + columns, -1)
+
+    def fit(self, codebook):
+        """
+        Compute the super-units of a codebook.
+
+        Parameters
+        ----------
+        codebook: array-like of shape (n_units, n_features)
+            The codebook. The units must be in the order of the positions of the SOM.
+
+        Returns
+        -------
+        self: HierarchicalCodebook
+            The fitted index.
+        """
+        codebook = np.asarray(codebook, dtype=float)
+        if len(codebook) != self.map_size[0] * self.map_size[1]:
+            raise ValueError("codebook must have height * width units")
+        self.codebook = codebook
+        self._norms = np.einsum("ij,ij->i", codebook, codebook)
+        # mean of the units of each block
+        members = self._members[:-1]
+        valid = members >= 0
+        sums = np.einsum("bm,bmf->bf", valid.astype(float), codebook[np.where(valid, members, 0)])
+        self.super_codebook = sums / np.sum(valid, axis=1)[:, None]
+        return self
+
+    def query(self, vectors, k=1, chunk_size=4096):
+        """
+        Find the k nearest units for many vectors within the explored blocks.
+
+        Parameters
+        ----------
+        vectors: array-like of shape (n_vectors, n_features)
+            The vectors, e.g. data points.
+        k: int, default = 1
+            The number of nearest units.
+        chunk_size: int, default = 4096
+            The number of vectors processed at once.
+
+        Returns
+        -------
+        distances: ndarray of shape (n_vectors, k)
+            The euclidean distances to the k nearest units in the explored blocks, in increasing order.
+        indices: ndarray of shape (n_vectors, k)
+            The indices of the k nearest units in the explored blocks. Vectors for which fewer than k units were
+            explored are searched exactly.
+        """
+        if self.codebook is None:
+            raise ValueError("Index is not fitted")
+        vectors = np.asarray(vectors, dtype=float)
+        n_probes = min(self.n_probes, len(self.super_codebook))
+        distances = np.empty((len(vectors), k))
+        indices = np.empty((len(vectors), k), dtype=np.intp)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            # nearest super-units and their adjacent blocks, each block once
+            _, probes = _euclid_k_nearest(self.super_codebook, chunk, k=n_probes)
+            blocks = np.sort(self._adjacent[probes].reshape(len(chunk), -1), axis=1)
+            blocks[:, 1:][blocks[:, 1:] == blocks[:, :-1]] = -1
+            candidates = self._members[blocks].reshape(len(chunk), -1)
+            distances[start:start + chunk_size], indices[start:start + chunk_size] = \
+                _rerank_candidates(self.codebook, chunk, candidates, k, self._norms)
+        return _search_missing(self.codebook, vectors, distances, indices)
+
+    def measure_recall(self, vectors, k=1):
+        """
+        Measure the recall of the index against the exact search.
+
+        Parameters
+        ----------
+        vectors: array-like of shape (n_vectors, n_features)
+            The vectors, e.g. a sample of the data points.
+        k: int, default = 1
+            The number of nearest units.
+
+        Returns
+        -------
+        recall: float
+            The fraction of the exact k nearest units that are found by the index.
+        """
+        return _measure_recall(self, self.codebook, vectors, k)
+
+
+def _measure_recall(index, codebook, vectors, k):
+    """
+    Measure the recall of an approximate index against the exact search.
+
+    Parameters
+    ----------
+    index: RandomProjectionForest or HierarchicalCodebook
+        The fitted index.
+    codebook: ndarray of shape (n_units, n_features)
+        The codebook of the index.
+    vectors: array-like of shape (n_vectors, n_features)
+        The vectors, e.g. a sample of the data points.
+    k: int
+        The number of nearest units.
+
+    Returns
+    -------
+    recall: float
+        The fraction of the exact k nearest units that are found by the index.
+    """
+    _, approximate = index.query(vectors, k)
+    _, exact = _euclid_k_nearest(codebook, vectors, k)
+    found = np.any(exact[:, :, None] == approximate[:, None, :], axis=2)
+    return np.mean(found)
+
+
+def _search_missing(codebook, vectors, distances, indices):
+    """
+    Replace the results of the vectors with fewer than k candidates by the exact k nearest units.
+
+    Parameters
+    ----------
+    codebook: ndarray of shape (n_units, n_features)
+        The codebook.
+    vectors: ndarray of shape (n_vectors, n_features)
+        The vectors.
+    distances: ndarray of shape (n_vectors, k)
+        The distances to the k nearest candidates, infinite for missing candidates. Updated in place.
+    indices: ndarray of shape (n_vectors, k)
+        The indices of the k nearest candidates, -1 for missing candidates. Updated in place.
+
+    Returns
+    -------
+    distances: ndarray of shape (n_vectors, k)
+        The distances to the k nearest units.
+    indices: ndarray of shape (n_vectors, k)
+        The indices of the k nearest units.
+    """
+    missing = np.flatnonzero(indices[:, -1] < 0)
+    if len(missing):
+        distances[missing], indices[missing] = _euclid_k_nearest(codebook, vectors[missing], k=indices.shape[1])
+    return distances, indices
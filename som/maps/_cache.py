@@ -0,0 +1,164 @@
+"""
+This module gathers the on-disk cache of trained SOMs.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+
+class TrainingCache:
+    """
+    Cache of trained SOMs in a local directory, keyed by a fingerprint of the data and the training parameters.
+
+    Every entry is a .npz file with the arrays of a trained SOM. Reading an entry marks it as recently used, and
+    whenever the entries grow larger than max_size bytes, the least recently used entries are removed. Entries are
+    written to a temporary file first and then renamed, so several processes can share a cache directory.
+
+    Parameters
+    ----------
+    directory: str
+        The cache directory. Created if it does not exist.
+    max_size: int, default = 1073741824
+        The maximum total size of the entries in bytes (1 GiB). Must be greater than zero.
+    chunk_size: int, default = 16777216
+        The number of bytes of the data hashed at once (16 MiB).
+
+    Attributes
+    ----------
+    hits: int
+        The number of successful lookups.
+    misses: int
+        The number of failed lookups.
+    """
+
+    def __init__(self, directory, max_size=1 << 30, chunk_size=1 << 24):
+        # parameter check
+        if max_size <= 0:
+            raise ValueError("Maximum size must be greater 0")
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be greater 0")
+
+        self.directory = directory
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data, params):
+        """
+        Compute the key of a training.
+
+        Parameters
+        ----------
+        data: array-like of shape (n_samples, n_features)
+            The training data.
+        params: dict
+            The parameters of the training. The values must be serializable as JSON.
+
+        Returns
+        -------
+        key: str
+            The hexadecimal BLAKE2b digest of the data (shape and values) and the parameters.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        data = np.asarray(data, dtype=float)
+        digest.update(str(data.shape).encode())
+        # hash whole rows in C order, so only one chunk of a non-contiguous array is copied at a time
+        rows = max(self.chunk_size // max(8 * int(np.prod(data.shape[1:])), 1), 1)
+        for start in range(0, len(data), rows):
+            digest.update(memoryview(np.ascontiguousarray(data[start:start + rows])).cast("B"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up the arrays of a training.
+
+        Parameters
+        ----------
+        key: str
+            The key of the training, see key.
+
+        Returns
+        -------
+        arrays: dict or None
+            The stored arrays by name, None if the key is not in the cache.
+        """
+        path = self.__path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                arrays = dict(entry)
+            # mark as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return arrays
+
+    def put(self, key, arrays):
+        """
+        Store the arrays of a training and evict the least recently used entries if the cache is too large.
+
+        Parameters
+        ----------
+        key: str
+            The key of the training, see key.
+        arrays: dict
+            The arrays to store by name.
+
+        Returns
+        -------
+        None
+        """
+        handle, temporary = tempfile.mkstemp(suffix=".npz", dir=self.directory)
+        with os.fdopen(handle, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(temporary, self.__path(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is not larger than max_size bytes. The most recent
+        entry is always kept.
+
+        Returns
+        -------
+        None
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz") and not name.startswith("tmp"):
+                status = os.stat(os.path.join(self.directory, name))
+                entries.append((status.st_mtime, status.st_size, name))
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, name in entries[:-1]:
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def __path(self, key):
+        """
+        Get the path of the file of an entry.
+
+        Parameters
+        ----------
+        key: str
+            The key of the entry.
+
+        Returns
+        -------
+        path: str
+            The path of the file.
+        """
+        return os.path.join(self.directory, key + ".npz")
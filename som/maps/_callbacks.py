@@ -0,0 +1,129 @@
+"""
+This module gathers the callback interface for the training of SOMs.
+"""
+
+
+class Callback:
+    """
+    Base class for callbacks that are called during the training of a SOM.
+
+    Derived classes override the hooks they are interested in. The hooks are called at the boundaries of the training
+    phases ("init", "main_loop" and "find_bmu") and every interval iterations of the main loop. Between two calls, the
+    training loop only compares the iteration counter to the next due iteration, so a callback with a large interval
+    adds no measurable overhead.
+
+    Parameters
+    ----------
+    interval: int, default = 100
+        The number of iterations between two calls of on_iteration. Must be greater than zero.
+    """
+
+    def __init__(self, interval=100):
+        # parameter check
+        if interval <= 0:
+            raise ValueError("Interval must be greater 0")
+
+        self.interval = interval
+
+    def on_train_begin(self, som, data, iterations):
+        """
+        Called once before the codebook is initialized.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+        data: ndarray of shape (n_samples, n_features)
+            The training data.
+        iterations: int
+            The requested number of iterations.
+
+        Returns
+        -------
+        None
+        """
+
+    def on_phase_begin(self, som, phase):
+        """
+        Called at the beginning of a phase of the training.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+        phase: {"init", "main_loop", "find_bmu"}
+            The phase of the training.
+
+        Returns
+        -------
+        None
+        """
+
+    def on_phase_end(self, som, phase):
+        """
+        Called at the end of a phase of the training. The timings of the SOM are up to date for all finished phases.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+        phase: {"init", "main_loop", "find_bmu"}
+            The phase of the training.
+
+        Returns
+        -------
+        None
+        """
+
+    def on_iteration(self, som, iteration):
+        """
+        Called every interval iterations of the main loop.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+        iteration: int
+            The number of iterations done so far.
+
+        Returns
+        -------
+        stop: bool
+            True if the training should be stopped, False otherwise.
+        """
+        return False
+
+    def on_train_end(self, som):
+        """
+        Called once after the training has finished.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The trained SOM.
+
+        Returns
+        -------
+        None
+        """
+
+
+def _next_call(callbacks, iteration):
+    """
+    Get the next iteration at which at least one callback is due.
+
+    Parameters
+    ----------
+    callbacks: list of Callback
+        The callbacks.
+    iteration: int
+        The number of iterations done so far.
+
+    Returns
+    -------
+    next_call: int or None
+        The next due iteration, None if there are no callbacks.
+    """
+    if not callbacks:
+        return None
+    return min((iteration // callback.interval + 1) * callback.interval for callback in callbacks)
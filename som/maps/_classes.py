@@ -4,12 +4,18 @@ This module gathers SOM variants that can be trained in this module.
 # Authors: Nikola Dragovic (@nikdra), 27.07.2020
 
 from abc import abstractmethod
+from time import perf_counter
 import numpy as np
 from scipy.spatial import cKDTree
 
-from ._codebook import _init_codebook
-from ._distance import _euclid_distance, _hex_distance
-from ._neighborhood import _gauss_neighborhood, _positions_array_generic_2d, generate_hex_positions
+from ._ann import HierarchicalCodebook
+from ._callbacks import _next_call
+from ._codebook import _init_codebook, _init_codebook_pca, _init_codebook_sample, _interpolate_codebook
+from ._distance import _euclid_distance, _euclid_k_nearest, _hex_distance
+from ._neighborhood import _cartesian_positions, _gauss_neighborhood, _grid_neighbors, _grid_offsets, _grid_window, \
+    _offset_units, _positions_array_generic_2d, generate_hex_positions
+from ._planner import _TILE_ENTRIES, _PeakMemory
+from ._scaling import FeatureScaler, _ScaledView
 from .._util.util import group_by
 
 
@@ -46,9 +52,35 @@ class BaseSOM:
         self.trained = False
         self.bmu_distances = None
         self.bmu_indices = None
+        self.iterations_trained = 0
+        self.convergence_curve = None
+        self.timings = None
+        self.rng = None
+        self.bmu_search_counts = None
+        self.bmu_refresh_counts = None
+        self._bmu_lower_bounds = None
+        self._bmu_codebook = None
+        self.bmu_engine = "kdtree"
+        self.bmu_recall = None
+        self._bmu_index = None
+        self.cache_hit = False
+        self.scaler = None
+        self.bmu_chunk_size = None
+        self.resource_usage = None
 
     @abstractmethod
-    def train(self, data, iterations=10000, alpha=0.95, random_seed=1, codebook=None):
+    def train(self, data, iterations=10000, alpha=0.95, random_seed=1, codebook=None, init="random",
+              monitor=None, callbacks=None, neighborhood_radius=None, bmu_search="full", search_radius=2,
+              local_search_start=0.5, incremental_bmus=False, bmu_engine="kdtree", cache=None,
+              scaling=None, codebook_file=None, plan=None):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def predict(self, data):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def kneighbors(self, data, k=1):
         raise NotImplementedError()
 
     @abstractmethod
@@ -101,6 +133,45 @@ class StandardSOM(BaseSOM):
         An array that contains the distances to the two BMU in the SOM for each data point
     bmu_indices: ndarray of shape (n_data, 2)
         An array that contains the indices of the positions of the two BMU in the SOM data point
+    iterations_trained: int
+        The number of iterations of the last training. Smaller than the requested iterations if the training was
+        stopped early.
+    convergence_curve: DataFrame or None
+        The quantization (and topographic) errors recorded by the convergence monitor during the last training.
+    timings: dict or None
+        The accumulated time in seconds spent in each phase of the last training: "init", "sampling", "bmu_search",
+        "neighborhood", "update" and "find_bmu". "sampling" to "update" are the steps of the main loop.
+    rng: Generator or None
+        The random number generator of the last training, seeded with its random seed.
+    bmu_search_counts: dict or None
+        The number of iterations of the last training in which the BMU was found by a "full" scan or by the
+        approximate "local" search.
+    bmu_refresh_counts: dict or None
+        The number of data points whose BMUs were "kept" or "requeried" by the last incremental re-assignment.
+    bmu_engine: {"kdtree", "brute", "hierarchical"} or index
+        The search for the BMUs of the data after the training and in predict.
+    bmu_recall: float or None
+        The recall of the first BMUs of an approximate BMU engine, measured against the exact search on a sample of
+        the training data. None for exact engines.
+    cache_hit: bool
+        True if the last training was loaded from a training cache, False otherwise.
+    scaler: FeatureScaler or None
+        The scaling of the features of the last training. If set, the codebook, the BMU distances and the input of the
+        callbacks are in the space of the scaled features, and the data is scaled on the fly in every BMU search.
+    bmu_chunk_size: int or None
+        The number of data points searched at once in every BMU search, set by the plan of the last training. If None,
+        all data points at once (one chunk of the scaler if the SOM has one).
+    resource_usage: dict or None
+        The "estimated_peak_bytes" and "estimated_seconds" of the plan of the last training next to the actual
+        "peak_bytes" and "seconds". None if the last training was not planned.
+
+    Notes
+    -----
+    Every random draw of the training goes through the random number generator of the SOM, and the training only
+    modifies the state of the SOM itself. Several StandardSOM instances can therefore be trained concurrently, e.g. in
+    a ThreadPoolExecutor, and each result is the same as if it was trained alone with the same random seed. How much
+    the threads overlap depends on the time spent in NumPy and SciPy kernels that release the GIL, which grows with
+    the size of the map and the number of features. A single instance must not be trained by two threads at once.
     """
 
     def get_first_bmus(self):
@@ -163,7 +234,10 @@ class StandardSOM(BaseSOM):
         # set distance function in output space
         self.output_space_distance = self.__output_distance()
 
-    def train(self, data, iterations=10000, alpha=0.95, random_seed=1, codebook=None):
+    def train(self, data, iterations=10000, alpha=0.95, random_seed=1, codebook=None, init="random",
+              monitor=None, callbacks=None, neighborhood_radius=None, bmu_search="full", search_radius=2,
+              local_search_start=0.5, incremental_bmus=False, bmu_engine="kdtree", cache=None,
+              scaling=None, codebook_file=None, plan=None):
         """
         Train the standard rectangular SOM using the iterative algorithm.
 
@@ -177,10 +251,78 @@ class StandardSOM(BaseSOM):
             The learning parameter. Decreases linearly towards zero with increasing iterations. Must be greater than
             zero.
         random_seed: int, default = 1
-            The random seed for the algorithm as well as the initialization of the codebook.
+            The random seed for the algorithm as well as the initialization of the codebook. Seeds the random number
+            generator of the SOM (rng); the global random state of NumPy is neither used nor changed.
         codebook: DataFrame of shape (n_units, n_features), default = "None"
-            The initial codebook for the SOM. If not set, the SOM will be initialized with random values in the range of
-            the minimum of a feature value to its maximum.
+            The initial codebook for the SOM. If not set, the SOM will be initialized according to init.
+        init: {"random", "sample", "pca"}, default = "random"
+            The initialization of the codebook if no codebook is given. "random" draws random values in the range of
+            the minimum of a feature value to its maximum. "sample" draws random data points. "pca" spreads the units
+            linearly along the plane of the first two principal components of the data. A linearly initialized map is
+            already ordered, so it usually needs far fewer iterations and a smaller neighborhood radius.
+        monitor: ConvergenceMonitor, default = None
+            Monitors the quantization error on a validation subsample during training and stops the training early
+            once the map has converged. The recorded curve is stored in convergence_curve.
+        callbacks: list of Callback, default = None
+            Callbacks that are called at the phase boundaries of the training and every few iterations, e.g. for
+            progress reporting. A callback can stop the training early.
+        neighborhood_radius: float, default = None
+            The initial neighborhood radius for this training, e.g. a small radius to refine an already ordered
+            codebook. Must be greater than zero. If None, the neighborhood radius of the SOM is used.
+        bmu_search: {"full", "local"}, default = "full"
+            The search for the BMU in each iteration. "full" scans all units. "local" is an approximate search: it
+            remembers the last BMU of each data point and, late in the training, first searches the units within
+            search_radius around it on the grid. Only if the best unit lies on the border of this window, all units
+            are scanned. The neighborhood and the update are then also restricted to the units with a neighborhood
+            above 1e-6, which lie within a fixed distance of the BMU on the grid, so an iteration depends on the size
+            of the neighborhood rather than on the size of the map. The border check is a heuristic, not a bound on
+            the distances of the units outside of the window: it assumes that the distance to the data point has no
+            other minimum on the map than the one found around the last BMU, which only roughly holds for an ordered
+            map. A unit outside of the window can be closer, and then the best unit inside the window is used instead.
+            A sound bound would need the distances of the units outside of the window to the current codebook, which
+            cost as much as the full scan. The BMUs of the data after the training are always found with bmu_engine.
+        search_radius: float, default = 2
+            The radius of the grid window of the local search. Must be at least one.
+        local_search_start: float, default = 0.5
+            The fraction of the iterations after which the local search is used. Must be in [0, 1].
+        incremental_bmus: bool, default = False
+            Whether to re-assign the BMUs of the data incrementally after the training, see refresh_bmus. Useful for
+            warm-started training rounds on the same data: the first round keeps the bounds, the following rounds
+            only search the BMUs of the data points whose bounds do not rule out a change. The BMUs and bounds are
+            found with an exact search, also with an approximate bmu_engine.
+        bmu_engine: {"kdtree", "brute", "hierarchical"} or index, default = "kdtree"
+            The search for the BMUs of the data after the training and in predict. "kdtree" uses a KD-Tree, which is
+            fast for low-dimensional data. "brute" computes all distances with matrix products, which is faster for
+            high-dimensional data. "hierarchical" first searches a coarse codebook of 4x4 blocks of units and then
+            only the units of the best block and its adjacent blocks, see HierarchicalCodebook. An approximate
+            nearest neighbor index such as RandomProjectionForest trades a little accuracy for speed on large,
+            high-dimensional codebooks; its measured recall is stored in bmu_recall. Any object with the methods
+            fit(codebook) and query(vectors, k) can be used.
+        cache: TrainingCache, default = None
+            Looks up the training in the cache by a fingerprint of the data and all parameters that influence the
+            result, and stores the trained SOM in the cache otherwise. A cached training restores the codebook, the
+            BMUs and the number of iterations without training; timings and bmu_search_counts are None then. The
+            cache is not used with callbacks or a monitor, which observe or stop the training, with an index object as
+            BMU engine, with a codebook file or without a random seed.
+        scaling: {"standard", "minmax"} or FeatureScaler, default = None
+            The scaling of the features. The scaler is fitted in one chunked pass over the data, and every data point
+            is scaled when it is drawn in the training and in every BMU search, including predict, so no scaled copy
+            of the data is made. A fitted FeatureScaler is used as it is. The codebook is in the space of the scaled
+            features, see FeatureScaler.inverse_transform. If None, the features are used as they are.
+        codebook_file: str, default = None
+            The path of a .npy file for a memory-mapped codebook, e.g. for maps larger than the memory. The codebook
+            is initialized, updated and searched in tiles of rows directly in the file, which can be opened again
+            with numpy.load(codebook_file, mmap_mode="r"). The updates skip the units with a zero neighborhood, so
+            late iterations with a small radius only touch the pages of the units near the BMU; the result is the
+            same as in memory. The "kdtree" engine copies the codebook into memory, so the BMU engine "brute" is used
+            instead, which scans the codebook block by block. Incremental BMUs are not supported.
+            If None, the codebook is kept in memory.
+        plan: TrainingPlan, default = None
+            A plan of the training, see plan_training. The BMU engine and the chunk size of the BMU search of the plan
+            are used instead of bmu_engine, and the actual peak memory and runtime are stored next to the estimates in
+            resource_usage. On Linux, the peak memory is the increase of the peak resident set size of the process;
+            elsewhere, it is measured with tracemalloc, which slows down the training. A plan with a memory-mapped
+            codebook needs a codebook_file.
 
         Returns
         -------
@@ -205,46 +347,558 @@ class StandardSOM(BaseSOM):
             raise ValueError("Learning parameter must be greater 0")
         if data is None:
             raise ValueError("Data is None")
+        if init not in ["random", "sample", "pca"]:
+            raise ValueError("Initialization " + str(init) + " not supported")
+        if neighborhood_radius is None:
+            neighborhood_radius = self.neighborhood_radius
+        if neighborhood_radius <= 0:
+            raise ValueError("Neighborhood radius smaller or equal 0. Must be greater than 0")
+        if isinstance(bmu_engine, str) and bmu_engine not in ["kdtree", "brute", "hierarchical"]:
+            raise ValueError("BMU engine " + str(bmu_engine) + " not supported")
+        if bmu_search not in ["full", "local"]:
+            raise ValueError("BMU search " + str(bmu_search) + " not supported")
+        if search_radius < 1:
+            raise ValueError("Search radius must be at least 1")
+        if not 0 <= local_search_start <= 1:
+            raise ValueError("Start of the local search must be in [0, 1]")
+        if codebook is not None and np.shape(codebook) != (len(self.positions), data.shape[1]):
+            raise ValueError("codebook must be of shape (n_units, n_features)")
+        if isinstance(scaling, str) and scaling not in ["standard", "minmax"]:
+            raise ValueError("Scaling " + str(scaling) + " not supported")
+        if codebook_file is not None and incremental_bmus:
+            raise ValueError("Incremental BMUs are not supported with a codebook file")
+        if plan is not None and plan.use_codebook_file and codebook_file is None:
+            raise ValueError("The plan needs a codebook file")
+
+        callbacks = list(callbacks or [])
+        if monitor is not None:
+            callbacks.append(monitor)
+        self.convergence_curve = None
+        timings = dict.fromkeys(["init", "sampling", "bmu_search", "neighborhood", "update", "find_bmu"], 0.)
+        self.timings = timings
+        self.resource_usage = None
+        if plan is not None:
+            bmu_engine = plan.bmu_engine
+            self.bmu_chunk_size = plan.chunk_size
+        if codebook_file is not None and bmu_engine == "kdtree":
+            bmu_engine = "brute"
+        self.bmu_engine = bmu_engine
+        self._bmu_index = None
+
+        # measure the peak memory and the runtime of a planned training
+        usage = None
+        if plan is not None:
+            usage = (_PeakMemory().start(), perf_counter())
+
+        # random number generator of this SOM, used for every random draw of the training
+        self.rng = np.random.default_rng(random_seed)
+        # one float array of the data for the scaling, the cache key, the training and the BMU search, a view of the
+        # DataFrame without a copy if all its columns are floats
+        samples = np.asarray(data, dtype=float)
 
-        # set random seed
-        np.random.seed(random_seed)
+        # fit the scaling of the features, the data itself is scaled on the fly
+        scaler = FeatureScaler(scaling) if isinstance(scaling, str) else scaling
+        if scaler is not None and not scaler.fitted:
+            scaler.fit(samples)
+        self.scaler = scaler
 
+        # look up the training in the cache
+        cache_key = None
+        self.cache_hit = False
+        if cache is not None and not callbacks and isinstance(bmu_engine, str) and random_seed is not None and \
+                codebook_file is None:
+            cache_key = cache.key(samples, {
+                "som": type(self).__name__, "map_size": self.map_size, "topology": self.topology,
+                "neighborhood_type": self.neighborhood_type, "distance_measure": self.distance_measure,
+                "neighborhood_radius": float(neighborhood_radius), "alpha": float(alpha),
+                "iterations": int(iterations), "random_seed": int(random_seed), "init": init,
+                "codebook": None if codebook is None else cache.key(codebook, {}), "bmu_search": bmu_search,
+                "search_radius": float(search_radius), "local_search_start": float(local_search_start),
+                "incremental_bmus": bool(incremental_bmus), "bmu_engine": bmu_engine,
+                "scaling": None if scaler is None else cache.key(np.stack((scaler.offset, scaler.scale)), {})})
+            arrays = cache.get(cache_key)
+            if arrays is not None:
+                self.__restore(arrays)
+                self.__record_usage(plan, usage)
+                return self
+
+        for callback in callbacks:
+            callback.on_train_begin(self, samples if scaler is None else _ScaledView(samples, scaler), iterations)
+            callback.on_phase_begin(self, "init")
+        start = perf_counter()
+
+        # the codebook is written tile by tile into the memory-mapped file
+        out = tile = None
+        if codebook_file is not None:
+            out = np.lib.format.open_memmap(codebook_file, mode="w+", dtype=float,
+                                            shape=(len(self.positions), samples.shape[1]))
+            tile = self.__tile_size(samples.shape[1])
         # no custom initialization of the codebook given
         if codebook is None:
-            # initialize codebook with random values
-            self.codebook = _init_codebook(self.map_size[0] * self.map_size[1], data.to_numpy())
+            self.codebook = self._initialize_codebook(samples, init, out)
+        elif out is None:
+            self.codebook = np.array(codebook, dtype=float)
+        else:
+            codebook = np.asarray(codebook, dtype=float)
+            for row in range(0, len(out), tile):
+                out[row:row + tile] = codebook[row:row + tile]
+            self.codebook = out
 
         # initialize arrays of alphas and radii - decrease linearly with increasing iterations
         alphas = np.linspace(alpha, 0, num=iterations, endpoint=False)
-        radii = np.linspace(self.neighborhood_radius, 0, num=iterations, endpoint=False)
+        radii = np.linspace(neighborhood_radius, 0, num=iterations, endpoint=False)
+        # draw the indices of the data points for all iterations at once
+        rows = self.rng.integers(len(samples), size=iterations)
+
+        # the local search needs the grid windows and the last BMU of each data point (-1 if not seen yet)
+        local_start = iterations
+        window = last_bmus = update_offsets = border = None
+        if bmu_search == "local":
+            local_start = int(local_search_start * iterations)
+            window = _grid_window(self.map_size, self.topology, search_radius)
+            # fill the offsets outside of the grid with the unit itself
+            window = np.where(window < 0, np.arange(len(window))[:, None], window)
+            last_bmus = np.full(len(samples), -1, dtype=np.int32)
+            if local_start < iterations:
+                # the normalized neighborhood is at most exp(-d^2 / (2 r^2)), so all units with a neighborhood above
+                # 1e-6 lie within this distance of the BMU for the radius of the local search and all smaller ones
+                update_offsets = _grid_offsets(self.topology, radii[local_start] * np.sqrt(2 * np.log(1e6)))
+                if len(update_offsets) >= len(self.positions):
+                    # the distance spans the map, all units are used
+                    update_offsets = None
+                # the farthest unit from any unit, which has the minimum of the neighborhood, lies on the border
+                border = np.flatnonzero(np.any(_grid_neighbors(self.map_size, self.topology) < 0, axis=1))
+        self.bmu_search_counts = {"full": 0, "local": 0}
+
+        timings["init"] = perf_counter() - start
+        for callback in callbacks:
+            callback.on_phase_end(self, "init")
+            callback.on_phase_begin(self, "main_loop")
 
         # main training loop
+        # the callbacks are only checked when the next one is due
+        next_call = _next_call(callbacks, 0)
+        sampling = bmu_search = neighborhood_time = update = 0.
+        i = 0
+        t_start = perf_counter()
         for i in range(iterations):
             # get data point
-            x = data.sample().to_numpy()
-            # calculate distance in input space
-            d = self.input_space_distance(self.codebook, x)
-            # get index of unit with minimum distance
-            ind = np.unravel_index(np.argmin(d), d.shape)
+            x = samples[rows[i]]
+            if scaler is not None:
+                x = (x - scaler.offset) / scaler.scale
+            t_sampled = perf_counter()
+            ind = -1
+            if i >= local_start and last_bmus[rows[i]] >= 0:
+                # search the grid window around the last BMU of the data point
+                last = last_bmus[rows[i]]
+                candidates = window[last]
+                ind = candidates[np.argmin(self.input_space_distance(self.codebook[candidates], x))]
+                # fall back to the full scan if the best unit lies on the border of the window, a heuristic: a closer
+                # unit outside of the window is missed if the best unit inside lies away from the border
+                if self.output_space_distance(self.positions[ind], self.positions[last]) + 1 > search_radius:
+                    ind = -1
+                else:
+                    self.bmu_search_counts["local"] += 1
+            if ind < 0 and out is not None:
+                # scan the memory-mapped codebook tile by tile
+                ind = self.__tiled_argmin(x, tile)
+                self.bmu_search_counts["full"] += 1
+            elif ind < 0:
+                # calculate distance in input space
+                d = self.input_space_distance(self.codebook, x)
+                # get index of unit with minimum distance
+                ind = np.argmin(d)
+                self.bmu_search_counts["full"] += 1
+            if last_bmus is not None:
+                last_bmus[rows[i]] = ind
+            t_searched = perf_counter()
             # get position of unit with minimum distance
             bmu = self.positions[ind]
-            # get distances of BMU to all units in output space
-            neighborhood_distances = self.output_space_distance(self.positions, bmu)
-            # get neighborhood
-            neighborhood = self.neighborhood_function(neighborhood_distances, radii[i])
+            if i >= local_start and update_offsets is not None:
+                # only the units around the BMU, normalized with the distance of the farthest unit as on all units
+                units = _offset_units(self.map_size, self.topology, update_offsets, [ind])[0]
+                units = units[units >= 0]
+                neighborhood_distances = np.append(self.output_space_distance(self.positions[units], bmu),
+                                                   np.max(self.output_space_distance(self.positions[border], bmu)))
+                neighborhood = self.neighborhood_function(neighborhood_distances, radii[i])[:-1]
+            else:
+                # get distances of BMU to all units in output space
+                neighborhood_distances = self.output_space_distance(self.positions, bmu)
+                # get neighborhood
+                neighborhood = self.neighborhood_function(neighborhood_distances, radii[i])
+            t_neighborhood = perf_counter()
             # update
-            self.codebook = self.codebook + alphas[i] * neighborhood[:, None] * (x - self.codebook)
+            if i >= local_start:
+                # only the units with a non-negligible neighborhood
+                active = np.flatnonzero(neighborhood > 1e-6)
+                units = active if update_offsets is None else units[active]
+                self.codebook[units] += alphas[i] * neighborhood[active, None] * (x - self.codebook[units])
+            elif out is not None:
+                # in place and tile by tile, units with a zero neighborhood are unchanged
+                active = np.flatnonzero(neighborhood)
+                for row in range(0, len(active), tile):
+                    units = active[row:row + tile]
+                    self.codebook[units] += alphas[i] * neighborhood[units, None] * (x - self.codebook[units])
+            else:
+                self.codebook = self.codebook + alphas[i] * neighborhood[:, None] * (x - self.codebook)
+            t_updated = perf_counter()
+            sampling += t_sampled - t_start
+            bmu_search += t_searched - t_sampled
+            neighborhood_time += t_neighborhood - t_searched
+            update += t_updated - t_neighborhood
+            t_start = t_updated
+            # call the callbacks that are due
+            if i + 1 == next_call:
+                timings.update(sampling=sampling, bmu_search=bmu_search, neighborhood=neighborhood_time,
+                               update=update)
+                stop = False
+                for callback in callbacks:
+                    if (i + 1) % callback.interval == 0:
+                        stop = bool(callback.on_iteration(self, i + 1)) or stop
+                if stop:
+                    break
+                next_call = _next_call(callbacks, i + 1)
+                t_start = perf_counter()
+        self.iterations_trained = i + 1
+        if out is not None:
+            out.flush()
+        timings.update(sampling=sampling, bmu_search=bmu_search, neighborhood=neighborhood_time, update=update)
+
+        for callback in callbacks:
+            callback.on_phase_end(self, "main_loop")
+            callback.on_phase_begin(self, "find_bmu")
+        start = perf_counter()
 
         # find the first and second BMU for each data point
-        # TODO adapt when other distance measures for input space are implemented
-        p = 2
-        self.__find_bmu(data, p)
+        self._complete_training(samples, incremental_bmus)
 
-        # finished training
-        self.trained = True
+        timings["find_bmu"] = perf_counter() - start
+        for callback in callbacks:
+            callback.on_phase_end(self, "find_bmu")
+        for callback in callbacks:
+            callback.on_train_end(self)
+        if cache_key is not None:
+            cache.put(cache_key, self.__cached_arrays())
+        self.__record_usage(plan, usage)
+        return self
+
+    def train_multiresolution(self, data, levels=3, iterations=10000, alpha=0.95, random_seed=1, init="random",
+                              refine_factor=0.5):
+        """
+        Train the SOM coarse-to-fine on maps of increasing size.
+
+        A small map is trained first. Its codebook is interpolated to the next larger map, which continues the
+        training with a smaller neighborhood radius and learning parameter, and so on until the size of this SOM is
+        reached. The global ordering is thus established on small maps, where an iteration is cheap, and the large
+        map only needs to refine the local structure.
+
+        Parameters
+        ----------
+        data: DataFrame of shape (n_samples, n_features)
+            Data to train the SOM. Should not contain the class labels for interpretable results.
+        levels: int or list of (int, int), default = 3
+            The number of levels, where the height and width of the map are halved from one level to the next
+            coarser one. Alternatively, the map sizes of the coarser levels in increasing order. The size of this SOM
+            is always the last level. Must be greater than zero.
+        iterations: int or list of int, default = 10000
+            The number of iterations per level, either the same for all levels or one value per level. Must be
+            greater than zero.
+        alpha: double, default = 0.95
+            The learning parameter of the coarsest level. Must be greater than zero.
+        random_seed: int, default = 1
+            The random seed of the training. Each level is trained with a different seed derived from it.
+        init: {"random", "sample", "pca"}, default = "random"
+            The initialization of the codebook of the coarsest level.
+        refine_factor: float, default = 0.5
+            The factor for the neighborhood radius and the learning parameter of the finer levels. Must be in (0, 1].
+
+        Returns
+        -------
+        self: StandardSOM
+            Fitted SOM
+
+        Notes
+        -----
+        The neighborhood radius of this SOM refers to the grid of the full map. On a coarser level, it is scaled with
+        the ratio of the map sizes, so it covers the same part of the map. On the finer levels, the scaled radius and
+        the learning parameter are additionally multiplied with the refine factor.
+        """
+        # parameter check
+        if isinstance(levels, int):
+            if levels <= 0:
+                raise ValueError("Levels must be greater 0")
+            map_sizes = [tuple(int(max(min(2, size), np.ceil(size / 2 ** (levels - 1 - level))))
+                               for size in self.map_size) for level in range(levels)]
+        else:
+            map_sizes = [tuple(map_size) for map_size in levels]
+            if not map_sizes or map_sizes[-1] != self.map_size:
+                map_sizes.append(self.map_size)
+        iterations = np.atleast_1d(iterations)
+        if len(iterations) not in [1, len(map_sizes)]:
+            raise ValueError("iterations must be an int or have one value per level")
+        iterations = np.broadcast_to(iterations, len(map_sizes))
+        if not 0 < refine_factor <= 1:
+            raise ValueError("Refine factor must be in (0, 1]")
+
+        codebook = None
+        coordinates = None
+        for level, (map_size, level_iterations) in enumerate(zip(map_sizes, iterations)):
+            # the last level is this SOM
+            som = self if level == len(map_sizes) - 1 else StandardSOM(map_size, self.neighborhood_radius,
+                                                                       self.topology, self.neighborhood_type,
+                                                                       self.distance_measure)
+            level_coordinates = _cartesian_positions(som.positions, self.topology)
+            # scale the radius with the size of the map
+            radius = self.neighborhood_radius * max(np.divide(map_size, self.map_size))
+            level_alpha = alpha
+            if codebook is not None:
+                codebook = _interpolate_codebook(codebook, coordinates, level_coordinates)
+                radius = radius * refine_factor
+                level_alpha = alpha * refine_factor
+            som.train(data, iterations=int(level_iterations), alpha=level_alpha, random_seed=random_seed + level,
+                      codebook=codebook, init=init, neighborhood_radius=radius)
+            codebook, coordinates = som.codebook, level_coordinates
+        return self
+
+    def _initialize_codebook(self, samples, init, out=None):
+        """
+        Initialize the codebook with the random number generator of the SOM. If the SOM has a scaler, the codebook is
+        initialized in the space of the scaled features.
+
+        Parameters
+        ----------
+        samples: ndarray of shape (n_samples, n_features)
+            Data to train the SOM.
+        init: {"random", "sample", "pca"}
+            The initialization of the codebook.
+        out: ndarray of shape (n_units, n_features), default = None
+            The array to write the codebook into tile by tile, e.g. a memory-mapped array. If None, a new array is
+            returned.
+
+        Returns
+        -------
+        codebook: ndarray of shape (n_units, n_features)
+            The initialized codebook.
+        """
+        n_units = self.map_size[0] * self.map_size[1]
+        tile = n_units if out is None else self.__tile_size(samples.shape[1])
+        if init == "pca":
+            # initialize codebook along the first two principal components, of the scaled data chunk by chunk
+            if self.scaler is not None:
+                samples = _ScaledView(samples, self.scaler)
+            return _init_codebook_pca(_cartesian_positions(self.positions, self.topology), samples, self.rng,
+                                      out=out, tile_size=tile)
+        if init == "random":
+            # initialize codebook with random values
+            codebook = _init_codebook(n_units, samples, self.rng, out, tile)
+        else:
+            # initialize codebook with random data points
+            codebook = _init_codebook_sample(n_units, samples, self.rng, out, tile)
+        # both initializations commute with the scaling of the features
+        if self.scaler is not None:
+            for start in range(0, n_units, tile):
+                codebook[start:start + tile] = self.scaler.transform(codebook[start:start + tile])
+        return codebook
+
+    def predict(self, data):
+        """
+        Find the BMU of each data point, e.g. to score new data with a trained SOM.
+
+        The search uses the BMU engine of the last training, and its index is built only once per codebook.
+
+        Parameters
+        ----------
+        data: DataFrame or array-like of shape (n_samples, n_features)
+            The data points.
+
+        Returns
+        -------
+        bmus: ndarray of size n_samples
+            The index of the BMU of each data point in the positions array.
+        """
+        if not self.trained:
+            raise ValueError("SOM is not trained")
+        return self.__query_bmus(np.asarray(data, dtype=float), 1, self.__minkowski_p())[1][:, 0]
+
+    def kneighbors(self, data, k=1):
+        """
+        Find the k best-matching units of each data point, e.g. for a smoothed data histogram.
+
+        The search uses the BMU engine of the last training, like predict.
+
+        Parameters
+        ----------
+        data: DataFrame or array-like of shape (n_samples, n_features)
+            The data points.
+        k: int, default = 1
+            The number of BMUs. Must be between one and the number of units.
+
+        Returns
+        -------
+        distances: ndarray of shape (n_samples, k)
+            The distances to the k BMUs, in increasing order.
+        indices: ndarray of shape (n_samples, k)
+            The indices of the k BMUs in the positions array.
+        """
+        if not self.trained:
+            raise ValueError("SOM is not trained")
+        if not 1 <= k <= len(self.positions):
+            raise ValueError("k must be between 1 and the number of units")
+        return self.__query_bmus(np.asarray(data, dtype=float), k, self.__minkowski_p())
+
+    def refresh_bmus(self, data):
+        """
+        Re-assign the first and second BMU of each data point after the codebook has changed, e.g. after a warm-started
+        training round.
+
+        If the BMUs of the same data were last found with bounds (see the incremental_bmus parameter of train), only
+        the data points whose bounds can no longer rule out a change of the BMUs are searched again, in the style of
+        Hamerly's k-means. For every data point, the distances to its two BMUs are bounded from above by adding the
+        drift of the two units since the last assignment, and the distance to every other unit is bounded from below
+        by the distance to its third-nearest unit minus the largest drift of any unit. If the upper bounds do not
+        exceed the lower bound, the two BMUs are unchanged and only their distances are recomputed. Otherwise, the
+        BMUs of the data point are searched from scratch. The bounds are only sound for exact distances, so the BMUs
+        and bounds are always found with an exact search ("brute" if the bmu_engine is approximate). The result is the
+        same as the one of a full exact search. The recall of an approximate bmu_engine is measured afterwards, see
+        bmu_recall.
+
+        The data must be the same data (in the same order) as in the last assignment. Only the number of data points
+        is checked.
+
+        Parameters
+        ----------
+        data: DataFrame or array-like of shape (n_samples, n_features)
+            Data to train the SOM. Should not contain the class labels for interpretable results.
+
+        Returns
+        -------
+        self: StandardSOM
+            SOM with re-assigned BMUs
+        """
+        if self._bmu_lower_bounds is None or len(self._bmu_lower_bounds) != len(data):
+            self.__find_bmu(data, self.__minkowski_p(), bounds=True)
+            self.bmu_refresh_counts = {"kept": 0, "requeried": len(data)}
+            return self
+
+        samples = np.asarray(data, dtype=float)
+        # drift of each unit since the last assignment
+        drift = _euclid_distance(self.codebook, self._bmu_codebook)
+        upper = self.bmu_distances + drift[self.bmu_indices]
+        lower = self._bmu_lower_bounds - np.max(drift)
+        unchanged = np.max(upper, axis=1) <= lower
+
+        # the BMUs are the same, recompute their exact distances in chunks and restore their order
+        kept = np.flatnonzero(unchanged)
+        for start in range(0, len(kept), 65536):
+            rows = kept[start:start + 65536]
+            distances = _euclid_distance(self.codebook[self.bmu_indices[rows]], self.__scale(samples[rows])[:, None, :])
+            order = np.argsort(distances, axis=1, kind="stable")
+            self.bmu_distances[rows] = np.take_along_axis(distances, order, axis=1)
+            self.bmu_indices[rows] = np.take_along_axis(self.bmu_indices[rows], order, axis=1)
+        self._bmu_lower_bounds[kept] = lower[kept]
+
+        # search the BMUs of the remaining data points from scratch
+        requeried = np.flatnonzero(~unchanged)
+        if len(requeried) > 0:
+            distances, indices = self.__query_bmus(samples[requeried], 3, self.__minkowski_p(), exact=True)
+            self.bmu_distances[requeried] = distances[:, :2]
+            self.bmu_indices[requeried] = indices[:, :2]
+            self._bmu_lower_bounds[requeried] = distances[:, 2]
+        self._bmu_codebook = self.codebook.copy()
+        self.__measure_recall(samples)
+        self.bmu_refresh_counts = {"kept": len(kept), "requeried": len(requeried)}
         return self
 
-    def __find_bmu(self, data, p):
+    def _complete_training(self, data, incremental_bmus=False):
+        """
+        Find the first and second BMU for each data point with the current codebook and mark the SOM as trained.
+
+        Parameters
+        ----------
+        data: DataFrame or array-like of shape (n_samples, n_features)
+            Data to train the SOM. Should not contain the class labels for interpretable results.
+        incremental_bmus: bool, default = False
+            Whether to re-assign the BMUs incrementally, see refresh_bmus.
+
+        Returns
+        -------
+        None
+        """
+        if incremental_bmus:
+            self.refresh_bmus(data)
+        else:
+            self.__find_bmu(data, self.__minkowski_p())
+        self.trained = True
+
+    def __record_usage(self, plan, usage):
+        """
+        Store the actual peak memory and runtime of a planned training next to the estimates of the plan.
+
+        Parameters
+        ----------
+        plan: TrainingPlan or None
+            The plan of the training. Nothing is recorded if None.
+        usage: (_PeakMemory, float)
+            The started measurement of the peak memory and the time at the start of the training.
+
+        Returns
+        -------
+        None
+        """
+        if plan is None:
+            return
+        self.resource_usage = {"estimated_peak_bytes": plan.peak_bytes, "peak_bytes": usage[0].stop(),
+                               "estimated_seconds": plan.seconds, "seconds": perf_counter() - usage[1]}
+
+    def __cached_arrays(self):
+        """
+        Get the arrays of the trained SOM for the training cache.
+
+        Returns
+        -------
+        arrays: dict
+            The arrays by name.
+        """
+        arrays = {"codebook": self.codebook, "bmu_distances": self.bmu_distances, "bmu_indices": self.bmu_indices,
+                  "iterations_trained": np.array(self.iterations_trained)}
+        if self.bmu_recall is not None:
+            arrays["bmu_recall"] = np.array(self.bmu_recall)
+        if self._bmu_lower_bounds is not None:
+            arrays["bmu_lower_bounds"] = self._bmu_lower_bounds
+        if self.scaler is not None:
+            arrays.update(scaling=np.array(self.scaler.method), scaler_offset=self.scaler.offset,
+                          scaler_scale=self.scaler.scale)
+        return arrays
+
+    def __restore(self, arrays):
+        """
+        Restore the trained SOM from the arrays of the training cache.
+
+        Parameters
+        ----------
+        arrays: dict
+            The arrays by name, see __cached_arrays.
+
+        Returns
+        -------
+        None
+        """
+        self.codebook = arrays["codebook"]
+        self.bmu_distances = arrays["bmu_distances"]
+        self.bmu_indices = arrays["bmu_indices"]
+        self.iterations_trained = int(arrays["iterations_trained"])
+        self.bmu_recall = float(arrays["bmu_recall"]) if "bmu_recall" in arrays else None
+        self._bmu_lower_bounds = arrays.get("bmu_lower_bounds")
+        self._bmu_codebook = None if self._bmu_lower_bounds is None else self.codebook.copy()
+        self.timings = self.bmu_search_counts = self.bmu_refresh_counts = None
+        self.scaler = None
+        if "scaling" in arrays:
+            self.scaler = FeatureScaler(str(arrays["scaling"]))
+            self.scaler.offset, self.scaler.scale = arrays["scaler_offset"], arrays["scaler_scale"]
+        self.cache_hit = True
+        self.trained = True
+
+    def __find_bmu(self, data, p, bounds=False):
         """
         Find the first and second BMU for each data point. The result is stored in the RectangularSOM.
 
@@ -257,19 +911,175 @@ class StandardSOM(BaseSOM):
 
         Parameters
         ----------
-        data: DataFrame of shape (n_samples, n_features)
+        data: DataFrame or array-like of shape (n_samples, n_features)
             Data to train the SOM. Should not contain the class labels for interpretable results.
         p: float, 1 <= p <= infinity
             Which Minkowski p-norm to use. 1 is the sum-of-absolute-values “Manhattan” distance 2 is the usual Euclidean
             distance infinity is the maximum-coordinate-difference distance A finite large p may cause a ValueError if
             overflow can occur.
+        bounds: bool, default = False
+            Whether to also keep the distances to the third BMU and a copy of the codebook as bounds for refresh_bmus.
+            The BMUs are then found with an exact search.
 
         Returns
         -------
         None
         """
-        tree = cKDTree(self.codebook)
-        self.bmu_distances, self.bmu_indices = tree.query(data, k=2, p=p)
+        samples = np.asarray(data, dtype=float)
+        if bounds:
+            distances, indices = self.__query_bmus(samples, 3, p, exact=True)
+            self.bmu_distances, self.bmu_indices = distances[:, :2], indices[:, :2]
+            self._bmu_lower_bounds = distances[:, 2]
+            self._bmu_codebook = self.codebook.copy()
+        else:
+            self.bmu_distances, self.bmu_indices = self.__query_bmus(samples, 2, p)
+            self._bmu_lower_bounds = self._bmu_codebook = None
+        self.__measure_recall(samples)
+
+    def __measure_recall(self, samples):
+        """
+        Measure the recall of an approximate BMU engine on a sample of the data and store it in bmu_recall. None for
+        an exact BMU engine.
+
+        Parameters
+        ----------
+        samples: ndarray of shape (n_samples, n_features)
+            The unscaled data points.
+
+        Returns
+        -------
+        None
+        """
+        self.bmu_recall = None
+        index = self.__bmu_index()
+        if hasattr(index, "measure_recall"):
+            rng = self.rng if self.rng is not None else np.random.default_rng()
+            rows = rng.choice(len(samples), size=min(1000, len(samples)), replace=False)
+            self.bmu_recall = index.measure_recall(self.__scale(samples[rows]), k=1)
+
+    def __bmu_index(self):
+        """
+        Get the index of the current codebook for the BMU engine. The index is built once per codebook.
+
+        Returns
+        -------
+        index: cKDTree, object or None
+            The fitted index, None for the brute-force search.
+        """
+        if self._bmu_index is None or self._bmu_index[0] is not self.codebook:
+            if self.bmu_engine == "kdtree":
+                index = cKDTree(self.codebook)
+            elif self.bmu_engine == "brute":
+                index = None
+            elif self.bmu_engine == "hierarchical":
+                index = HierarchicalCodebook(self.map_size, self.topology).fit(self.codebook)
+            else:
+                index = self.bmu_engine.fit(self.codebook)
+            self._bmu_index = (self.codebook, index)
+        return self._bmu_index[1]
+
+    def __query_bmus(self, vectors, k, p=2, exact=False):
+        """
+        Find the k best-matching units for vectors with the BMU engine. If the SOM has a scaler, the vectors are scaled
+        one chunk at a time.
+
+        Parameters
+        ----------
+        vectors: ndarray of shape (n_vectors, n_features)
+            The vectors, e.g. data points.
+        k: int
+            The number of BMUs.
+        p: float, default = 2
+            Which Minkowski p-norm to use. Only the KD-Tree supports other norms than the euclidean distance.
+        exact: bool, default = False
+            Whether the BMUs must be exact. An approximate BMU engine is replaced by the brute-force search then.
+
+        Returns
+        -------
+        distances: ndarray of shape (n_vectors, k)
+            The distances to the k BMUs, in increasing order.
+        indices: ndarray of shape (n_vectors, k)
+            The indices of the k BMUs in the positions array.
+        """
+        engine = self.bmu_engine if not exact or self.bmu_engine in ["kdtree", "brute"] else "brute"
+        index = self.__bmu_index() if engine != "brute" else None
+        distances = np.empty((len(vectors), k))
+        indices = np.empty((len(vectors), k), dtype=np.intp)
+        step = len(vectors) if self.scaler is None else self.scaler.chunk_size
+        if self.bmu_chunk_size is not None:
+            step = self.bmu_chunk_size
+        for start in range(0, len(vectors), max(step, 1)):
+            chunk = self.__scale(vectors[start:start + step])
+            if engine == "kdtree":
+                chunk_distances, chunk_indices = index.query(chunk, k=k, p=p)
+            elif engine == "brute" and isinstance(self.codebook, np.memmap):
+                # read each block of the memory-mapped codebook once for the whole chunk
+                chunk_distances, chunk_indices = _euclid_k_nearest(self.codebook, chunk, k,
+                                                                   block_size=self.__tile_size(chunk.shape[1]))
+            elif engine == "brute":
+                chunk_distances, chunk_indices = _euclid_k_nearest(self.codebook, chunk, k)
+            else:
+                chunk_distances, chunk_indices = index.query(chunk, k)
+            distances[start:start + step] = np.reshape(chunk_distances, (len(chunk), k))
+            indices[start:start + step] = np.reshape(chunk_indices, (len(chunk), k))
+        return distances, indices
+
+    def __tiled_argmin(self, x, tile):
+        """
+        Find the unit with the minimum distance in input space to a data point, one tile of the codebook at a time.
+
+        Parameters
+        ----------
+        x: ndarray of size n_features
+            The data point.
+        tile: int
+            The number of units per tile.
+
+        Returns
+        -------
+        index: int
+            The index of the unit with the minimum distance. The first one if several units have the same distance.
+        """
+        best_index, best_distance = 0, np.inf
+        for start in range(0, len(self.codebook), tile):
+            d = self.input_space_distance(self.codebook[start:start + tile], x)
+            ind = np.argmin(d)
+            if d[ind] < best_distance:
+                best_index, best_distance = start + ind, d[ind]
+        return best_index
+
+    @staticmethod
+    def __tile_size(n_features):
+        """
+        Get the number of units per tile of a memory-mapped codebook, such that a tile has about 16 MiB.
+
+        Parameters
+        ----------
+        n_features: int
+            The number of features.
+
+        Returns
+        -------
+        tile_size: int
+            The number of units per tile.
+        """
+        return max(1, _TILE_ENTRIES // n_features)
+
+    def __scale(self, vectors):
+        """
+        Scale vectors with the scaler of the SOM, if any.
+
+        Parameters
+        ----------
+        vectors: ndarray of shape (n_vectors, n_features)
+            The vectors, e.g. data points.
+
+        Returns
+        -------
+        vectors: ndarray of shape (n_vectors, n_features)
+            The scaled vectors, the vectors themselves if the SOM has no scaler.
+        """
+        return vectors if self.scaler is None else self.scaler.transform(vectors)
 
     def __neighborhood(self):
         """
@@ -283,6 +1093,18 @@ class StandardSOM(BaseSOM):
         if self.neighborhood_type == "gauss":
             return _gauss_neighborhood
 
+    def __minkowski_p(self):
+        """
+        Get the Minkowski p-norm of the distance measure in input space for the BMU search.
+
+        Returns
+        -------
+        p: float
+            The p of the p-norm.
+        """
+        # TODO adapt when other distance measures for input space are implemented
+        return 2
+
     def __input_distance(self):
         """
         Set the underlying distance function for the given distance measure in input space
@@ -5,9 +5,11 @@ This module gathers codebook functions for SOMs
 # Authors: Nikola Dragovic (@nikdra), 26.07.2020
 
 import numpy as np
+from scipy.interpolate import griddata
+from scipy.spatial import QhullError
 
 
-def _init_codebook(n_units, data):
+def _init_codebook(n_units, data, rng, out=None, tile_size=None):
     """
     Initialize the codebook of shape (n_units, n_features) with random values in [min_value, max_value) for each
     feature dimension in data.
@@ -18,15 +20,21 @@ def _init_codebook(n_units, data):
         The number of units in the SOM.
     data: array-like of shape (n_samples, n_features)
         The data that the SOM will be trained on.
+    rng: Generator
+        The random number generator.
+    out: ndarray of shape (n_units, n_features), default = None
+        The array to write the codebook into, e.g. a memory-mapped array. If None, a new array is returned.
+    tile_size: int, default = None
+        The number of units that are initialized at once. If None, all units. The random values do not depend on it.
 
     Returns
     -------
     codebook: array-like of shape (n_units, n_features)
         The initialized codebook.
     """
-
-    # initialize the codebook size n_units x n_features with random values in (0,1]
-    codebook = np.random.rand(n_units, data.shape[1])
+    if out is None:
+        out = np.empty((n_units, data.shape[1]))
+    tile_size = tile_size or n_units
 
     # minimums of features
     data_mins = np.min(data, axis=0)
@@ -34,10 +42,197 @@ def _init_codebook(n_units, data):
     # maximums of features
     data_maxs = np.max(data, axis=0)
 
-    # get random weight vectors for units in [min, max) of all features
-    # for a feature:
-    # value = minimum + [0,1) * (max - min)
-    # characteristics: minimum <= value <= maximum
-    codebook = codebook * (data_maxs - data_mins) + data_mins
+    for start in range(0, n_units, tile_size):
+        # initialize the codebook size n_units x n_features with random values in (0,1]
+        codebook = rng.random((min(tile_size, n_units - start), data.shape[1]))
+
+        # get random weight vectors for units in [min, max) of all features
+        # for a feature:
+        # value = minimum + [0,1) * (max - min)
+        # characteristics: minimum <= value <= maximum
+        out[start:start + tile_size] = codebook * (data_maxs - data_mins) + data_mins
+
+    return out
+
+
+def _init_codebook_sample(n_units, data, rng, out=None, tile_size=None):
+    """
+    Initialize the codebook of shape (n_units, n_features) with randomly drawn rows of the data.
+
+    Rows are drawn without replacement as long as there are at least as many data points as units.
+
+    Parameters
+    ----------
+    n_units: int
+        The number of units in the SOM.
+    data: array-like of shape (n_samples, n_features)
+        The data that the SOM will be trained on.
+    rng: Generator
+        The random number generator.
+    out: ndarray of shape (n_units, n_features), default = None
+        The array to write the codebook into, e.g. a memory-mapped array. If None, a new array is returned.
+    tile_size: int, default = None
+        The number of units that are initialized at once. If None, all units.
+
+    Returns
+    -------
+    codebook: array-like of shape (n_units, n_features)
+        The initialized codebook.
+    """
+    rows = rng.choice(data.shape[0], size=n_units, replace=n_units > data.shape[0])
+    if out is None:
+        return np.array(data[rows], dtype=float)
+    tile_size = tile_size or n_units
+    for start in range(0, n_units, tile_size):
+        out[start:start + tile_size] = data[rows[start:start + tile_size]]
+    return out
+
+
+def _init_codebook_pca(coordinates, data, rng, chunk_size=10000, out=None, tile_size=None):
+    """
+    Initialize the codebook of shape (n_units, n_features) linearly along the plane of the first two principal
+    components of the data.
+
+    The longer axis of the grid is aligned with the first principal component, the shorter axis with the second one.
+    Along each axis, the units are spread evenly between minus and plus one standard deviation of the respective
+    principal component around the mean of the data.
+
+    Parameters
+    ----------
+    coordinates: ndarray of shape (n_units, 2)
+        The cartesian coordinates of the units on the grid.
+    data: array-like of shape (n_samples, n_features)
+        The data that the SOM will be trained on.
+    rng: Generator
+        The random number generator for the randomized computation of the principal components.
+    chunk_size: int, default = 10000
+        The number of data points that are processed at once. Bounds the memory needed for the principal components.
+    out: ndarray of shape (n_units, n_features), default = None
+        The array to write the codebook into, e.g. a memory-mapped array. If None, a new array is returned.
+    tile_size: int, default = None
+        The number of units that are initialized at once. If None, all units.
+
+    Returns
+    -------
+    codebook: array-like of shape (n_units, n_features)
+        The initialized codebook.
+    """
+    n_components = min(2, data.shape[1])
+    mean, variances, components = _principal_components(data, n_components, rng, chunk_size)
+
+    # center the grid coordinates and scale them to [-1, 1] per axis
+    coordinates = coordinates - np.mean(coordinates, axis=0)
+    extent = np.max(np.abs(coordinates), axis=0)
+    coordinates = np.divide(coordinates, extent, out=np.zeros_like(coordinates), where=extent > 0)
+    # the longest grid axis follows the first principal component
+    coordinates = coordinates[:, np.argsort(-extent)][:, :n_components]
+
+    # value = mean + sum over components of coordinate * standard deviation * direction
+    coordinates = coordinates * np.sqrt(np.maximum(variances, 0))
+    if out is None:
+        return mean + coordinates @ components
+    tile_size = tile_size or len(coordinates)
+    for start in range(0, len(coordinates), tile_size):
+        out[start:start + tile_size] = mean + coordinates[start:start + tile_size] @ components
+    return out
+
+
+def _principal_components(data, n_components, rng, chunk_size=10000, n_oversamples=10, n_iter=4):
+    """
+    Compute the leading principal components of the data with a randomized range finder (Halko et al., 2011).
+
+    The covariance matrix is never formed. It is only applied to blocks of vectors, one chunk of data points at a
+    time, so the memory required is independent of the number of data points. If the number of features is small,
+    the random range spans the whole feature space and the result is exact.
+
+    Parameters
+    ----------
+    data: array-like of shape (n_samples, n_features)
+        The data.
+    n_components: int
+        The number of principal components.
+    rng: Generator
+        The random number generator for the random range.
+    chunk_size: int, default = 10000
+        The number of data points that are processed at once.
+    n_oversamples: int, default = 10
+        The number of additional random vectors used for the range finder.
+    n_iter: int, default = 4
+        The number of power iterations.
+
+    Returns
+    -------
+    mean: ndarray of size n_features
+        The mean of the data.
+    variances: ndarray of size n_components
+        The variances of the data along the principal components, in decreasing order.
+    components: ndarray of shape (n_components, n_features)
+        The principal components (unit vectors) of the data.
+    """
+    n_samples, n_features = data.shape
+    mean = np.zeros(n_features)
+    for start in range(0, n_samples, chunk_size):
+        mean += np.sum(data[start:start + chunk_size], axis=0)
+    mean /= n_samples
+
+    def covariance_product(vectors):
+        # (X - mean)^T (X - mean) vectors / (n - 1), one chunk of data points at a time
+        product = np.zeros((n_features, vectors.shape[1]))
+        for chunk_start in range(0, n_samples, chunk_size):
+            centered = data[chunk_start:chunk_start + chunk_size] - mean
+            product += centered.T @ (centered @ vectors)
+        return product / max(n_samples - 1, 1)
+
+    # approximate the range of the covariance matrix with a few power iterations
+    n_random = min(n_features, n_components + n_oversamples)
+    q, _ = np.linalg.qr(covariance_product(rng.standard_normal((n_features, n_random))))
+    for _ in range(n_iter):
+        q, _ = np.linalg.qr(covariance_product(q))
+
+    # eigendecomposition of the covariance matrix projected onto the range
+    variances, vectors = np.linalg.eigh(q.T @ covariance_product(q))
+    order = np.argsort(variances)[::-1][:n_components]
+    components = (q @ vectors[:, order]).T
+
+    # deterministic signs: the largest entry of each component is positive
+    signs = np.sign(components[np.arange(n_components), np.argmax(np.abs(components), axis=1)])
+    return mean, variances[order], components * signs[:, None]
+
+
+def _interpolate_codebook(codebook, coordinates, target_coordinates):
+    """
+    Interpolate a codebook to the units of another grid.
+
+    The coordinates of the codebook's grid are scaled to the extent of the target grid, and the weight vectors are
+    interpolated linearly between the surrounding units. Target units outside of the convex hull of the scaled grid
+    get the weight vector of the nearest unit.
+
+    Parameters
+    ----------
+    codebook: ndarray of shape (n_units, n_features)
+        The codebook to interpolate.
+    coordinates: ndarray of shape (n_units, 2)
+        The cartesian coordinates of the units of the codebook.
+    target_coordinates: ndarray of shape (n_target_units, 2)
+        The cartesian coordinates of the units of the target grid.
+
+    Returns
+    -------
+    codebook: ndarray of shape (n_target_units, n_features)
+        The interpolated codebook.
+    """
+    # scale the bounding box of the grid to the bounding box of the target grid
+    low, high = np.min(coordinates, axis=0), np.max(coordinates, axis=0)
+    target_low, target_high = np.min(target_coordinates, axis=0), np.max(target_coordinates, axis=0)
+    scale = np.divide(target_high - target_low, high - low, out=np.zeros(2), where=high > low)
+    scaled = (coordinates - low) * scale + target_low
 
-    return codebook
+    nearest = griddata(scaled, codebook, target_coordinates, method="nearest")
+    try:
+        interpolated = griddata(scaled, codebook, target_coordinates, method="linear")
+    except QhullError:
+        # the grid is a single row or column
+        return nearest
+    outside = np.isnan(interpolated[:, 0])
+    interpolated[outside] = nearest[outside]
+    return interpolated
@@ -0,0 +1,316 @@
+"""
+This module gathers the continual training of SOMs on unbounded streams of data.
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from ._distance import _euclid_distance, _euclid_k_nearest
+
+
+class ContinualTrainer:
+    """
+    Continue the training of a trained SOM on an unbounded stream of data points, e.g. when the distribution of the
+    data drifts over time.
+
+    Every data point of the stream is one iteration of the online algorithm of StandardSOM.train. Instead of
+    decreasing linearly to zero, the learning parameter and the neighborhood radius decay exponentially towards their
+    floors, so the map keeps adapting to new data without losing its ordering:
+    :math:`\\alpha(t) = \\alpha_{min} + (\\alpha - \\alpha_{min}) e^{-t / \\tau}`, and the radius alike.
+
+    A reservoir sample of a fixed size holds a uniform sample of all data points seen so far (Vitter's algorithm R).
+    Every check_interval data points, the quantization and topographic error of the map are measured on the reservoir.
+    The distance of every data point to its BMU is also measured before the map is updated with it (test-then-train).
+    If the mean of these distances within a check interval exceeds drift_threshold times the one of the previous
+    interval, the stream has drifted away from the map, and the schedule optionally restarts (reheat) so the map
+    adapts faster. Per unit, the exponentially weighted number of hits, the mean distance to the data points of its
+    hits and the movement of its weight vector since the last check are kept.
+
+    The memory (the codebook, the reservoir, the statistics per unit and at most history_size checks) and the cost
+    per data point (one distance computation and one update of the units with a non-negligible neighborhood) do not
+    grow with the length of the stream. The codebook is updated in place, and the BMUs of the training data of the SOM
+    (bmu_indices and bmu_distances) are discarded, since they belong to the previous codebook. The map has to be
+    scored again, e.g. with refresh_bmus, before the quality measures or visualizations that use the BMUs.
+
+    Parameters
+    ----------
+    som: StandardSOM
+        The trained SOM.
+    alpha: float, default = 0.1
+        The learning parameter at the start of the schedule. Must be greater than zero.
+    neighborhood_radius: float, default = None
+        The neighborhood radius at the start of the schedule. Must be greater than zero. If None, the neighborhood
+        radius of the SOM.
+    alpha_floor: float, default = 0.01
+        The learning parameter that the schedule approaches. Must be in (0, alpha].
+    radius_floor: float, default = 0.5
+        The neighborhood radius that the schedule approaches. Must be in (0, neighborhood_radius].
+    time_constant: float, default = 10000
+        The number of data points after which the distance of the schedule to its floors has decayed to 1/e. Must be
+        greater than zero.
+    reservoir_size: int, default = 1000
+        The number of data points in the reservoir. Must be greater than zero.
+    check_interval: int, default = 10000
+        The number of data points between two quality checks. Must be greater than zero.
+    drift_threshold: float, default = 1.5
+        The ratio of the mean distance of the data points to their BMU within a check interval to the one of the
+        previous interval above which a drift is detected. Must be greater than zero.
+    reheat: bool, default = False
+        Whether to restart the schedule when a drift is detected. The map then adapts faster to the new data, but
+        also forgets more of the old data.
+    decay: float, default = 0.999
+        The weight of the past in the exponentially weighted statistics, per data point. Must be in (0, 1).
+    history_size: int, default = 1000
+        The number of the most recent quality checks that are kept. Must be greater than zero.
+    random_seed: int, default = 1
+        The random seed of the reservoir sample.
+
+    Attributes
+    ----------
+    events: int
+        The number of data points seen so far.
+    reservoir: ndarray of shape (n_reservoir, n_features)
+        The reservoir sample, in the space of the scaled features if the SOM has a scaler.
+    history: DataFrame
+        The most recent quality checks.
+    unit_hits: ndarray of size n_units
+        The exponentially weighted number of data points of which each unit was the BMU.
+    unit_error: ndarray of size n_units
+        The exponentially weighted mean distance of each unit to the data points of which it was the BMU, NaN for
+        units that have not been a BMU.
+    unit_drift: ndarray of size n_units
+        The distance each weight vector moved between the last two checks.
+    recent_error: float
+        The exponentially weighted mean distance of the recent data points to their BMU.
+    drifts: int
+        The number of checks that detected a drift.
+    """
+
+    def __init__(self,
+                 som,
+                 alpha=0.1,
+                 neighborhood_radius=None,
+                 alpha_floor=0.01,
+                 radius_floor=0.5,
+                 time_constant=10000,
+                 reservoir_size=1000,
+                 check_interval=10000,
+                 drift_threshold=1.5,
+                 reheat=False,
+                 decay=0.999,
+                 history_size=1000,
+                 random_seed=1):
+        if neighborhood_radius is None:
+            neighborhood_radius = som.neighborhood_radius
+        # parameter check
+        if not som.trained:
+            raise ValueError("SOM is not trained")
+        if alpha <= 0:
+            raise ValueError("Learning parameter must be greater 0")
+        if neighborhood_radius <= 0:
+            raise ValueError("Neighborhood radius smaller or equal 0. Must be greater than 0")
+        if not 0 < alpha_floor <= alpha:
+            raise ValueError("Floor of the learning parameter must be in (0, alpha]")
+        if not 0 < radius_floor <= neighborhood_radius:
+            raise ValueError("Floor of the neighborhood radius must be in (0, neighborhood_radius]")
+        if time_constant <= 0:
+            raise ValueError("Time constant must be greater 0")
+        if reservoir_size <= 0:
+            raise ValueError("Reservoir size must be greater 0")
+        if check_interval <= 0:
+            raise ValueError("Check interval must be greater 0")
+        if drift_threshold <= 0:
+            raise ValueError("Drift threshold must be greater 0")
+        if not 0 < decay < 1:
+            raise ValueError("Decay must be in (0, 1)")
+        if history_size <= 0:
+            raise ValueError("History size must be greater 0")
+
+        self.som = som
+        self.alpha = alpha
+        self.neighborhood_radius = neighborhood_radius
+        self.alpha_floor = alpha_floor
+        self.radius_floor = radius_floor
+        self.time_constant = time_constant
+        self.reservoir_size = reservoir_size
+        self.check_interval = check_interval
+        self.drift_threshold = drift_threshold
+        self.reheat = reheat
+        self.decay = decay
+        self.rng = np.random.default_rng(random_seed)
+
+        n_units, n_features = np.shape(som.codebook)
+        self.events = 0
+        self.drifts = 0
+        self.recent_error = np.nan
+        self.unit_hits = np.zeros(n_units)
+        self.unit_error = np.full(n_units, np.nan)
+        self.unit_drift = np.zeros(n_units)
+        self._reservoir = np.empty((reservoir_size, n_features))
+        self._reservoir_filled = 0
+        self._snapshot = np.array(som.codebook, dtype=float)
+        # the time of the schedule, restarted by a reheat
+        self._time = 0
+        self._history = deque(maxlen=history_size)
+        # the sum of the distances to the BMU within the current check interval, the mean of the previous interval
+        self._window_error = 0.
+        self._previous_window_error = None
+
+    @property
+    def reservoir(self):
+        """
+        The reservoir sample.
+
+        Returns
+        -------
+        reservoir: ndarray of shape (n_reservoir, n_features)
+            The data points of the reservoir, fewer than reservoir_size only at the start of the stream.
+        """
+        return self._reservoir[:self._reservoir_filled]
+
+    @property
+    def history(self):
+        """
+        The most recent quality checks.
+
+        Returns
+        -------
+        history: DataFrame
+            One row per check with the columns "events", "alpha", "radius", "quantization_error" and
+            "topographic_error" (on the reservoir), "window_error" (the mean distance of the data points of the check
+            interval to their BMU before the update), "recent_error", "mean_unit_drift" and "drift" (whether a drift
+            was detected).
+        """
+        return pd.DataFrame(list(self._history), columns=["events", "alpha", "radius", "quantization_error",
+                                                          "topographic_error", "window_error", "recent_error",
+                                                          "mean_unit_drift", "drift"])
+
+    def schedule(self):
+        """
+        Get the current learning parameter and neighborhood radius.
+
+        Returns
+        -------
+        alpha: float
+            The learning parameter.
+        radius: float
+            The neighborhood radius.
+        """
+        factor = np.exp(-self._time / self.time_constant)
+        return (self.alpha_floor + (self.alpha - self.alpha_floor) * factor,
+                self.radius_floor + (self.neighborhood_radius - self.radius_floor) * factor)
+
+    def partial_fit(self, data):
+        """
+        Train the SOM on the next data points of the stream, one data point at a time in the given order.
+
+        Parameters
+        ----------
+        data: DataFrame or array-like of shape (n_samples, n_features)
+            The next data points.
+
+        Returns
+        -------
+        self: ContinualTrainer
+            The trainer.
+        """
+        som = self.som
+        samples = np.asarray(data, dtype=float)
+        if som.scaler is not None:
+            samples = som.scaler.transform(samples)
+        codebook = som.codebook
+        positions = som.positions
+        start = 0
+        while start < len(samples):
+            # up to the next check, so the reservoir holds exactly the data points seen before each check
+            end = min(len(samples), start + self.check_interval - self.events % self.check_interval)
+            self.__sample(samples[start:end])
+            for x in samples[start:end]:
+                alpha, radius = self.schedule()
+                # find the BMU
+                d = _euclid_distance(codebook, x)
+                bmu = np.argmin(d)
+                # update the units with a non-negligible neighborhood in place
+                neighborhood = som.neighborhood_function(som.output_space_distance(positions, positions[bmu]),
+                                                         radius)
+                active = np.flatnonzero(neighborhood > 1e-6)
+                codebook[active] += alpha * neighborhood[active, None] * (x - codebook[active])
+                # exponentially weighted statistics
+                self.unit_hits *= self.decay
+                self.unit_hits[bmu] += 1
+                previous = self.unit_error[bmu]
+                self.unit_error[bmu] = d[bmu] if np.isnan(previous) else \
+                    self.decay * previous + (1 - self.decay) * d[bmu]
+                self.recent_error = d[bmu] if np.isnan(self.recent_error) else \
+                    self.decay * self.recent_error + (1 - self.decay) * d[bmu]
+                self._window_error += d[bmu]
+                self.events += 1
+                self._time += 1
+            if self.events % self.check_interval == 0:
+                self.__check()
+            start = end
+        # the codebook changed in place, so the index of the BMU engine and the BMUs of the training data are stale
+        som._bmu_index = None
+        som.bmu_indices = som.bmu_distances = None
+        som._bmu_lower_bounds = som._bmu_codebook = None
+        return self
+
+    def __sample(self, samples):
+        """
+        Add data points to the reservoir sample with Vitter's algorithm R.
+
+        Parameters
+        ----------
+        samples: ndarray of shape (n_samples, n_features)
+            The next data points.
+
+        Returns
+        -------
+        None
+        """
+        # fill the reservoir first
+        free = min(self.reservoir_size - self._reservoir_filled, len(samples))
+        self._reservoir[self._reservoir_filled:self._reservoir_filled + free] = samples[:free]
+        self._reservoir_filled += free
+        # the i-th data point of the stream replaces a random slot with probability reservoir_size / i
+        seen = self.events + np.arange(free, len(samples)) + 1
+        slots = self.rng.integers(seen)
+        replaced = slots < self.reservoir_size
+        # later data points overwrite earlier ones in the same slot, as in the sequential algorithm
+        self._reservoir[slots[replaced]] = samples[free:][replaced]
+
+    def __check(self):
+        """
+        Measure the quality of the map on the reservoir, the movement of the units and detect a drift.
+
+        Returns
+        -------
+        None
+        """
+        som = self.som
+        codebook = np.asarray(som.codebook)
+        k = 2 if len(codebook) > 1 else 1
+        distances, indices = _euclid_k_nearest(codebook, self.reservoir, k=k)
+        quantization_error = np.mean(distances[:, 0])
+        topographic_error = np.nan
+        if k == 2:
+            # the second BMU is not adjacent to the first BMU
+            topographic_error = np.mean(som.output_space_distance(som.positions[indices[:, 0]],
+                                                                  som.positions[indices[:, 1]]) != 1)
+        self.unit_drift = _euclid_distance(codebook, self._snapshot)
+        self._snapshot[:] = codebook
+
+        alpha, radius = self.schedule()
+        window_error = self._window_error / self.check_interval
+        drift = self._previous_window_error is not None and \
+            window_error > self.drift_threshold * self._previous_window_error
+        self._window_error = 0.
+        self._previous_window_error = window_error
+        if drift:
+            self.drifts += 1
+            if self.reheat:
+                self._time = 0
+        self._history.append((self.events, alpha, radius, quantization_error, topographic_error, window_error,
+                              self.recent_error, np.mean(self.unit_drift), drift))
@@ -11,6 +11,8 @@ def _euclid_distance(matrix, vector):
     """
     Vectorized computation of the euclidean distance between a matrix and a vector.
 
+    The distance is computed along the last axis, so stacks of matrices and vectors are broadcast against each other.
+
     Parameters
     ----------
     matrix: array-like of shape (n, m)
@@ -23,7 +25,7 @@ def _euclid_distance(matrix, vector):
     distance_matrix: array-like of size n
         The euclidean distances for each entry in the matrix and the vector.
     """
-    return np.sqrt(np.sum(np.square(matrix - vector), axis=1))
+    return np.sqrt(np.sum(np.square(matrix - vector), axis=-1))
 
 
 def _hex_distance(hex_positions, hex_position):
@@ -42,7 +44,7 @@ def _hex_distance(hex_positions, hex_position):
     distance_matrix: array-like of size n
         The euclidean distances for each entry in the matrix and the vector.
     """
-    return np.sum(np.abs(hex_positions - hex_position), axis=1)/2
+    return np.sum(np.abs(hex_positions - hex_position), axis=-1)/2
 
 
 def _hex_point_distance(hex_position1, hex_position2):
@@ -62,3 +64,116 @@ def _hex_point_distance(hex_position1, hex_position2):
         The distance between two cube coordinates.
     """
     return np.sum(np.abs(hex_position1 - hex_position2))/2
+
+
+def _euclid_k_nearest(matrix, vectors, k=1, chunk_size=None, block_size=None):
+    """
+    Vectorized brute-force search of the k nearest rows of a matrix for many vectors, using the euclidean distance.
+
+    The squared distances are computed via :math:`\\Vert x \\Vert^2 - 2 x \\cdot m + \\Vert m \\Vert^2` with one matrix
+    product per chunk of vectors, so the temporary memory is bounded by the chunk size.
+
+    Parameters
+    ----------
+    matrix: array-like of shape (n, m)
+        A matrix with n rows and m columns, e.g. the codebook.
+    vectors: array-like of shape (n_vectors, m)
+        The vectors, e.g. data points.
+    k: int, default = 1
+        The number of nearest rows. Must not be greater than n.
+    chunk_size: int, default = None
+        The number of vectors processed at once. If None, the chunk size is chosen such that the temporary distance
+        matrix has about one million entries.
+    block_size: int, default = None
+        The number of rows of the matrix processed at once. If set, the matrix is scanned block by block, and each
+        block is read only once for all vectors, e.g. for a memory-mapped codebook. If None, all rows at once.
+
+    Returns
+    -------
+    distances: ndarray of shape (n_vectors, k)
+        The euclidean distances to the k nearest rows, in increasing order.
+    indices: ndarray of shape (n_vectors, k)
+        The indices of the k nearest rows.
+    """
+    if block_size is not None and block_size < len(matrix):
+        # k nearest rows of each block, merged with the k nearest rows of the previous blocks
+        distances = np.full((len(vectors), k), np.inf)
+        indices = np.full((len(vectors), k), -1, dtype=np.intp)
+        for start in range(0, len(matrix), block_size):
+            block = np.asarray(matrix[start:start + block_size], dtype=float)
+            block_distances, block_indices = _euclid_k_nearest(block, vectors, min(k, len(block)), chunk_size)
+            distances = np.concatenate((distances, block_distances), axis=1)
+            indices = np.concatenate((indices, block_indices + start), axis=1)
+            order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+            distances = np.take_along_axis(distances, order, axis=1)
+            indices = np.take_along_axis(indices, order, axis=1)
+        return distances, indices
+    matrix = np.asarray(matrix, dtype=float)
+    if chunk_size is None:
+        chunk_size = max(1, 2 ** 20 // matrix.shape[0])
+    norms = np.einsum("ij,ij->i", matrix, matrix)
+    distances = np.empty((len(vectors), k))
+    indices = np.empty((len(vectors), k), dtype=np.intp)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.asarray(vectors[start:start + chunk_size], dtype=float)
+        squared = norms - 2 * chunk @ matrix.T + np.einsum("ij,ij->i", chunk, chunk)[:, None]
+        if k < matrix.shape[0]:
+            nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(matrix.shape[0]), squared.shape)
+        nearest_squared = np.take_along_axis(squared, nearest, axis=1)
+        order = np.argsort(nearest_squared, axis=1)
+        indices[start:start + chunk_size] = np.take_along_axis(nearest, order, axis=1)
+        distances[start:start + chunk_size] = np.sqrt(np.maximum(np.take_along_axis(nearest_squared, order, axis=1), 0))
+    return distances, indices
+
+
+def _rerank_candidates(matrix, vectors, candidates, k=1, norms=None):
+    """
+    Find the k nearest rows of a matrix for many vectors among candidate rows, using the euclidean distance.
+
+    Parameters
+    ----------
+    matrix: ndarray of shape (n, m)
+        A matrix with n rows and m columns, e.g. the codebook.
+    vectors: ndarray of shape (n_vectors, m)
+        The vectors, e.g. data points.
+    candidates: ndarray of shape (n_vectors, n_candidates)
+        The indices of the candidate rows for each vector. May contain duplicates and -1 for no candidate.
+    k: int, default = 1
+        The number of nearest rows.
+    norms: ndarray of size n, default = None
+        The squared euclidean norms of the rows of the matrix. Computed if not given.
+
+    Returns
+    -------
+    distances: ndarray of shape (n_vectors, k)
+        The euclidean distances to the k nearest candidate rows, in increasing order. Infinite if there are fewer than
+        k candidates.
+    indices: ndarray of shape (n_vectors, k)
+        The indices of the k nearest candidate rows, -1 if there are fewer than k candidates.
+    """
+    # sort the candidates of each vector to find duplicates
+    candidates = np.sort(candidates, axis=1)
+    invalid = candidates < 0
+    invalid[:, 1:] |= candidates[:, 1:] == candidates[:, :-1]
+    if norms is None:
+        norms = np.einsum("ij,ij->i", matrix, matrix)
+    # one column of candidates at a time, so the temporary memory is bounded by the size of the vectors
+    squared = np.empty(candidates.shape)
+    for column in range(candidates.shape[1]):
+        squared[:, column] = norms[candidates[:, column]] - 2 * np.einsum("ij,ij->i", matrix[candidates[:, column]],
+                                                                          vectors)
+    distances = np.sqrt(np.maximum(squared + np.einsum("ij,ij->i", vectors, vectors)[:, None], 0))
+    distances[invalid] = np.inf
+    if candidates.shape[1] < k:
+        # pad with missing candidates
+        padding = k - candidates.shape[1]
+        distances = np.pad(distances, ((0, 0), (0, padding)), constant_values=np.inf)
+        candidates = np.pad(candidates, ((0, 0), (0, padding)), constant_values=-1)
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k] if k < distances.shape[1] else \
+        np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+    nearest = np.take_along_axis(nearest, np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1), axis=1)
+    distances = np.take_along_axis(distances, nearest, axis=1)
+    indices = np.where(np.isinf(distances), -1, np.take_along_axis(candidates, nearest, axis=1))
+    return distances, indices
@@ -0,0 +1,111 @@
+"""
+This module gathers the training of many SOMs of the same shape at once.
+"""
+
+import numpy as np
+
+from ._classes import StandardSOM
+from ._neighborhood import _gauss_neighborhood
+
+
+def train_ensemble(map_size,
+                   data,
+                   neighborhood_radius,
+                   alpha=0.95,
+                   random_seed=1,
+                   iterations=10000,
+                   topology="rectangular",
+                   init="random"):
+    """
+    Train several standard SOMs of the same shape in one vectorized pass.
+
+    The codebooks of all maps are stacked into one array of shape (n_maps, n_units, n_features). In each iteration,
+    every map draws its own data point, and the distances, BMUs, neighborhoods and updates of all maps are computed
+    with one broadcast operation each. Every map follows exactly the schedule and the random draws of
+    StandardSOM.train with the same parameters, so the results match the ones of training the maps one by one.
+
+    The maps differ in the neighborhood radius, the learning parameter and the random seed. Each of these parameters
+    is either a single value shared by all maps or a sequence with one value per map.
+
+    Parameters
+    ----------
+    map_size: int, int
+        The size of the SOMs (height, width). Both height and width must be greater than zero.
+    data: DataFrame of shape (n_samples, n_features)
+        Data to train the SOMs. Should not contain the class labels for interpretable results.
+    neighborhood_radius: float or sequence of float
+        The radius of the neighborhood of each map. Must be greater than zero.
+    alpha: float or sequence of float, default = 0.95
+        The learning parameter of each map. Must be greater than zero.
+    random_seed: int or sequence of int, default = 1
+        The random seed of each map.
+    iterations: int, default = 10000
+        The number of iterations of every map. Must be greater than zero.
+    topology: {"rectangular", "hexagonal"}, default = "rectangular"
+        The topology of the SOMs.
+    init: {"random", "sample", "pca"}, default = "random"
+        The initialization of the codebooks.
+
+    Returns
+    -------
+    soms: list of StandardSOM
+        The trained SOMs, one per combination of neighborhood radius, learning parameter and random seed.
+    """
+    # parameter check
+    if iterations <= 0:
+        raise ValueError("Iterations must be greater 0")
+    if data is None:
+        raise ValueError("Data is None")
+    if init not in ["random", "sample", "pca"]:
+        raise ValueError("Initialization " + str(init) + " not supported")
+    try:
+        radii, alphas, seeds = np.broadcast_arrays(np.atleast_1d(neighborhood_radius), np.atleast_1d(alpha),
+                                                   np.atleast_1d(random_seed))
+    except ValueError:
+        raise ValueError("neighborhood_radius, alpha and random_seed must have the same number of values")
+    if np.any(alphas <= 0):
+        raise ValueError("Learning parameter must be greater 0")
+
+    # the constructor checks the remaining parameters
+    soms = [StandardSOM(map_size, float(radius), topology) for radius in radii]
+    samples = data.to_numpy()
+
+    # initialize every map exactly like StandardSOM.train
+    codebooks = []
+    rows = []
+    for som, seed in zip(soms, seeds):
+        som.rng = np.random.default_rng(int(seed))
+        codebooks.append(som._initialize_codebook(samples, init))
+        rows.append(som.rng.integers(len(samples), size=iterations))
+    codebooks = np.stack(codebooks)
+    rows = np.stack(rows)
+
+    # schedules of shape (n_maps, iterations) - decrease linearly with increasing iterations
+    alpha_schedules = np.linspace(alphas, 0, num=iterations, endpoint=False, axis=1)
+    radius_schedules = np.linspace(radii, 0, num=iterations, endpoint=False, axis=1)
+
+    positions = soms[0].positions
+    input_space_distance = soms[0].input_space_distance
+    output_space_distance = soms[0].output_space_distance
+
+    # main training loop, all maps at once
+    for i in range(iterations):
+        # get one data point per map, shape (n_maps, n_features)
+        x = samples[rows[:, i]]
+        # calculate distances in input space, shape (n_maps, n_units)
+        d = input_space_distance(codebooks, x[:, None, :])
+        # get positions of units with minimum distance
+        bmus = positions[np.argmin(d, axis=1)]
+        # get distances of BMUs to all units in output space, shape (n_maps, n_units)
+        neighborhood_distances = output_space_distance(positions[None, :, :], bmus[:, None, :])
+        # get neighborhoods
+        neighborhoods = _gauss_neighborhood(neighborhood_distances, radius_schedules[:, i, None])
+        # update
+        codebooks += alpha_schedules[:, i, None, None] * neighborhoods[:, :, None] * (x[:, None, :] - codebooks)
+
+    # finish every map individually
+    for som, codebook in zip(soms, codebooks):
+        som.codebook = codebook.copy()
+        som.iterations_trained = iterations
+        som._complete_training(data)
+    return soms
@@ -0,0 +1,156 @@
+"""
+This module gathers the monitoring of the convergence of SOMs during training.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ._callbacks import Callback
+from ._distance import _euclid_k_nearest
+
+
+class ConvergenceMonitor(Callback):
+    """
+    Monitor the convergence of a SOM during training and stop the training once the map does not improve anymore.
+
+    Every interval iterations, the quantization error (and optionally the topographic error) is computed on a fixed
+    random subsample of the training data. The training stops when the relative improvement of the quantization
+    error between two evaluations stays below the tolerance for patience consecutive evaluations. Note that the
+    learning parameter and the neighborhood radius still decrease according to the requested number of iterations, so
+    a stopped training ends with a learning parameter and radius greater than zero.
+
+    Parameters
+    ----------
+    interval: int, default = 500
+        The number of iterations between two evaluations. Must be greater than zero.
+    sample_size: int, default = 1000
+        The number of data points in the validation subsample. Must be greater than zero. If the data has fewer
+        points, all data points are used.
+    tol: float, default = 1e-3
+        The relative improvement of the quantization error below which the map is considered converged.
+    patience: int, default = 3
+        The number of consecutive evaluations below the tolerance before the training is stopped. Must be greater
+        than zero.
+    min_iterations: int, default = 0
+        The number of iterations before which the training is never stopped. Useful since the quantization error can
+        increase while the neighborhood radius is still large.
+    topographic_error: bool, default = False
+        Whether to compute the topographic error on the validation subsample as well.
+    early_stopping: bool, default = True
+        Whether to stop the training on convergence. If False, the curve is only recorded.
+
+    Attributes
+    ----------
+    curve: DataFrame
+        The recorded evaluations with the columns "iteration", "quantization_error" and "topographic_error" (NaN if
+        not computed). The quantization error is the mean distance of the validation data points to their BMU.
+    stopped_iteration: int or None
+        The iteration after which the training was stopped early, None if it ran for all iterations.
+    """
+
+    def __init__(self,
+                 interval=500,
+                 sample_size=1000,
+                 tol=1e-3,
+                 patience=3,
+                 min_iterations=0,
+                 topographic_error=False,
+                 early_stopping=True):
+        super().__init__(interval)
+        # parameter check
+        if sample_size <= 0:
+            raise ValueError("Sample size must be greater 0")
+        if tol < 0:
+            raise ValueError("Tolerance must be greater or equal 0")
+        if patience <= 0:
+            raise ValueError("Patience must be greater 0")
+
+        self.sample_size = sample_size
+        self.tol = tol
+        self.patience = patience
+        self.min_iterations = min_iterations
+        self.topographic_error = topographic_error
+        self.early_stopping = early_stopping
+        self.curve = None
+        self.stopped_iteration = None
+        self._sample = None
+        self._records = []
+        self._stalled = 0
+
+    def on_train_begin(self, som, data, iterations):
+        """
+        Draw the validation subsample and reset the recorded curve.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+        data: ndarray of shape (n_samples, n_features)
+            The training data.
+        iterations: int
+            The requested number of iterations.
+
+        Returns
+        -------
+        None
+        """
+        rows = som.rng.choice(len(data), size=min(self.sample_size, len(data)), replace=False)
+        self._sample = np.asarray(data[rows], dtype=float)
+        self._records = []
+        self._stalled = 0
+        self.curve = None
+        self.stopped_iteration = None
+
+    def on_iteration(self, som, iteration):
+        """
+        Evaluate the SOM on the validation subsample and decide whether the training should be stopped.
+
+        Parameters
+        ----------
+        som: StandardSOM
+            The SOM in training.
+        iteration: int
+            The number of iterations done so far.
+
+        Returns
+        -------
+        stop: bool
+            True if the training should be stopped, False otherwise.
+        """
+        k = 2 if self.topographic_error and len(som.codebook) > 1 else 1
+        distances, indices = _euclid_k_nearest(som.codebook, self._sample, k=k)
+        quantization_error = np.mean(distances[:, 0])
+        topographic_error = np.nan
+        if k == 2:
+            # the second BMU is not adjacent to the first BMU
+            topographic_error = np.mean(som.output_space_distance(som.positions[indices[:, 0]],
+                                                                  som.positions[indices[:, 1]]) != 1)
+
+        # relative improvement with respect to the previous evaluation
+        if self._records:
+            previous = self._records[-1][1]
+            improvement = (previous - quantization_error) / previous if previous > 0 else 0
+            self._stalled = self._stalled + 1 if improvement < self.tol else 0
+        self._records.append((iteration, quantization_error, topographic_error))
+        self.curve = pd.DataFrame(self._records,
+                                  columns=["iteration", "quantization_error", "topographic_error"])
+
+        if self.early_stopping and self._stalled >= self.patience and iteration >= self.min_iterations:
+            self.stopped_iteration = iteration
+            return True
+        return False
+
+    def on_train_end(self, som):
+        """
+        Store the recorded curve in the SOM.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The trained SOM.
+
+        Returns
+        -------
+        None
+        """
+        som.convergence_curve = self.curve
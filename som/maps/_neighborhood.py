@@ -5,7 +5,6 @@ This module gathers neighborhood-related functions for SOM training
 # Authors: Nikola Dragovic (@nikdra), 26.07.2020
 
 import numpy as np
-from scipy.stats import multivariate_normal
 
 
 def _positions_array_generic_2d(map_size):
@@ -51,24 +50,161 @@ def generate_hex_positions(map_size):
     return arr
 
 
+def _grid_window(map_size, topology, radius):
+    """
+    Helper function to get, for every unit, the indices of all units within a given distance on the grid.
+
+    The distance is the output space distance of the topology: the euclidean distance between the indices [i, j] for
+    a rectangular grid and the hexagonal (cube coordinate) distance for a hexagonal grid. The units are indexed in the
+    order of the positions arrays.
+
+    Parameters
+    ----------
+    map_size: int, int
+         The height and width of the grid.
+    topology: {"rectangular", "hexagonal"}
+        The topology of the grid.
+    radius: float
+        The maximum distance on the grid.
+
+    Returns
+    -------
+    window: ndarray of shape (n_units, n_offsets)
+        Contains the indices of the units within the distance of each unit, including the unit itself. Offsets that
+        fall outside of the grid are -1.
+    """
+    return _offset_units(map_size, topology, _grid_offsets(topology, radius), np.arange(map_size[0] * map_size[1]))
+
+
+def _grid_offsets(topology, radius):
+    """
+    Helper function to get the offsets on the grid within a given distance of a unit.
+
+    Parameters
+    ----------
+    topology: {"rectangular", "hexagonal"}
+        The topology of the grid.
+    radius: float
+        The maximum distance on the grid.
+
+    Returns
+    -------
+    offsets: ndarray of shape (n_offsets, 2)
+        The offsets [di, dj] of the indices for a rectangular grid, the offsets [dq, dr] of the cube coordinates for a
+        hexagonal grid.
+    """
+    reach = int(np.floor(radius))
+    steps = np.arange(-reach, reach + 1)
+    if topology == "rectangular":
+        # offsets [di, dj] within the euclidean distance
+        return np.array([(di, dj) for di in steps for dj in steps if di ** 2 + dj ** 2 <= radius ** 2])
+    # offsets [dq, dr] in cube coordinates within the hexagonal distance
+    return np.array([(dq, dr) for dq in steps for dr in steps if max(abs(dq), abs(dr), abs(dq + dr)) <= reach])
+
+
+def _offset_units(map_size, topology, offsets, units):
+    """
+    Helper function to get the indices of the units at given offsets on the grid from given units.
+
+    Parameters
+    ----------
+    map_size: int, int
+         The height and width of the grid.
+    topology: {"rectangular", "hexagonal"}
+        The topology of the grid.
+    offsets: ndarray of shape (n_offsets, 2)
+        The offsets, see _grid_offsets.
+    units: ndarray of size n
+        The indices of the units, in the order of the positions arrays.
+
+    Returns
+    -------
+    window: ndarray of shape (n, n_offsets)
+        Contains the index of the unit at each offset from each unit. Offsets that fall outside of the grid are -1.
+    """
+    height, width = map_size
+    units = np.asarray(units)[:, None]
+    if topology == "rectangular":
+        rows = units // width + offsets[:, 0]
+        columns = units % width + offsets[:, 1]
+        inside = (rows >= 0) & (rows < height) & (columns >= 0) & (columns < width)
+        window = rows * width + columns
+    else:
+        q = units // height
+        r = units % height - q // 2
+        q = q + offsets[:, 0]
+        # row of the unit within its column, see generate_hex_positions
+        rows = r + offsets[:, 1] + q // 2
+        inside = (q >= 0) & (q < width) & (rows >= 0) & (rows < height)
+        window = q * height + rows
+    return np.where(inside, window, -1)
+
+
+def _grid_neighbors(map_size, topology):
+    """
+    Helper function to get the adjacent units of every unit on the grid: the 4 neighbors of a rectangular grid and the
+    6 neighbors of a hexagonal grid.
+
+    Parameters
+    ----------
+    map_size: int, int
+         The height and width of the grid.
+    topology: {"rectangular", "hexagonal"}
+        The topology of the grid.
+
+    Returns
+    -------
+    neighbors: ndarray of shape (n_units, n_neighbors)
+        Contains the indices of the adjacent units of each unit. Neighbors that fall outside of the grid are -1.
+    """
+    window = _grid_window(map_size, topology, 1)
+    # drop the offset of the unit itself
+    return window[:, np.any(window != np.arange(len(window))[:, None], axis=0)]
+
+
+def _cartesian_positions(positions, topology):
+    """
+    Helper function to convert the positions of the units to cartesian coordinates in the plane.
+
+    Parameters
+    ----------
+    positions: ndarray of shape (n_units, n_dim)
+        The positions of the units. Indices [i, j] for a rectangular grid, cube coordinates for a hexagonal grid.
+    topology: {"rectangular", "hexagonal"}
+        The topology of the grid.
+
+    Returns
+    -------
+    coordinates: ndarray of shape (n_units, 2)
+        The horizontal and vertical cartesian coordinates of each unit.
+    """
+    if topology == "rectangular":
+        return positions[:, ::-1].astype(float)
+    # hexagonal topology, same layout as in the visualizations
+    return np.column_stack((positions[:, 0], 2. * np.sin(np.radians(60)) * (positions[:, 1] - positions[:, 2]) / 3.))
+
+
 def _gauss_neighborhood(neighborhood_distances, sigma):
     """
     Generate the normalized [0,1] pdf of a Gauss distribution for a given 1d neighborhood (distances).
 
+    The constant factor of the pdf cancels out in the normalization, so only the exponential is evaluated. Several
+    neighborhoods can be computed at once by passing a 2d array of distances and a column of standard deviations.
+
     Parameters
     ----------
-    neighborhood_distances: ndarray of size n_units
+    neighborhood_distances: ndarray of size n_units or of shape (n_maps, n_units)
         A ndarray that contains the distance of each unit of the SOM to the mean.
-    sigma: float
+    sigma: float or ndarray of shape (n_maps, 1)
         The standard deviation of the Gauss distribution. Akin to the neighborhood radius.
 
     Returns
     -------
-    neighborhood: ndarray of size n_units
+    neighborhood: ndarray of size n_units or of shape (n_maps, n_units)
         An array that contains normalized values in [0,1] that indicate how much each unit should be pulled
         towards the data sample.
     """
-    neighborhood = multivariate_normal.pdf(neighborhood_distances, mean=0, cov=sigma ** 2)
+    neighborhood = np.exp(-np.square(neighborhood_distances) / (2 * np.square(sigma)))
     return __norm_neighborhood(neighborhood)
 
 
@@ -78,11 +214,12 @@ def __norm_neighborhood(neighborhood):
 
     Parameters
     ----------
-    neighborhood: array of size n_units
+    neighborhood: array of size n_units or of shape (n_maps, n_units)
         The calculated neighborhood values for each unit in the SOM.
 
     Returns
     -------
     norm_neighborhood:
     """
-    return (neighborhood - np.min(neighborhood)) / np.ptp(neighborhood)
+    minimum = np.min(neighborhood, axis=-1, keepdims=True)
+    return (neighborhood - minimum) / (np.max(neighborhood, axis=-1, keepdims=True) - minimum)
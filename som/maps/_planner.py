@@ -0,0 +1,451 @@
+"""
+This module gathers the planning of the memory and the runtime of a training.
+"""
+
+import os
+from time import perf_counter
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# throughput of the machine used for the runtime estimates, see measure_rates
+_DEFAULT_RATES = {"elementwise": 4e8, "flops": 2e10, "iteration_overhead": 2e-5}
+# number of entries of a tile of a memory-mapped codebook (16 MiB), see StandardSOM.train
+_TILE_ENTRIES = 2 ** 21
+# number of units searched per data point by the hierarchical engine (3x3 blocks of 4x4 units)
+_HIERARCHICAL_CANDIDATES = 144
+
+
+class TrainingPlan:
+    """
+    The estimated peak memory and runtime of a training and the BMU engine and chunk size chosen for it, see
+    plan_training.
+
+    Pass the plan to StandardSOM.train, which then uses the chosen engine and chunk size and records the actual peak
+    memory and runtime next to the estimates in resource_usage.
+
+    Attributes
+    ----------
+    data_shape: int, int
+        The shape of the data (n_samples, n_features).
+    map_size: int, int
+        The size of the SOM (height, width).
+    available_memory: int
+        The memory in bytes available to the training.
+    estimates: DataFrame
+        The estimates per BMU engine (index) with the columns "train_bytes" (peak of the main loop), "find_bmu_bytes"
+        (peak of the search of the BMUs of the data), "peak_bytes", "train_seconds", "find_bmu_seconds", "seconds"
+        and "fits" (whether the peak fits into the available memory).
+    bmu_engine: str
+        The chosen BMU engine, the fastest one that fits into the available memory.
+    chunk_size: int
+        The chosen number of data points searched at once, the largest one (up to all data points) that fits.
+    use_codebook_file: bool
+        Whether the codebook does not fit into the memory next to the temporaries of the main loop, so it should be
+        memory-mapped, see the codebook_file parameter of StandardSOM.train.
+    peak_bytes: int
+        The estimated peak memory of the chosen configuration in bytes.
+    seconds: float
+        The estimated runtime of the chosen configuration in seconds.
+    fits: bool
+        Whether the chosen configuration fits into the available memory.
+    """
+
+    def __init__(self, data_shape, map_size, available_memory, estimates, bmu_engine, chunk_size, use_codebook_file):
+        self.data_shape = data_shape
+        self.map_size = map_size
+        self.available_memory = available_memory
+        self.estimates = estimates
+        self.bmu_engine = bmu_engine
+        self.chunk_size = chunk_size
+        self.use_codebook_file = use_codebook_file
+        self.peak_bytes = int(estimates.loc[bmu_engine, "peak_bytes"])
+        self.seconds = float(estimates.loc[bmu_engine, "seconds"])
+        self.fits = bool(estimates.loc[bmu_engine, "fits"])
+
+    def __repr__(self):
+        return "TrainingPlan(bmu_engine=" + repr(self.bmu_engine) + ", chunk_size=" + str(self.chunk_size) + \
+            ", use_codebook_file=" + str(self.use_codebook_file) + ", peak_bytes=" + str(self.peak_bytes) + \
+            ", seconds=" + str(round(self.seconds, 3)) + ")"
+
+
+def plan_training(data_shape,
+                  map_size,
+                  dtype="float64",
+                  available_memory=None,
+                  iterations=10000,
+                  bmu_engines=("kdtree", "brute"),
+                  scaling=False,
+                  rates=None):
+    """
+    Estimate the peak memory and the runtime of a training of a StandardSOM for each BMU engine, and choose the engine
+    and the chunk size of the search of the BMUs of the data.
+
+    The memory estimate counts the arrays allocated by the training: the codebook and the temporaries of one update of
+    the main loop (about three arrays of the size of the codebook), the schedules, the index of the BMU engine, the
+    (n_samples, 2) float64 and int64 arrays of the BMUs, the temporaries of one chunk of the BMU search and the float64
+    copy of the data that the BMU search makes if the data is of another dtype. The data itself is not counted, so
+    available_memory is the memory available next to the loaded data. The runtime estimate is a rough model with
+    the throughput of elementwise operations and matrix products of the machine, see measure_rates.
+
+    The chosen engine is the fastest one whose peak fits into the available memory with the largest chunk size (up
+    to all data points) that fits. If the codebook does not fit into the memory next to the temporaries of the main
+    loop, the plan uses a memory-mapped codebook, which is searched by the "brute" engine block by block.
+
+    Parameters
+    ----------
+    data_shape: int, int
+        The shape of the data (n_samples, n_features). Both must be greater than zero.
+    map_size: int, int
+        The size of the SOM (height, width). Both must be greater than zero.
+    dtype: str or dtype, default = "float64"
+        The dtype of the data.
+    available_memory: int, default = None
+        The memory in bytes available to the training. If None, the available memory of the machine.
+    iterations: int, default = 10000
+        The number of iterations of the training. Must be greater than zero.
+    bmu_engines: sequence of {"kdtree", "brute", "hierarchical"}, default = ("kdtree", "brute")
+        The BMU engines to choose from. "hierarchical" is approximate, so it is not considered by default.
+    scaling: bool, default = False
+        Whether the features are scaled on the fly, which makes a scaled copy of each chunk of the data.
+    rates: dict, default = None
+        The throughput of the machine, see measure_rates. If None, the rates of a typical machine.
+
+    Returns
+    -------
+    plan: TrainingPlan
+        The estimates and the chosen configuration.
+    """
+    n_samples, n_features = data_shape
+    # parameter check
+    if n_samples <= 0 or n_features <= 0:
+        raise ValueError("Number of samples and features must be greater 0")
+    if map_size[0] <= 0 or map_size[1] <= 0:
+        raise ValueError("height and width of the map must be greater zero")
+    if iterations <= 0:
+        raise ValueError("Iterations must be greater 0")
+    if len(bmu_engines) == 0:
+        raise ValueError("At least one BMU engine is needed")
+    for engine in bmu_engines:
+        if engine not in ["kdtree", "brute", "hierarchical"]:
+            raise ValueError("BMU engine " + str(engine) + " not supported")
+    if available_memory is None:
+        available_memory = _available_memory()
+    if available_memory <= 0:
+        raise ValueError("Available memory must be greater 0")
+    rates = dict(_DEFAULT_RATES, **(rates or {}))
+
+    n_units = map_size[0] * map_size[1]
+    train_seconds = iterations * (rates["iteration_overhead"] +
+                                  (7 * n_units * n_features + 20 * n_units) / rates["elementwise"])
+    # the float64 copy of the data of the BMU search
+    data_copy = 0 if np.dtype(dtype) == np.float64 else n_samples * n_features * 8
+
+    use_codebook_file = False
+    records, chunk_sizes = _estimate(n_samples, n_features, n_units, iterations, bmu_engines, scaling, False,
+                                     data_copy, available_memory)
+    if not any(fits for *_, fits in records):
+        # the codebook is memory-mapped if it does not fit next to the temporaries of the main loop
+        memmap_records, memmap_chunk_sizes = _estimate(n_samples, n_features, n_units, iterations, ["brute"], scaling,
+                                                       True, data_copy, available_memory)
+        if memmap_records[0][-1] or memmap_records[0][2] < min(record[2] for record in records):
+            use_codebook_file = True
+            records, chunk_sizes = memmap_records, memmap_chunk_sizes
+
+    estimates = pd.DataFrame([(train_bytes, find_bmu_bytes, peak_bytes, train_seconds,
+                               _find_bmu_seconds(engine, n_samples, n_features, n_units, rates), fits)
+                              for engine, train_bytes, peak_bytes, find_bmu_bytes, fits in records],
+                             columns=["train_bytes", "find_bmu_bytes", "peak_bytes", "train_seconds",
+                                      "find_bmu_seconds", "fits"],
+                             index=pd.Index([record[0] for record in records], name="bmu_engine"))
+    estimates["seconds"] = estimates["train_seconds"] + estimates["find_bmu_seconds"]
+
+    # the fastest engine that fits, the one with the smallest peak if none fits
+    fitting = estimates[estimates["fits"]]
+    bmu_engine = fitting["seconds"].idxmin() if len(fitting) > 0 else estimates["peak_bytes"].idxmin()
+    return TrainingPlan((n_samples, n_features), tuple(map_size), int(available_memory), estimates, bmu_engine,
+                        chunk_sizes[bmu_engine], use_codebook_file)
+
+
+def measure_rates(size=2 ** 20):
+    """
+    Measure the throughput of the machine for the runtime estimates of plan_training.
+
+    Parameters
+    ----------
+    size: int, default = 1048576
+        The number of entries of the arrays of the measurements. Must be greater than zero.
+
+    Returns
+    -------
+    rates: dict
+        The throughput of elementwise operations in entries per second ("elementwise"), of matrix products in floating
+        point operations per second ("flops") and the fixed cost of one iteration of the main loop in seconds
+        ("iteration_overhead").
+    """
+    # parameter check
+    if size <= 0:
+        raise ValueError("Size must be greater 0")
+    rng = np.random.default_rng(0)
+    side = max(1, int(np.sqrt(size)))
+    a = rng.random(side * side)
+    b = rng.random((side, side))
+    small = rng.random((16, 4))
+
+    start = perf_counter()
+    for _ in range(5):
+        np.sqrt(np.sum(np.square(a - 0.5)))
+    elementwise = 5 * 3 * a.size / max(perf_counter() - start, 1e-9)
+
+    start = perf_counter()
+    b @ b
+    flops = 2 * side ** 3 / max(perf_counter() - start, 1e-9)
+
+    # one iteration of the main loop on a tiny codebook is almost only the fixed cost
+    start = perf_counter()
+    for _ in range(100):
+        d = np.sqrt(np.sum(np.square(small - small[0]), axis=-1))
+        h = np.exp(-np.square(d - d[np.argmin(d)]))
+        small = small + 0.1 * h[:, None] * (small[0] - small)
+    overhead = (perf_counter() - start) / 100
+    return {"elementwise": elementwise, "flops": flops, "iteration_overhead": overhead}
+
+
+def _estimate(n_samples, n_features, n_units, iterations, bmu_engines, scaling, memmap, data_copy, available_memory):
+    """
+    Estimate the peak memory of a training for each BMU engine and choose the chunk size of the BMU search.
+
+    Parameters
+    ----------
+    n_samples: int
+        The number of data points.
+    n_features: int
+        The number of features.
+    n_units: int
+        The number of units.
+    iterations: int
+        The number of iterations.
+    bmu_engines: sequence of str
+        The BMU engines.
+    scaling: bool
+        Whether the features are scaled on the fly.
+    memmap: bool
+        Whether the codebook is memory-mapped.
+    data_copy: int
+        The size of the float64 copy of the data of the BMU search in bytes.
+    available_memory: int
+        The available memory in bytes.
+
+    Returns
+    -------
+    records: list of tuple
+        The engine, the peak of the main loop, the overall peak, the peak of the BMU search and whether it fits, per
+        engine.
+    chunk_sizes: dict
+        The chosen chunk size per engine.
+    """
+    codebook = n_units * n_features * 8
+    tile = min(n_units, max(1, _TILE_ENTRIES // n_features))
+    # schedules of the learning parameter and the radius, indices of the data points
+    schedules = 3 * iterations * 8
+    # positions and neighborhood arrays
+    units = 5 * n_units * 8
+    if memmap:
+        # the codebook lives in the file, one tile is updated at a time
+        train_bytes = schedules + units + 3 * tile * n_features * 8
+        resident = 0
+    else:
+        # the new codebook and two temporaries of the update next to the old codebook
+        train_bytes = schedules + units + 4 * codebook
+        resident = codebook
+    # the (n_samples, 2) float64 distances and int64 indices
+    bmu_arrays = n_samples * 2 * 16
+
+    records = []
+    chunk_sizes = {}
+    for engine in bmu_engines:
+        chunk = n_samples
+        while True:
+            find_bmu_bytes = schedules + resident + data_copy + bmu_arrays + \
+                _chunk_bytes(engine, chunk, n_features, n_units, tile if memmap else None, scaling)
+            peak_bytes = max(train_bytes, find_bmu_bytes)
+            if peak_bytes <= available_memory or chunk == 1:
+                break
+            chunk = max(1, chunk // 2)
+        chunk_sizes[engine] = chunk
+        records.append((engine, train_bytes, peak_bytes, find_bmu_bytes, peak_bytes <= available_memory))
+    return records, chunk_sizes
+
+
+def _chunk_bytes(engine, chunk, n_features, n_units, block_size, scaling):
+    """
+    Estimate the memory of the index of a BMU engine and the temporaries of the search of one chunk of data points.
+
+    Parameters
+    ----------
+    engine: str
+        The BMU engine.
+    chunk: int
+        The number of data points searched at once.
+    n_features: int
+        The number of features.
+    n_units: int
+        The number of units.
+    block_size: int or None
+        The number of units per block of a memory-mapped codebook, None if the codebook is in memory.
+    scaling: bool
+        Whether the chunk is scaled.
+
+    Returns
+    -------
+    bytes: int
+        The estimated memory in bytes.
+    """
+    # the query results of the chunk, with a third neighbor for the bounds
+    result = chunk * 3 * 16 + (chunk * n_features * 8 if scaling else 0)
+    if engine == "kdtree":
+        # the tree copies the codebook and keeps an index and the bounding boxes of the nodes
+        return n_units * n_features * 8 + n_units * 16 + n_units // 8 * n_features * 16 + result
+    if engine == "hierarchical":
+        # the block codebook and the candidate units of each data point
+        inner = min(chunk, 4096)
+        return n_units // 16 * n_features * 8 + inner * _HIERARCHICAL_CANDIDATES * (n_features + 2) * 8 + result
+    # brute force: the distance matrix of about one million entries, the product, the partition and the sums
+    units = n_units if block_size is None else block_size
+    inner = min(chunk, max(1, 2 ** 20 // units))
+    blocks = 0 if block_size is None else block_size * n_features * 8 + chunk * 4 * 16
+    return units * 8 + 3 * inner * units * 8 + blocks + result
+
+
+def _find_bmu_seconds(engine, n_samples, n_features, n_units, rates):
+    """
+    Estimate the runtime of the search of the first and second BMU of the data.
+
+    Parameters
+    ----------
+    engine: str
+        The BMU engine.
+    n_samples: int
+        The number of data points.
+    n_features: int
+        The number of features.
+    n_units: int
+        The number of units.
+    rates: dict
+        The throughput of the machine, see measure_rates.
+
+    Returns
+    -------
+    seconds: float
+        The estimated runtime in seconds.
+    """
+    elementwise = rates["elementwise"]
+    if engine == "kdtree":
+        # the number of visited units grows exponentially with the dimension up to all units
+        visited = min(n_units, 16 * 2 ** min(n_features / 2, 60)) + np.log2(n_units + 1)
+        build = n_units * np.log2(n_units + 1) * n_features / elementwise
+        return build + n_samples * visited * n_features * 4 / elementwise
+    if engine == "hierarchical":
+        coarse = n_units / 16
+        return n_samples * (coarse + _HIERARCHICAL_CANDIDATES) * n_features * 4 / elementwise
+    return n_samples * n_units * n_features * 2 / rates["flops"] + n_samples * n_units * 6 / elementwise
+
+
+class _PeakMemory:
+    """
+    Measure the peak memory of a block of code.
+
+    On Linux, the peak resident set size of the process is reset at the start and read at the end, which costs
+    nothing in between. Elsewhere, the allocations are traced with tracemalloc, which slows down code with many small
+    allocations considerably.
+    """
+
+    def __init__(self):
+        self._start = None
+        self._tracing = False
+        self._proc = False
+
+    def start(self):
+        """
+        Start the measurement.
+
+        Returns
+        -------
+        self: _PeakMemory
+            The started measurement.
+        """
+        try:
+            # resets the peak resident set size (VmHWM) of the process to the current one
+            with open("/proc/self/clear_refs", "w") as file:
+                file.write("5")
+            self._proc = True
+            self._start = _proc_status("VmRSS")
+            return self
+        except OSError:
+            self._proc = False
+        self._tracing = tracemalloc.is_tracing()
+        if not self._tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._start = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def stop(self):
+        """
+        Stop the measurement.
+
+        Returns
+        -------
+        peak: int
+            The peak memory in bytes above the memory at the start.
+        """
+        if self._proc:
+            return max(0, _proc_status("VmHWM") - self._start)
+        peak = tracemalloc.get_traced_memory()[1] - self._start
+        if not self._tracing:
+            tracemalloc.stop()
+        return peak
+
+
+def _proc_status(field):
+    """
+    Read a memory field of /proc/self/status.
+
+    Parameters
+    ----------
+    field: str
+        The name of the field, e.g. "VmRSS".
+
+    Returns
+    -------
+    bytes: int
+        The value in bytes.
+    """
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    raise OSError("Field " + field + " not found")
+
+
+def _available_memory():
+    """
+    Get the available memory of the machine.
+
+    Returns
+    -------
+    bytes: int
+        The available memory in bytes.
+    """
+    try:
+        with open("/proc/meminfo") as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        raise ValueError("Available memory unknown, pass available_memory")
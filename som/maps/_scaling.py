@@ -0,0 +1,182 @@
+"""
+This module gathers the scaling of features for the training of SOMs.
+"""
+
+import numpy as np
+
+
+class FeatureScaler:
+    """
+    Scaling of the features, fitted in one pass over the data and applied on the fly.
+
+    The statistics of the features are accumulated chunk by chunk: the mean and the variance with the parallel
+    variant of Welford's algorithm (Chan et al., 1979), which is numerically stable, and the minimum and maximum.
+    Each chunk is only read, so fitting needs no copy of the data. A data point x is scaled to (x - offset) / scale.
+
+    Parameters
+    ----------
+    method: {"standard", "minmax"}, default = "standard"
+        The scaling. "standard" scales every feature to mean zero and standard deviation one, "minmax" scales every
+        feature to the range [0, 1]. Constant features are only shifted.
+    chunk_size: int, default = 65536
+        The number of data points that are processed at once. Must be greater than zero.
+
+    Attributes
+    ----------
+    fitted: bool
+        True if the scaler has been fitted, False otherwise.
+    n_samples: int
+        The number of fitted data points.
+    mean: ndarray of size n_features or None
+        The mean of each feature.
+    var: ndarray of size n_features or None
+        The (population) variance of each feature.
+    min: ndarray of size n_features or None
+        The minimum of each feature.
+    max: ndarray of size n_features or None
+        The maximum of each feature.
+    offset: ndarray of size n_features or None
+        The offset of each feature.
+    scale: ndarray of size n_features or None
+        The scale of each feature.
+    """
+
+    def __init__(self, method="standard", chunk_size=65536):
+        # parameter check
+        if method not in ["standard", "minmax"]:
+            raise ValueError("Scaling " + str(method) + " not supported")
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be greater 0")
+
+        self.method = method
+        self.chunk_size = chunk_size
+        self.n_samples = 0
+        self.mean = None
+        self.var = None
+        self.min = None
+        self.max = None
+        self.offset = None
+        self.scale = None
+
+    @property
+    def fitted(self):
+        return self.offset is not None
+
+    def fit(self, data):
+        """
+        Fit the scaling to data.
+
+        Parameters
+        ----------
+        data: array-like of shape (n_samples, n_features)
+            The data.
+
+        Returns
+        -------
+        self: FeatureScaler
+            The fitted scaler.
+        """
+        self.n_samples = 0
+        self.mean = self.var = self.min = self.max = None
+        for start in range(0, len(data), self.chunk_size):
+            self.partial_fit(data[start:start + self.chunk_size])
+        return self
+
+    def partial_fit(self, chunk):
+        """
+        Update the scaling with a chunk of data points.
+
+        Parameters
+        ----------
+        chunk: array-like of shape (n_chunk, n_features)
+            The data points.
+
+        Returns
+        -------
+        self: FeatureScaler
+            The updated scaler.
+        """
+        chunk = np.asarray(chunk, dtype=float)
+        n_chunk = len(chunk)
+        if n_chunk == 0:
+            return self
+        chunk_mean = np.mean(chunk, axis=0)
+        chunk_m2 = np.sum((chunk - chunk_mean) ** 2, axis=0)
+        if self.n_samples == 0:
+            self.mean = chunk_mean
+            m2 = chunk_m2
+            self.min = np.min(chunk, axis=0)
+            self.max = np.max(chunk, axis=0)
+        else:
+            # merge the statistics of the chunk with the ones of the previous chunks
+            n_total = self.n_samples + n_chunk
+            delta = chunk_mean - self.mean
+            self.mean = self.mean + delta * n_chunk / n_total
+            m2 = self.var * self.n_samples + chunk_m2 + delta ** 2 * self.n_samples * n_chunk / n_total
+            self.min = np.minimum(self.min, np.min(chunk, axis=0))
+            self.max = np.maximum(self.max, np.max(chunk, axis=0))
+        self.n_samples += n_chunk
+        self.var = m2 / self.n_samples
+
+        if self.method == "standard":
+            self.offset, scale = self.mean, np.sqrt(self.var)
+        else:
+            self.offset, scale = self.min, self.max - self.min
+        self.scale = np.where(scale > 0, scale, 1.)
+        return self
+
+    def transform(self, data):
+        """
+        Scale data points.
+
+        Parameters
+        ----------
+        data: array-like of shape (n_samples, n_features) or (n_features,)
+            The data points.
+
+        Returns
+        -------
+        scaled: ndarray of the shape of data
+            The scaled data points.
+        """
+        return (np.asarray(data, dtype=float) - self.offset) / self.scale
+
+    def inverse_transform(self, data):
+        """
+        Undo the scaling of data points, e.g. to get the codebook in the original units of the features.
+
+        Parameters
+        ----------
+        data: array-like of shape (n_samples, n_features) or (n_features,)
+            The scaled data points.
+
+        Returns
+        -------
+        data: ndarray of the shape of data
+            The data points in the original units.
+        """
+        return np.asarray(data, dtype=float) * self.scale + self.offset
+
+
+class _ScaledView:
+    """
+    Read-only view of data that scales the rows on access, so the scaled data is never held in memory as a whole.
+
+    Parameters
+    ----------
+    data: ndarray of shape (n_samples, n_features)
+        The data.
+    scaler: FeatureScaler
+        The fitted scaler.
+    """
+
+    def __init__(self, data, scaler):
+        self.data = data
+        self.scaler = scaler
+        self.shape = data.shape
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, rows):
+        return self.scaler.transform(self.data[rows])
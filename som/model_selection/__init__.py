@@ -0,0 +1,6 @@
+"""
+The :mod:`som.model_selection` module includes the search for good hyperparameters of SOMs.
+"""
+from ._halving import SuccessiveHalvingSearch
+
+__all__ = ["SuccessiveHalvingSearch"]
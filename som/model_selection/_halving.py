@@ -0,0 +1,267 @@
+"""
+This module gathers the successive halving search for hyperparameters of SOMs.
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from som.maps import StandardSOM
+from som.quality.quantization import qe
+from som.quality.topology import topographic_error
+
+# parameters of the constructor and of the training of a StandardSOM
+_SOM_PARAMS = ["map_size", "neighborhood_radius", "topology"]
+_TRAIN_PARAMS = ["alpha", "init", "random_seed"]
+
+# training data of a worker process, set once per process
+_worker_data = None
+
+
+class SuccessiveHalvingSearch:
+    """
+    Search the hyperparameters of a StandardSOM with successive halving.
+
+    All candidates are trained on a small share of the iterations first. Only the best 1 / factor of them are
+    promoted to the next round, which trains them further for factor times as many iterations in total, until one
+    candidate is left after the full number of iterations. Most of the time is so spent on the promising candidates.
+
+    A promoted candidate continues from its codebook (warm start). Since the training decreases the learning parameter
+    and the neighborhood radius linearly towards zero within every call, round r trains from the learning parameter
+    and radius that the full schedule has reached after the iterations of the previous rounds, down to zero. Every
+    evaluated map is therefore converged, and the last round ends the full schedule.
+
+    The candidates of a round are trained in parallel in a pool of processes and evaluated with the quantization
+    error (som.quality.quantization.qe) and the topographic error (som.quality.topology.topographic_error). The two
+    errors have different scales, so the objective combines their ranks within the round:
+    (1 - te_weight) * rank(QE) + te_weight * rank(TE). Note that larger maps always have a smaller quantization
+    error, so candidates with different map sizes are rather compared by the topographic error.
+
+    Parameters
+    ----------
+    param_grid: dict or list of dict
+        The candidates. A dict maps parameter names to lists of values and stands for all combinations of them, a list
+        of dicts is the union of its grids. Supported parameters are "map_size", "neighborhood_radius" and
+        "topology" of StandardSOM and "alpha", "init" and "random_seed" of StandardSOM.train. Every candidate needs
+        at least a map size and a neighborhood radius.
+    iterations: int, default = 10000
+        The number of iterations of the last round. Must be greater than zero.
+    factor: int, default = 3
+        The fraction 1 / factor of the candidates is promoted to the next round. Must be at least 2.
+    te_weight: float, default = 0.5
+        The weight of the rank of the topographic error in the objective. Must be in [0, 1].
+    n_jobs: int, default = None
+        The number of worker processes. None uses all processors, 1 trains in the calling process.
+
+    Attributes
+    ----------
+    candidates: list of dict
+        The parameters of every candidate.
+    results: DataFrame or None
+        One row per round and candidate with the columns "round", "candidate", "iterations" (the total number of
+        iterations of the candidate so far), "quantization_error", "topographic_error", "score" (the objective, lower
+        is better) and "promoted", followed by the parameters of the candidate.
+    best_params: dict or None
+        The parameters of the best candidate.
+    best_som: StandardSOM or None
+        The best candidate, trained for all rounds.
+    """
+
+    def __init__(self, param_grid, iterations=10000, factor=3, te_weight=0.5, n_jobs=None):
+        self.candidates = _expand_grid(param_grid)
+        # parameter check
+        if iterations <= 0:
+            raise ValueError("Iterations must be greater 0")
+        if factor < 2:
+            raise ValueError("Factor must be at least 2")
+        if not 0 <= te_weight <= 1:
+            raise ValueError("Weight of the topographic error must be in [0, 1]")
+        for candidate in self.candidates:
+            unknown = set(candidate) - set(_SOM_PARAMS) - set(_TRAIN_PARAMS)
+            if unknown:
+                raise ValueError("Parameters " + str(sorted(unknown)) + " not supported")
+            if "map_size" not in candidate or "neighborhood_radius" not in candidate:
+                raise ValueError("Every candidate needs a map_size and a neighborhood_radius")
+
+        self.iterations = iterations
+        self.factor = factor
+        self.te_weight = te_weight
+        self.n_jobs = n_jobs
+        self.results = None
+        self.best_params = None
+        self.best_som = None
+
+    def budgets(self):
+        """
+        Get the total number of iterations of the candidates after each round.
+
+        Returns
+        -------
+        budgets: list of int
+            The total number of iterations after each round, strictly increasing, so every round trains. The last one
+            is iterations. With fewer iterations than rounds, the last round promotes the best candidate of more than
+            factor candidates.
+        """
+        n_rounds = 1
+        survivors = len(self.candidates)
+        while survivors > 1:
+            survivors = -(-survivors // self.factor)
+            n_rounds += 1
+        # at least one iteration per round
+        n_rounds = min(n_rounds, self.iterations)
+        budgets = []
+        for r in range(n_rounds):
+            budget = max(1, int(self.iterations / self.factor ** (n_rounds - 1 - r)))
+            budgets.append(max(budget, budgets[-1] + 1) if budgets else budget)
+        return budgets
+
+    def fit(self, data):
+        """
+        Run the search.
+
+        Parameters
+        ----------
+        data: DataFrame of shape (n_samples, n_features)
+            Data to train the SOMs. Should not contain the class labels for interpretable results.
+
+        Returns
+        -------
+        self: SuccessiveHalvingSearch
+            The finished search.
+        """
+        if data is None:
+            raise ValueError("Data is None")
+        budgets = self.budgets()
+        alive = list(range(len(self.candidates)))
+        soms = dict.fromkeys(alive)
+        records = []
+        n_jobs = self.n_jobs or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(min(n_jobs, len(alive)), initializer=_set_worker_data, initargs=(data,)) \
+            if n_jobs > 1 else None
+        try:
+            done = 0
+            for round_index, budget in enumerate(budgets):
+                # the share of the full schedule that is left after the previous rounds
+                remaining = 1 - done / self.iterations
+                tasks = [(self.candidates[candidate], soms[candidate], budget - done, remaining, round_index)
+                         for candidate in alive]
+                if pool is None:
+                    _set_worker_data(data)
+                    outcomes = [_train_candidate(*task) for task in tasks]
+                else:
+                    outcomes = list(pool.map(_train_candidate, *zip(*tasks)))
+                for candidate, (som, quantization_error, te) in zip(alive, outcomes):
+                    soms[candidate] = som
+                    records.append({"round": round_index, "candidate": candidate, "iterations": budget,
+                                    "quantization_error": quantization_error, "topographic_error": te})
+
+                # rank the candidates of this round
+                current = pd.DataFrame(records[-len(alive):])
+                score = (1 - self.te_weight) * current["quantization_error"].rank() + \
+                    self.te_weight * current["topographic_error"].rank()
+                n_promoted = -(-len(alive) // self.factor) if round_index < len(budgets) - 1 else 1
+                # stable order, so ties keep the order of the candidates
+                promoted = set(current["candidate"].to_numpy()[np.argsort(score.to_numpy(), kind="stable")]
+                               [:n_promoted])
+                for record, value in zip(records[-len(alive):], score):
+                    record["score"] = value
+                    record["promoted"] = record["candidate"] in promoted
+                for candidate in alive:
+                    if candidate not in promoted:
+                        soms[candidate] = None
+                alive = [candidate for candidate in alive if candidate in promoted]
+                done = budget
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.results = pd.DataFrame(records)
+        params = pd.DataFrame([self.candidates[candidate] for candidate in self.results["candidate"]],
+                              index=self.results.index)
+        self.results = pd.concat([self.results, params], axis=1)
+        self.best_params = dict(self.candidates[alive[0]])
+        self.best_som = soms[alive[0]]
+        return self
+
+
+def _expand_grid(param_grid):
+    """
+    Expand a parameter grid into the list of its candidates.
+
+    Parameters
+    ----------
+    param_grid: dict or list of dict
+        The grid, see SuccessiveHalvingSearch.
+
+    Returns
+    -------
+    candidates: list of dict
+        The parameters of every candidate.
+    """
+    if isinstance(param_grid, dict):
+        param_grid = [param_grid]
+    candidates = []
+    for grid in param_grid:
+        names = sorted(grid)
+        for values in itertools.product(*[grid[name] for name in names]):
+            candidates.append(dict(zip(names, values)))
+    if not candidates:
+        raise ValueError("param_grid has no candidates")
+    return candidates
+
+
+def _set_worker_data(data):
+    """
+    Set the training data of the current process.
+
+    Parameters
+    ----------
+    data: DataFrame of shape (n_samples, n_features)
+        The training data.
+
+    Returns
+    -------
+    None
+    """
+    global _worker_data
+    _worker_data = data
+
+
+def _train_candidate(params, som, iterations, remaining, round_index):
+    """
+    Train a candidate for one round and evaluate it.
+
+    Parameters
+    ----------
+    params: dict
+        The parameters of the candidate.
+    som: StandardSOM or None
+        The candidate after the previous round, None in the first round.
+    iterations: int
+        The number of iterations of this round.
+    remaining: float
+        The share of the full schedule of the learning parameter and the radius that is left.
+    round_index: int
+        The index of the round, added to the random seed.
+
+    Returns
+    -------
+    som: StandardSOM
+        The trained candidate.
+    quantization_error: float
+        The quantization error of the candidate.
+    topographic_error: float
+        The topographic error of the candidate.
+    """
+    codebook = None
+    if som is None:
+        som = StandardSOM(params["map_size"], params["neighborhood_radius"], params.get("topology", "rectangular"))
+    else:
+        codebook = som.codebook
+    som.train(_worker_data, iterations=iterations, alpha=params.get("alpha", 0.95) * remaining,
+              random_seed=params.get("random_seed", 1) + round_index, codebook=codebook,
+              init=params.get("init", "random"), neighborhood_radius=params["neighborhood_radius"] * remaining)
+    return som, qe(som), topographic_error(som)
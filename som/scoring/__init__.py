@@ -0,0 +1,8 @@
+"""
+The :mod:`som.scoring` module includes compact, frozen codebooks for the low-latency scoring of trained SOMs. It only
+depends on numpy, so it can be imported on scoring machines without pandas, scipy or matplotlib.
+"""
+from ._compact import CompactCodebook, export_codebook
+from ._server import ScoringServer, serve
+
+__all__ = ["CompactCodebook", "export_codebook", "ScoringServer", "serve"]
@@ -0,0 +1,22 @@
+"""
+Run a scoring server for a codebook exported with export_codebook.
+
+Example: python -m som.scoring codebook.npz --port 8000
+"""
+
+import argparse
+
+from ._compact import CompactCodebook
+from ._server import serve
+
+parser = argparse.ArgumentParser(prog="python -m som.scoring", description=__doc__.strip().splitlines()[0])
+parser.add_argument("codebook", help="the .npz file of the exported codebook")
+parser.add_argument("--host", default="127.0.0.1", help="the host of the TCP server")
+parser.add_argument("--port", type=int, default=8000, help="the port of the TCP server")
+parser.add_argument("--socket", default=None, help="the path of a Unix socket to listen on instead of TCP")
+parser.add_argument("--max-batch-size", type=int, default=256, help="the maximum number of vectors in a batch")
+parser.add_argument("--max-wait", type=float, default=0.002,
+                    help="the maximum time in seconds a vector waits for more vectors")
+arguments = parser.parse_args()
+serve(CompactCodebook.load(arguments.codebook), arguments.host, None if arguments.socket else arguments.port,
+      arguments.socket, arguments.max_batch_size, arguments.max_wait)
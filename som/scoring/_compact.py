@@ -0,0 +1,273 @@
+"""
+This module gathers quantized codebooks for the BMU search of trained SOMs.
+"""
+
+import numpy as np
+
+# largest absolute code of each quantization type
+_CODE_RANGE = {"int8": 127., "float16": 1.}
+
+
+class CompactCodebook:
+    """
+    Frozen, quantized codebook of a trained SOM for the BMU search of new data points.
+
+    Each feature is shifted by its offset and divided by its scale, so the codes of all units lie in [-127, 127]
+    (int8) or [-1, 1] (float16). An int8 codebook needs an eighth, a float16 codebook a quarter of the memory of the
+    float64 codebook. The squared norms of the scaled codes are precomputed, so the distances to all units are one
+    matrix product per chunk of units, computed in float32.
+
+    The quantization error can swap units that are nearly equally close. If the float32 codebook is kept, the
+    n_candidates nearest units of the quantized search are re-ranked with the exact distances, which recovers the
+    exact BMUs in almost all cases at the cost of another half of the memory of the float64 codebook.
+
+    Parameters
+    ----------
+    codes: ndarray of shape (n_units, n_features)
+        The quantized codebook, of type int8 or float16.
+    scale: ndarray of size n_features
+        The scale of each feature.
+    offset: ndarray of size n_features
+        The offset of each feature.
+    rerank_codebook: ndarray of shape (n_units, n_features), default = None
+        The float32 codebook for the exact re-ranking. None to skip the re-ranking.
+    input_offset: ndarray of size n_features, default = None
+        The offset of the feature scaling of the SOM (FeatureScaler.offset). Vectors are scaled to
+        (x - input_offset) / input_scale before the search, so they are compared in the space of the codebook. None if
+        the SOM was trained without scaling.
+    input_scale: ndarray of size n_features, default = None
+        The scale of the feature scaling of the SOM (FeatureScaler.scale). None if the SOM was trained without scaling.
+
+    Attributes
+    ----------
+    norms: ndarray of size n_units
+        The squared euclidean norms of the dequantized, centered codebook vectors.
+    nbytes: int
+        The memory used by the arrays of the codebook in bytes.
+    """
+
+    def __init__(self, codes, scale, offset, rerank_codebook=None, input_offset=None, input_scale=None):
+        # parameter check
+        if codes.dtype.name not in _CODE_RANGE:
+            raise ValueError("Code type " + codes.dtype.name + " not supported")
+        if codes.ndim != 2 or np.shape(scale) != codes.shape[1:] or np.shape(offset) != codes.shape[1:]:
+            raise ValueError("scale and offset must have one value per feature of the codes")
+        if rerank_codebook is not None and np.shape(rerank_codebook) != codes.shape:
+            raise ValueError("rerank_codebook must have the shape of the codes")
+        if (input_offset is None) != (input_scale is None):
+            raise ValueError("input_offset and input_scale must be given together")
+        if input_offset is not None and (np.shape(input_offset) != codes.shape[1:] or
+                                         np.shape(input_scale) != codes.shape[1:]):
+            raise ValueError("input_offset and input_scale must have one value per feature of the codes")
+
+        self.codes = codes
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.offset = np.asarray(offset, dtype=np.float32)
+        self.rerank_codebook = None if rerank_codebook is None else np.asarray(rerank_codebook, dtype=np.float32)
+        self.input_offset = None if input_offset is None else np.asarray(input_offset, dtype=np.float64)
+        self.input_scale = None if input_scale is None else np.asarray(input_scale, dtype=np.float64)
+        # the dequantized vector of a unit, minus the offset, is scale * code
+        scaled = self.codes.astype(np.float32) * self.scale
+        self.norms = np.einsum("ij,ij->i", scaled, scaled)
+
+    @classmethod
+    def quantize(cls, codebook, dtype="int8", rerank=True, scaler=None):
+        """
+        Quantize a codebook.
+
+        Parameters
+        ----------
+        codebook: array-like of shape (n_units, n_features)
+            The codebook, e.g. StandardSOM.codebook.
+        dtype: {"int8", "float16"}, default = "int8"
+            The type of the codes.
+        rerank: bool, default = True
+            Whether to keep the float32 codebook for the exact re-ranking of the candidates.
+        scaler: FeatureScaler, default = None
+            The fitted feature scaling of the codebook, e.g. StandardSOM.scaler, which is applied to the vectors of
+            every query. None if the codebook is in the space of the unscaled features.
+
+        Returns
+        -------
+        compact_codebook: CompactCodebook
+            The quantized codebook.
+        """
+        if dtype not in _CODE_RANGE:
+            raise ValueError("Code type " + str(dtype) + " not supported")
+        codebook = np.asarray(codebook, dtype=np.float64)
+        minimum = codebook.min(axis=0)
+        maximum = codebook.max(axis=0)
+        # center every feature on its range, constant features get the scale one
+        offset = (maximum + minimum) / 2
+        half_range = (maximum - minimum) / 2
+        scale = np.where(half_range > 0, half_range, 1.) / _CODE_RANGE[dtype]
+        codes = (codebook - offset) / scale
+        if dtype == "int8":
+            codes = np.clip(np.rint(codes), -127, 127)
+        return cls(codes.astype(dtype), scale, offset, codebook.astype(np.float32) if rerank else None,
+                   None if scaler is None else scaler.offset, None if scaler is None else scaler.scale)
+
+    @property
+    def nbytes(self):
+        arrays = [self.codes, self.scale, self.offset, self.norms]
+        if self.rerank_codebook is not None:
+            arrays.append(self.rerank_codebook)
+        if self.input_offset is not None:
+            arrays += [self.input_offset, self.input_scale]
+        return sum(array.nbytes for array in arrays)
+
+    def query(self, vectors, k=1, n_candidates=8, chunk_size=1024, unit_chunk_size=4096):
+        """
+        Find the k nearest units for many vectors.
+
+        Parameters
+        ----------
+        vectors: array-like of shape (n_vectors, n_features)
+            The vectors, e.g. data points.
+        k: int, default = 1
+            The number of nearest units. Must be greater than zero.
+        n_candidates: int, default = 8
+            The number of nearest units of the quantized search that are re-ranked with the float32 codebook. At
+            least k units are re-ranked. Ignored without the float32 codebook.
+        chunk_size: int, default = 1024
+            The number of vectors processed at once.
+        unit_chunk_size: int, default = 4096
+            The number of units whose codes are converted to float32 at once. Small chunks keep the converted codes
+            in the cache.
+
+        Returns
+        -------
+        distances: ndarray of shape (n_vectors, k)
+            The euclidean distances to the k nearest units, in increasing order. Exact for re-ranked units, computed
+            from the dequantized codebook otherwise.
+        indices: ndarray of shape (n_vectors, k)
+            The indices of the k nearest units.
+        """
+        # parameter check
+        if k <= 0:
+            raise ValueError("k must be greater 0")
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float64 if self.input_offset is not None else
+                                           np.float32))
+        if vectors.shape[1] != self.codes.shape[1]:
+            raise ValueError("vectors must have " + str(self.codes.shape[1]) + " features")
+        if self.input_offset is not None:
+            # into the space of the scaled features of the codebook
+            vectors = ((vectors - self.input_offset) / self.input_scale).astype(np.float32)
+
+        n_units = len(self.codes)
+        k = min(k, n_units)
+        rerank = self.rerank_codebook is not None
+        n_nearest = min(max(k, n_candidates), n_units) if rerank else k
+        distances = np.empty((len(vectors), k), dtype=np.float32)
+        indices = np.empty((len(vectors), k), dtype=np.intp)
+        for start in range(0, len(vectors), chunk_size):
+            centered = vectors[start:start + chunk_size] - self.offset
+            # squared distances to the dequantized codebook: |x - o|^2 - 2 (x - o) . (s c) + |s c|^2
+            weighted = centered * self.scale
+            squared = np.empty((len(centered), n_units), dtype=np.float32)
+            for unit_start in range(0, n_units, unit_chunk_size):
+                codes = self.codes[unit_start:unit_start + unit_chunk_size].astype(np.float32)
+                squared[:, unit_start:unit_start + unit_chunk_size] = \
+                    self.norms[unit_start:unit_start + unit_chunk_size] - 2 * weighted @ codes.T
+            squared += np.einsum("ij,ij->i", centered, centered)[:, None]
+            nearest = np.argpartition(squared, n_nearest - 1, axis=1)[:, :n_nearest] if n_nearest < n_units else \
+                np.broadcast_to(np.arange(n_units), squared.shape)
+            if rerank:
+                # exact squared distances to the candidates
+                differences = self.rerank_codebook[nearest] - vectors[start:start + chunk_size, None, :]
+                candidate_squared = np.einsum("ijk,ijk->ij", differences, differences)
+            else:
+                candidate_squared = np.take_along_axis(squared, nearest, axis=1)
+            order = np.argsort(candidate_squared, axis=1)[:, :k]
+            distances[start:start + chunk_size] = np.sqrt(np.maximum(np.take_along_axis(candidate_squared, order,
+                                                                                        axis=1), 0))
+            indices[start:start + chunk_size] = np.take_along_axis(nearest, order, axis=1)
+        return distances, indices
+
+    def predict(self, vectors):
+        """
+        Find the BMU for many vectors.
+
+        Parameters
+        ----------
+        vectors: array-like of shape (n_vectors, n_features)
+            The vectors, e.g. data points.
+
+        Returns
+        -------
+        bmus: ndarray of size n_vectors
+            The index of the BMU of each vector.
+        """
+        return self.query(vectors, k=1)[1][:, 0]
+
+    def save(self, path):
+        """
+        Save the codebook to a .npz file.
+
+        Parameters
+        ----------
+        path: str or file
+            The path of the file.
+
+        Returns
+        -------
+        None
+        """
+        arrays = {"codes": self.codes, "scale": self.scale, "offset": self.offset}
+        if self.rerank_codebook is not None:
+            arrays["rerank_codebook"] = self.rerank_codebook
+        if self.input_offset is not None:
+            arrays["input_offset"] = self.input_offset
+            arrays["input_scale"] = self.input_scale
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a codebook saved with save.
+
+        Parameters
+        ----------
+        path: str or file
+            The path of the file.
+
+        Returns
+        -------
+        compact_codebook: CompactCodebook
+            The loaded codebook.
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(arrays["codes"], arrays["scale"], arrays["offset"],
+                       arrays["rerank_codebook"] if "rerank_codebook" in arrays else None,
+                       arrays["input_offset"] if "input_offset" in arrays else None,
+                       arrays["input_scale"] if "input_scale" in arrays else None)
+
+
+def export_codebook(som, path=None, dtype="int8", rerank=True):
+    """
+    Export the codebook of a trained SOM for scoring.
+
+    Parameters
+    ----------
+    som: BaseSOM
+        The trained SOM.
+    path: str or file, default = None
+        The path of the .npz file to save the codebook to. None to not save it.
+    dtype: {"int8", "float16"}, default = "int8"
+        The type of the codes.
+    rerank: bool, default = True
+        Whether to keep the float32 codebook for the exact re-ranking of the candidates.
+
+    Returns
+    -------
+    compact_codebook: CompactCodebook
+        The quantized codebook. The indices of its units are the indices of the positions of the SOM. If the SOM was
+        trained with feature scaling, its scaler is exported as well, so the codebook is queried with unscaled data
+        like StandardSOM.predict.
+    """
+    if not som.trained:
+        raise ValueError("SOM is not trained")
+    compact_codebook = CompactCodebook.quantize(som.codebook, dtype, rerank, getattr(som, "scaler", None))
+    if path is not None:
+        compact_codebook.save(path)
+    return compact_codebook
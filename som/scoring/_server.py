@@ -0,0 +1,377 @@
+"""
+This module gathers a micro-batching server for the online scoring of trained SOMs.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+
+class ScoringServer:
+    """
+    Asyncio server that maps vectors onto a trained SOM in micro-batches.
+
+    Single vectors arrive one at a time, but the BMU search is much faster per vector for a batch. The server queues
+    all incoming vectors and answers them in batches: a batch is closed when it holds max_batch_size vectors or when
+    max_wait seconds have passed since its first vector arrived, and then answered with one call of model.predict in
+    a worker thread. New vectors are queued for the next batch in the meantime.
+
+    The server speaks a minimal HTTP/1.1 over TCP or a Unix socket:
+
+    - POST /predict with the JSON body {"vectors": [[...], ...]} or {"vector": [...]} answers {"bmus": [...]} or
+      {"bmu": ...}, the indices of the BMUs in the positions array of the SOM.
+    - GET /stats answers the counters, see stats.
+
+    Parameters
+    ----------
+    model: StandardSOM or CompactCodebook
+        The trained model. Any object with a method predict(vectors) that returns the BMU index of each vector can be
+        used.
+    max_batch_size: int, default = 256
+        The maximum number of vectors in a batch. Must be greater than zero.
+    max_wait: float, default = 0.002
+        The maximum time in seconds a vector waits for more vectors before its batch is answered. Must be greater or
+        equal zero.
+    latency_window: int, default = 10000
+        The number of recent requests of which the latency percentiles are computed. Must be greater than zero.
+
+    Attributes
+    ----------
+    n_features: int or None
+        The number of features of the vectors, from the codebook of the model. Requests with another number of
+        features are rejected before they are queued, so they do not fail the batch of other requests. None if the
+        model has no codebook.
+    """
+
+    def __init__(self, model, max_batch_size=256, max_wait=0.002, latency_window=10000):
+        # parameter check
+        if max_batch_size <= 0:
+            raise ValueError("Maximum batch size must be greater 0")
+        if max_wait < 0:
+            raise ValueError("Maximum wait must be greater or equal 0")
+        if latency_window <= 0:
+            raise ValueError("Latency window must be greater 0")
+
+        self.model = model
+        codebook = getattr(model, "codebook", getattr(model, "codes", None))
+        self.n_features = None if codebook is None else np.shape(codebook)[1]
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending = deque()
+        self._arrived = None
+        self._in_flight = 0
+        self._batcher = None
+        self._servers = []
+        self._started = None
+        self._latencies = deque(maxlen=latency_window)
+        self._counts = dict.fromkeys(["requests", "vectors", "batches", "errors"], 0)
+
+    async def start(self, host=None, port=None, path=None):
+        """
+        Start the batching and optionally listen for HTTP requests.
+
+        Parameters
+        ----------
+        host: str, default = None
+            The host of the TCP server, e.g. "127.0.0.1".
+        port: int, default = None
+            The port of the TCP server. 0 selects a free port, see ports. None to not listen on TCP.
+        path: str, default = None
+            The path of the Unix socket. None to not listen on a Unix socket.
+
+        Returns
+        -------
+        None
+        """
+        if self._batcher is None:
+            self._arrived = asyncio.Event()
+            self._batcher = asyncio.ensure_future(self.__batch_loop())
+            self._started = time.perf_counter()
+        if port is not None:
+            self._servers.append(await asyncio.start_server(self.__handle_connection, host, port))
+        if path is not None:
+            self._servers.append(await asyncio.start_unix_server(self.__handle_connection, path))
+
+    @property
+    def ports(self):
+        """
+        The ports of the TCP servers.
+        """
+        return [socket.getsockname()[1] for server in self._servers for socket in server.sockets
+                if isinstance(socket.getsockname(), tuple)]
+
+    async def close(self):
+        """
+        Stop listening and stop the batching. Queued vectors are answered before.
+
+        Returns
+        -------
+        None
+        """
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self._batcher is not None:
+            while self._pending or self._in_flight:
+                await asyncio.sleep(0.001)
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+    async def predict(self, vectors):
+        """
+        Find the BMUs of vectors through the batching.
+
+        Parameters
+        ----------
+        vectors: array-like of shape (n_vectors, n_features)
+            The vectors, e.g. events.
+
+        Returns
+        -------
+        bmus: ndarray of size n_vectors
+            The index of the BMU of each vector.
+        """
+        if self._batcher is None:
+            raise ValueError("Server is not started")
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=float))
+        try:
+            self.__check(vectors)
+        except ValueError:
+            self._counts["errors"] += 1
+            raise
+        arrived = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((vectors, future))
+        self._arrived.set()
+        try:
+            return await future
+        finally:
+            self._counts["requests"] += 1
+            self._latencies.append(time.perf_counter() - arrived)
+
+    def stats(self):
+        """
+        Get the counters of the server.
+
+        Returns
+        -------
+        stats: dict
+            The number of "requests", "vectors", "batches" and "errors" so far, the "mean_batch_size", the
+            "throughput" in vectors per second since the start, and the "latency_mean", "latency_p50" and
+            "latency_p99" in seconds of the recent requests.
+        """
+        stats = dict(self._counts)
+        stats["mean_batch_size"] = self._counts["vectors"] / self._counts["batches"] if self._counts["batches"] else 0.
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.
+        stats["throughput"] = self._counts["vectors"] / elapsed if elapsed > 0 else 0.
+        latencies = np.array(self._latencies)
+        for name, value in [("latency_mean", np.mean), ("latency_p50", lambda x: np.percentile(x, 50)),
+                            ("latency_p99", lambda x: np.percentile(x, 99))]:
+            stats[name] = float(value(latencies)) if len(latencies) else 0.
+        return stats
+
+    def __check(self, vectors):
+        """
+        Check the shape of the vectors of a request before it is queued.
+
+        Parameters
+        ----------
+        vectors: ndarray
+            The vectors of the request.
+
+        Returns
+        -------
+        None
+        """
+        if vectors.ndim != 2 or len(vectors) == 0:
+            raise ValueError("vectors must be a non-empty list of lists of numbers")
+        if self.n_features is not None and vectors.shape[1] != self.n_features:
+            raise ValueError("vectors must have " + str(self.n_features) + " features, not " + str(vectors.shape[1]))
+
+    async def __batch_loop(self):
+        """
+        Collect queued vectors into batches and answer them.
+
+        Returns
+        -------
+        None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            while not self._pending:
+                self._arrived.clear()
+                await self._arrived.wait()
+            deadline = loop.time() + self.max_wait
+            # wait for more vectors until the batch is full or the first vector waited long enough
+            while sum(len(vectors) for vectors, _ in self._pending) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            # take whole requests of the same width up to the maximum batch size, but at least one
+            requests = [self._pending.popleft()]
+            size = len(requests[0][0])
+            while self._pending and size + len(self._pending[0][0]) <= self.max_batch_size and \
+                    self._pending[0][0].shape[1] == requests[0][0].shape[1]:
+                requests.append(self._pending.popleft())
+                size += len(requests[-1][0])
+
+            self._in_flight = len(requests)
+            try:
+                bmus = await loop.run_in_executor(None, self.model.predict,
+                                                  np.concatenate([vectors for vectors, _ in requests]))
+            except Exception as error:
+                self._counts["errors"] += len(requests)
+                # without the traceback, which holds the frame of this loop
+                error = error.with_traceback(None)
+                for _, future in requests:
+                    if not future.done():
+                        future.set_exception(error)
+            else:
+                self._counts["batches"] += 1
+                self._counts["vectors"] += size
+                # split the answer among the requests
+                start = 0
+                for vectors, future in requests:
+                    if not future.done():
+                        future.set_result(bmus[start:start + len(vectors)])
+                    start += len(vectors)
+            self._in_flight = 0
+
+    async def __handle_connection(self, reader, writer):
+        """
+        Answer the HTTP requests of a connection.
+
+        Parameters
+        ----------
+        reader: StreamReader
+            The incoming stream.
+        writer: StreamWriter
+            The outgoing stream.
+
+        Returns
+        -------
+        None
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError("negative")
+                except ValueError:
+                    # the end of the body is unknown, so the connection cannot be reused
+                    status, answer = "400 Bad Request", {"error": "invalid Content-Length"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    method, target = (request_line.decode("latin-1").split() + ["", ""])[:2]
+                    status, answer = await self.__answer(method, target, body)
+                payload = json.dumps(answer).encode()
+                writer.write(("HTTP/1.1 " + status + "\r\nContent-Type: application/json\r\nContent-Length: " +
+                              str(len(payload)) + "\r\nConnection: " + ("keep-alive" if keep_alive else "close") +
+                              "\r\n\r\n").encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def __answer(self, method, target, body):
+        """
+        Answer an HTTP request.
+
+        Parameters
+        ----------
+        method: str
+            The HTTP method.
+        target: str
+            The requested path.
+        body: bytes
+            The body of the request.
+
+        Returns
+        -------
+        status: str
+            The HTTP status.
+        answer: dict
+            The JSON answer.
+        """
+        if method == "GET" and target == "/stats":
+            return "200 OK", self.stats()
+        if method != "POST" or target != "/predict":
+            return "404 Not Found", {"error": "unknown endpoint " + method + " " + target}
+        try:
+            request = json.loads(body)
+            single = "vector" in request
+            vectors = np.array([request["vector"]] if single else request["vectors"], dtype=float)
+            self.__check(vectors)
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            return "400 Bad Request", {"error": str(error)}
+        try:
+            bmus = (await self.predict(vectors)).tolist()
+        except Exception as error:
+            return "500 Internal Server Error", {"error": str(error)}
+        return "200 OK", {"bmu": bmus[0]} if single else {"bmus": bmus}
+
+
+def serve(model, host="127.0.0.1", port=8000, path=None, max_batch_size=256, max_wait=0.002):
+    """
+    Run a scoring server until it is interrupted.
+
+    Parameters
+    ----------
+    model: StandardSOM or CompactCodebook
+        The trained model, see ScoringServer.
+    host: str, default = "127.0.0.1"
+        The host of the TCP server.
+    port: int, default = 8000
+        The port of the TCP server. None to not listen on TCP.
+    path: str, default = None
+        The path of the Unix socket. None to not listen on a Unix socket.
+    max_batch_size: int, default = 256
+        The maximum number of vectors in a batch.
+    max_wait: float, default = 0.002
+        The maximum time in seconds a vector waits for more vectors before its batch is answered.
+
+    Returns
+    -------
+    None
+    """
+    async def run():
+        server = ScoringServer(model, max_batch_size, max_wait)
+        await server.start(host, port, path)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
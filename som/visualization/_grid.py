@@ -0,0 +1,79 @@
+"""
+This module gathers helpers to draw the units of a SOM as one collection of polygons.
+"""
+
+import numpy as np
+from matplotlib.collections import PolyCollection
+import matplotlib.pyplot as plt
+
+from som.maps._neighborhood import _cartesian_positions
+
+
+def _unit_polygons(som):
+    """
+    Get the vertices of the polygon of each unit, squares for a rectangular and hexagons for a hexagonal topology. The
+    layout is the same as in the other visualizations.
+
+    Parameters
+    ----------
+    som: StandardSOM
+        The SOM.
+
+    Returns
+    -------
+    vertices: ndarray of shape (n_units, n_vertices, 2)
+        The cartesian coordinates of the vertices of each unit.
+    """
+    centers = _cartesian_positions(som.positions, som.topology)
+    if som.topology == "rectangular":
+        n_vertices, radius, orientation = 4, np.sqrt(0.5), np.radians(45)
+    else:
+        n_vertices, radius, orientation = 6, 2. / 3., np.radians(30)
+    # same vertices as a matplotlib RegularPolygon, the first one points upwards before the rotation
+    angles = np.pi / 2 + orientation + 2 * np.pi * np.arange(n_vertices) / n_vertices
+    return centers[:, None, :] + radius * np.stack((np.cos(angles), np.sin(angles)), axis=-1)
+
+
+def _grid_plot(som, values, cmap, ax=None, norm=None, colorbar=True):
+    """
+    Draw the units of a SOM colored by a value per unit. All units are one PolyCollection, so the colors can be
+    changed later without drawing the units again, see PolyCollection.set_array.
+
+    Parameters
+    ----------
+    som: StandardSOM
+        The SOM.
+    values: ndarray of size n_units
+        The value of each unit.
+    cmap: str
+        The matplotlib color map for the map.
+    ax: Axes, default = None
+        The axes to draw into. If None, a new figure is created.
+    norm: Normalize, default = None
+        The normalization of the values. If None, the values are scaled linearly from their minimum to their maximum.
+    colorbar: bool, default = True
+        Whether to add a colorbar.
+
+    Returns
+    -------
+    collection: PolyCollection
+        The units.
+    """
+    if ax is None:
+        fig, ax = plt.subplots(1)
+    ax.set_aspect("equal")
+    ax.axis("off")
+    collection = PolyCollection(_unit_polygons(som), array=np.asarray(values, dtype=float), cmap=cmap, norm=norm,
+                                edgecolors="k", linewidths=0.5)
+    ax.add_collection(collection)
+    if som.topology == "rectangular":
+        # axis limits
+        ax.set_xlim(-1, som.map_size[1])
+        ax.set_ylim(-1, som.map_size[0])
+    else:
+        centers = _cartesian_positions(som.positions, som.topology)
+        ax.set_xlim(np.min(centers[:, 0]) - 2, np.max(centers[:, 0]) + 2)
+        ax.set_ylim(np.min(centers[:, 1]) - 2, np.max(centers[:, 1]) + 2)
+    if colorbar:
+        ax.figure.colorbar(collection, ax=ax)
+    return collection
@@ -9,6 +9,6 @@ Let :math:`M` be the set of units in the SOM and :math:`I` be the set of inputs.
 
 the set of inputs where :math:`m` is the BMU.
 """
-from ._density import hit_histogram
+from ._density import hit_histogram, sdh_map, smoothed_data_histogram
 
-__all__ = ["hit_histogram"]
+__all__ = ["hit_histogram", "sdh_map", "smoothed_data_histogram"]
@@ -5,6 +5,7 @@ from matplotlib.patches import RegularPolygon
 import matplotlib.pyplot as plt
 
 from som.maps import StandardSOM
+from .._grid import _grid_plot
 
 
 def __standard_som_hit_histogram(som: StandardSOM, cmap: str):
@@ -94,3 +95,97 @@ def hit_histogram(som, cmap: str = "Reds"):
     types[type(som)](som, cmap)
 
 
+def smoothed_data_histogram(som, data, k=3, chunk_size=65536):
+    """
+    Compute the smoothed data histogram (SDH) of the map.
+
+    Every data point votes for its k best-matching units with weights that decrease linearly with the rank: the
+    BMU of rank r (starting at 0) gets (k - r) / (1 + 2 + ... + k) of the vote, so every data point has a total vote
+    of one and k = 1 is the hit histogram. The data is searched one chunk at a time with the BMU engine of the SOM, and
+    the votes of each chunk are added up with np.bincount, so only arrays of shape (chunk_size, k) are allocated.
+
+    Parameters
+    ----------
+    som: BaseSOM
+        The trained SOM.
+    data: DataFrame or array-like of shape (n_samples, n_features)
+        The data points, e.g. the training data.
+    k: int, default = 3
+        The number of units each data point votes for. Must be between one and the number of units.
+    chunk_size: int, default = 65536
+        The number of data points searched at once. Must be greater than zero.
+
+    Returns
+    -------
+    sdh: ndarray of size n_units
+        The sum of the votes of each unit in the order of the positions array.
+    """
+    # parameter check
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be greater 0")
+    if not 1 <= k <= len(som.positions):
+        raise ValueError("k must be between 1 and the number of units")
+    samples = data.to_numpy() if hasattr(data, "to_numpy") else np.asarray(data)
+    # linearly decreasing votes by rank that sum up to one
+    weights = np.arange(k, 0, -1) / (k * (k + 1) / 2)
+    sdh = np.zeros(len(som.positions))
+    for start in range(0, len(samples), chunk_size):
+        _, indices = som.kneighbors(samples[start:start + chunk_size], k)
+        sdh += np.bincount(indices.ravel(), weights=np.broadcast_to(weights, indices.shape).ravel(),
+                           minlength=len(sdh))
+    return sdh
+
+
+def __standard_som_sdh(som: StandardSOM, data, k: int, cmap: str):
+    """
+    Plot the smoothed data histogram for a standard SOM. Plot depends on the topology of the neighborhood (hexagonal
+    or rectangular).
+
+    Parameters:
+    -----------
+    som: StandardSOM
+        The SOM for which the smoothed data histogram should be plotted.
+    data: DataFrame or array-like of shape (n_samples, n_features)
+        The data points.
+    k: int
+        The number of units each data point votes for.
+    cmap: str
+        The matplotlib color map for the map.
+
+    Returns:
+    --------
+    None
+    """
+    if som.codebook is not None and som.trained:
+        # all units are drawn as one collection
+        _grid_plot(som, smoothed_data_histogram(som, data, k), cmap)
+        # show
+        plt.show()
+
+
+def sdh_map(som, data, k: int = 3, cmap: str = "Reds"):
+    """
+    Show the smoothed data histogram for the map, see smoothed_data_histogram.
+
+    Parameters:
+    -----------
+    som: BaseSOM
+        The trained SOM where the smoothed data histogram should be visualized.
+    data: DataFrame or array-like of shape (n_samples, n_features)
+        The data points, e.g. the training data.
+    k: int, default = 3
+        The number of units each data point votes for. Larger values give a smoother histogram.
+    cmap: str, default = "Reds"
+        The string identifier for the matplotlib color map. See
+        https://matplotlib.org/3.3.0/tutorials/colors/colormaps.html for more information. The colors
+        are scaled linearly.
+    Returns:
+    --------
+    None
+    """
+    # define function for each SOM type
+    types = {
+        StandardSOM: __standard_som_sdh
+    }
+    # execute appropriate function
+    types[type(som)](som, data, k, cmap)
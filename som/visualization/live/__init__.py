@@ -0,0 +1,6 @@
+"""
+The :mod:`som.visualization.live` module includes visualizations that follow a SOM during its training.
+"""
+from ._live import LiveMonitor
+
+__all__ = ["LiveMonitor"]
@@ -0,0 +1,266 @@
+from time import perf_counter
+
+import numpy as np
+from matplotlib import animation
+import matplotlib.pyplot as plt
+
+from som.maps import Callback
+from som.maps._neighborhood import _grid_neighbors
+from .._grid import _grid_plot
+
+
+class LiveMonitor(Callback):
+    """
+    Show the map while it is trained, e.g. how the U-matrix organizes itself.
+
+    The units are drawn once as one collection when the codebook is initialized. A redraw only sets the colors of the
+    collection and redraws it with blitting, so the rest of the figure is not drawn again. A redraw is due every
+    interval iterations, but at most every seconds seconds, and the time between two redraws is at least the
+    duration of the last redraw times (1 - max_overhead) / max_overhead. Drawing therefore takes at most about
+    max_overhead of the training time, however large the map.
+
+    Without a display, e.g. on a server, the frames can be written to a file instead. The frames of an animated GIF
+    are written with Pillow, other formats (e.g. ".mp4") with the default matplotlib movie writer (e.g. ffmpeg).
+
+    Parameters
+    ----------
+    interval: int, default = 100
+        The number of iterations between two checks whether a redraw is due. Must be greater than zero.
+    seconds: float, default = 0.5
+        The minimum time between two redraws in seconds. Must be greater or equal 0.
+    max_overhead: float, default = 0.1
+        The maximum share of the training time spent drawing. Must be in (0, 1].
+    values: {"umatrix"} or int or function(som), default = "umatrix"
+        The value shown for each unit. "umatrix" is the mean distance of the weight vector of a unit to the ones of
+        its neighbors on the grid, an int is the index of a feature (component plane). A function gets the SOM and
+        returns an ndarray of size n_units.
+    cmap: str, default = "viridis"
+        The matplotlib color map. The colors are scaled to the range of the values of each frame.
+    output: str, default = None
+        The path of a file to write the frames to, e.g. "training.gif". If None, no frames are written.
+    fps: int, default = 10
+        The frames per second of the written file.
+    display: bool, default = None
+        Whether to show the figure in a window. If None, the figure is shown if no output is given.
+
+    Attributes
+    ----------
+    frames: int
+        The number of frames drawn in the last training.
+    draw_time: float
+        The total time spent drawing in the last training in seconds.
+    figure: Figure or None
+        The figure of the last training. Closed after the training if it is not displayed.
+    """
+
+    def __init__(self,
+                 interval=100,
+                 seconds=0.5,
+                 max_overhead=0.1,
+                 values="umatrix",
+                 cmap="viridis",
+                 output=None,
+                 fps=10,
+                 display=None):
+        super().__init__(interval)
+        # parameter check
+        if seconds < 0:
+            raise ValueError("Seconds must be greater or equal 0")
+        if not 0 < max_overhead <= 1:
+            raise ValueError("Maximum overhead must be in (0, 1]")
+        if not (values == "umatrix" or isinstance(values, (int, np.integer)) or callable(values)):
+            raise ValueError("Values " + str(values) + " not supported")
+        if fps <= 0:
+            raise ValueError("Frames per second must be greater 0")
+
+        self.seconds = seconds
+        self.max_overhead = max_overhead
+        self.values = values
+        self.cmap = cmap
+        self.output = output
+        self.fps = fps
+        self.display = output is None if display is None else display
+        self.frames = 0
+        self.draw_time = 0.
+        self.figure = None
+        self._collection = None
+        self._title = None
+        self._background = None
+        self._writer = None
+        self._neighbors = None
+        self._iterations = None
+        self._next_draw = 0.
+        self._drawn_iteration = None
+
+    def on_train_begin(self, som, data, iterations):
+        """
+        Reset the monitor.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+        data: ndarray of shape (n_samples, n_features)
+            The training data.
+        iterations: int
+            The requested number of iterations.
+
+        Returns
+        -------
+        None
+        """
+        self._iterations = iterations
+        self.frames = 0
+        self.draw_time = 0.
+        self._next_draw = 0.
+        self._drawn_iteration = None
+        if self.values == "umatrix":
+            # the neighbors of each unit on the grid, -1 outside of the grid
+            self._neighbors = _grid_neighbors(som.map_size, som.topology)
+
+    def on_phase_end(self, som, phase):
+        """
+        Draw the figure once the codebook is initialized.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+        phase: {"init", "main_loop", "find_bmu"}
+            The phase of the training.
+
+        Returns
+        -------
+        None
+        """
+        if phase != "init":
+            return
+        start = perf_counter()
+        fig, ax = plt.subplots(1)
+        self.figure = fig
+        # the units and the title are animated, they are only drawn by the redraws
+        self._collection = _grid_plot(som, self.__values(som), self.cmap, ax=ax, colorbar=False)
+        self._collection.set_animated(True)
+        self._title = ax.set_title("", animated=True)
+        if self.display:
+            plt.show(block=False)
+        fig.canvas.draw()
+        self._background = fig.canvas.copy_from_bbox(fig.bbox)
+        if self.output is not None:
+            writer = animation.PillowWriter if str(self.output).lower().endswith(".gif") else \
+                animation.writers[plt.rcParams["animation.writer"]]
+            self._writer = writer(fps=self.fps)
+            self._writer.setup(fig, self.output)
+        self.__draw(som, 0, start)
+
+    def on_iteration(self, som, iteration):
+        """
+        Redraw the map if a redraw is due.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+        iteration: int
+            The number of iterations done so far.
+
+        Returns
+        -------
+        stop: bool
+            Always False.
+        """
+        start = perf_counter()
+        if start >= self._next_draw:
+            self.__draw(som, iteration, start)
+        return False
+
+    def on_train_end(self, som):
+        """
+        Draw the trained map and finish the file.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The trained SOM.
+
+        Returns
+        -------
+        None
+        """
+        if self.figure is None:
+            return
+        # the codebook is unchanged since the last frame if it was drawn after the last iteration
+        if self._drawn_iteration != som.iterations_trained:
+            self.__draw(som, som.iterations_trained, perf_counter())
+        if self._writer is not None:
+            self._writer.finish()
+            self._writer = None
+        if not self.display:
+            plt.close(self.figure)
+        self._background = None
+
+    def __draw(self, som, iteration, start):
+        """
+        Set the colors of the units and redraw them with blitting, and write the frame to the file.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+        iteration: int
+            The number of iterations done so far.
+        start: float
+            The time at which the redraw started.
+
+        Returns
+        -------
+        None
+        """
+        values = self.__values(som)
+        self._collection.set_array(values)
+        self._collection.set_clim(np.min(values), np.max(values))
+        self._title.set_text("Iteration " + str(iteration) + " of " + str(self._iterations))
+        canvas = self.figure.canvas
+        canvas.restore_region(self._background)
+        self.figure.axes[0].draw_artist(self._collection)
+        self.figure.axes[0].draw_artist(self._title)
+        canvas.blit(self.figure.bbox)
+        canvas.flush_events()
+        if self._writer is not None:
+            # the file gets the complete figure including the animated artists
+            self._collection.set_animated(False)
+            self._title.set_animated(False)
+            self._writer.grab_frame()
+            self._collection.set_animated(True)
+            self._title.set_animated(True)
+        self.frames += 1
+        self._drawn_iteration = iteration
+        end = perf_counter()
+        self.draw_time += end - start
+        # wait long enough that drawing takes at most max_overhead of the time
+        self._next_draw = end + max(self.seconds, (end - start) * (1 - self.max_overhead) / self.max_overhead)
+
+    def __values(self, som):
+        """
+        Get the value of each unit.
+
+        Parameters
+        ----------
+        som: BaseSOM
+            The SOM in training.
+
+        Returns
+        -------
+        values: ndarray of size n_units
+            The value of each unit.
+        """
+        codebook = np.asarray(som.codebook)
+        if callable(self.values):
+            return np.asarray(self.values(som), dtype=float)
+        if self.values != "umatrix":
+            return codebook[:, self.values]
+        # mean distance to the neighbors on the grid
+        valid = self._neighbors >= 0
+        neighbors = np.where(valid, self._neighbors, np.arange(len(codebook))[:, None])
+        distances = np.sqrt(np.sum(np.square(codebook[neighbors] - codebook[:, None, :]), axis=-1))
+        return np.sum(distances * valid, axis=1) / np.maximum(np.sum(valid, axis=1), 1)
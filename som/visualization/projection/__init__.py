@@ -0,0 +1,10 @@
+"""
+The :mod:`som.visualization.projection` module includes visualizations of where the data points (and their class
+labels) lie on the map.
+
+Each data point is placed between its best-matching unit (BMU) and its second BMU, closer to the BMU the better it
+matches, and the points are aggregated into rasters of the density and the mix of the classes.
+"""
+from ._projection import project, projection_map, projection_raster
+
+__all__ = ["project", "projection_map", "projection_raster"]
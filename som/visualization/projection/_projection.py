@@ -0,0 +1,209 @@
+import numpy as np
+from matplotlib import cm
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import Normalize
+import matplotlib.pyplot as plt
+
+from som.maps import StandardSOM
+from som.maps._neighborhood import _cartesian_positions
+from .._grid import _unit_polygons
+
+
+def project(som, indices, distances):
+    """
+    Place data points on the map between their first and second BMU.
+
+    A data point with the distances d1 <= d2 to its first and second BMU is placed at the fraction d1 / (d1 + d2) of
+    the way from the center of the first BMU to the center of the second BMU: on the BMU if it matches exactly and
+    half way if both units match equally well. The positions are in the cartesian coordinates of the visualizations.
+
+    Parameters
+    ----------
+    som: BaseSOM
+        The SOM.
+    indices: ndarray of shape (n_samples, 2)
+        The indices of the first and second BMU of each data point, e.g. bmu_indices.
+    distances: ndarray of shape (n_samples, 2)
+        The distances to the first and second BMU of each data point, e.g. bmu_distances.
+
+    Returns
+    -------
+    positions: ndarray of shape (n_samples, 2)
+        The horizontal and vertical coordinates of each data point.
+    """
+    centers = _cartesian_positions(som.positions, som.topology)
+    total = distances[:, 0] + distances[:, 1]
+    # both distances are zero for duplicate units, the data point is placed on the first one
+    fraction = np.divide(distances[:, 0], total, out=np.zeros(len(total)), where=total > 0)
+    first = centers[indices[:, 0]]
+    return first + fraction[:, None] * (centers[indices[:, 1]] - first)
+
+
+def projection_raster(som, data=None, labels=None, resolution=4, chunk_size=65536):
+    """
+    Aggregate the projected data points (see project) into a raster of the density and of the mix of the classes.
+
+    The raster covers the units of the map with resolution pixels per unit distance. The data points are projected
+    and counted one chunk at a time with np.bincount, so the positions of all data points are never held at once.
+
+    Parameters
+    ----------
+    som: BaseSOM
+        The trained SOM.
+    data: DataFrame or array-like of shape (n_samples, n_features), default = None
+        The data points. Their first and second BMUs are searched with the BMU engine of the SOM. If None, the BMUs of
+        the training data (bmu_indices and bmu_distances) are used.
+    labels: array-like of size n_samples, default = None
+        The class label of each data point. If None, only the density is aggregated.
+    resolution: int, default = 4
+        The number of pixels per unit distance. Must be greater than zero. With 1 and a rectangular topology, every
+        pixel is a unit.
+    chunk_size: int, default = 65536
+        The number of data points projected at once. Must be greater than zero.
+
+    Returns
+    -------
+    density: ndarray of shape (height, width)
+        The number of data points in each pixel. The first row is the bottom of the map.
+    class_counts: ndarray of shape (n_classes, height, width) or None
+        The number of data points of each class in each pixel, None without labels.
+    classes: ndarray of size n_classes or None
+        The sorted classes, None without labels.
+    extent: float, float, float, float
+        The left, right, bottom and top coordinates of the raster, e.g. for matplotlib's imshow.
+    """
+    # parameter check
+    if resolution <= 0:
+        raise ValueError("Resolution must be greater 0")
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be greater 0")
+    if not som.trained:
+        raise ValueError("SOM is not trained")
+    if len(som.positions) < 2:
+        raise ValueError("The map must have at least 2 units")
+    n_samples = len(som.bmu_indices) if data is None else len(data)
+    if labels is not None and len(labels) != n_samples:
+        raise ValueError("labels must have one label per data point")
+    samples = None
+    if data is not None:
+        samples = data.to_numpy() if hasattr(data, "to_numpy") else np.asarray(data)
+
+    # the raster covers all unit polygons
+    vertices = _unit_polygons(som).reshape(-1, 2)
+    left, bottom = np.min(vertices, axis=0)
+    right, top = np.max(vertices, axis=0)
+    width = int(np.ceil((right - left) * resolution))
+    height = int(np.ceil((top - bottom) * resolution))
+    extent = (left, left + width / resolution, bottom, bottom + height / resolution)
+
+    classes = codes = None
+    if labels is not None:
+        classes, codes = np.unique(np.asarray(labels), return_inverse=True)
+    n_bins = width * height * (1 if classes is None else len(classes))
+    counts = np.zeros(n_bins)
+    for start in range(0, n_samples, chunk_size):
+        if samples is None:
+            indices = som.bmu_indices[start:start + chunk_size]
+            distances = som.bmu_distances[start:start + chunk_size]
+        else:
+            distances, indices = som.kneighbors(samples[start:start + chunk_size], 2)
+        positions = project(som, indices, distances)
+        # pixel of each data point, offset by the class
+        columns = np.clip(((positions[:, 0] - left) * resolution).astype(np.intp), 0, width - 1)
+        rows = np.clip(((positions[:, 1] - bottom) * resolution).astype(np.intp), 0, height - 1)
+        pixels = rows * width + columns
+        if codes is not None:
+            pixels += codes[start:start + chunk_size] * (width * height)
+        counts += np.bincount(pixels, minlength=n_bins)
+
+    if classes is None:
+        return counts.reshape(height, width), None, None, extent
+    class_counts = counts.reshape(len(classes), height, width)
+    return np.sum(class_counts, axis=0), class_counts, classes, extent
+
+
+def __standard_som_projection(som: StandardSOM, data, labels, resolution: int, cmap: str):
+    """
+    Plot the projection of the data for a standard SOM. Plot depends on the topology of the neighborhood (hexagonal or
+    rectangular).
+
+    Parameters:
+    -----------
+    som: StandardSOM
+        The SOM for which the projection should be plotted.
+    data: DataFrame or array-like of shape (n_samples, n_features) or None
+        The data points, None for the training data.
+    labels: array-like of size n_samples or None
+        The class label of each data point.
+    resolution: int
+        The number of pixels per unit distance.
+    cmap: str
+        The matplotlib color map for the density, or for the classes if labels are given.
+
+    Returns:
+    --------
+    None
+    """
+    if som.codebook is not None and som.trained:
+        density, class_counts, classes, extent = projection_raster(som, data, labels, resolution)
+        # plot
+        fig, ax = plt.subplots(1)
+        ax.set_aspect("equal")
+        plt.axis('off')
+        # the outlines of the units
+        ax.add_collection(PolyCollection(_unit_polygons(som), facecolors="none", edgecolors="0.8", linewidths=0.3))
+        if class_counts is None:
+            # empty pixels are transparent
+            normalized = Normalize(vmin=0, vmax=np.max(density))
+            ax.imshow(np.ma.masked_equal(density, 0), origin="lower", extent=extent, cmap=cmap, norm=normalized,
+                      interpolation="nearest")
+            plt.colorbar(cm.ScalarMappable(norm=normalized, cmap=cmap), ax=ax)
+        else:
+            # the color of a pixel is the mix of the colors of its classes, the opacity grows with the log density
+            colors = plt.get_cmap(cmap, len(classes))(np.arange(len(classes)))[:, :3]
+            mix = np.divide(class_counts, density, out=np.zeros_like(class_counts), where=density > 0)
+            image = np.empty(density.shape + (4,))
+            image[..., :3] = np.tensordot(mix, colors, axes=(0, 0))
+            image[..., 3] = np.log1p(density) / np.log1p(max(np.max(density), 1))
+            ax.imshow(image, origin="lower", extent=extent, interpolation="nearest")
+            ax.legend(handles=[plt.Line2D([], [], marker="s", linestyle="", color=color, label=str(label))
+                               for label, color in zip(classes, colors)], loc="upper left",
+                      bbox_to_anchor=(1, 1), frameon=False)
+        ax.set_xlim(extent[0], extent[1])
+        ax.set_ylim(extent[2], extent[3])
+        # show
+        plt.show()
+
+
+def projection_map(som, data=None, labels=None, resolution: int = 4, cmap: str = None):
+    """
+    Show where the data points lie on the map, see projection_raster. Only the raster is drawn, not the individual
+    data points, so millions of data points are as fast as a few.
+
+    Parameters:
+    -----------
+    som: BaseSOM
+        The trained SOM where the data should be projected.
+    data: DataFrame or array-like of shape (n_samples, n_features), default = None
+        The data points. If None, the training data.
+    labels: array-like of size n_samples, default = None
+        The class label of each data point. If given, the color of a pixel is the mix of the colors of its classes
+        and its opacity grows with the logarithm of its density. Otherwise the density is shown.
+    resolution: int, default = 4
+        The number of pixels per unit distance.
+    cmap: str, default = None
+        The string identifier for the matplotlib color map. See
+        https://matplotlib.org/3.3.0/tutorials/colors/colormaps.html for more information. If None, "Reds" for the
+        density and "tab10" for the classes.
+    Returns:
+    --------
+    None
+    """
+    if cmap is None:
+        cmap = "Reds" if labels is None else "tab10"
+    # define function for each SOM type
+    types = {
+        StandardSOM: __standard_som_projection
+    }
+    # execute appropriate function
+    types[type(som)](som, data, labels, resolution, cmap)
@@ -0,0 +1,102 @@
+"""
+This module gathers tests for the clustering of the units of SOMs.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import fcluster, linkage
+
+from som.clustering import UnitClustering
+from som.clustering._clustering import _kmeans, _ward
+from som.maps import StandardSOM
+from som.maps._neighborhood import _grid_neighbors
+
+
+def same_partition(a, b):
+    # two labelings are the same partition if the pairs of labels are a bijection
+    pairs = np.unique(np.column_stack((a, b)), axis=0)
+    return len(pairs) == len(np.unique(a)) == len(np.unique(b))
+
+
+class TestUnitClustering(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        self.som = StandardSOM((10, 10), 3).train(self.data, iterations=2000)
+
+    def test_ward_without_constraint_equals_scipy(self):
+        rng = np.random.default_rng(0)
+        points = rng.normal(size=(40, 3))
+        everyone = np.array([[j for j in range(40) if j != i] for i in range(40)])
+        labels, n_merges = _ward(points, everyone, 5)
+        self.assertEqual(n_merges, 35)
+        expected = fcluster(linkage(points, method="ward"), 5, criterion="maxclust")
+        self.assertTrue(same_partition(labels, expected))
+
+    def test_ward_clusters_are_connected(self):
+        for topology in ["rectangular", "hexagonal"]:
+            som = StandardSOM((10, 10), 3, topology).train(self.data, iterations=2000)
+            clustering = UnitClustering(som, n_clusters=6).fit()
+            np.testing.assert_array_equal(np.unique(clustering.unit_labels), np.arange(6))
+            neighbors = _grid_neighbors(som.map_size, som.topology)
+            for cluster in range(6):
+                # flood fill from the first unit of the cluster within the cluster
+                members = set(np.flatnonzero(clustering.unit_labels == cluster).tolist())
+                reached, frontier = set(), [min(members)]
+                while frontier:
+                    unit = frontier.pop()
+                    if unit in reached:
+                        continue
+                    reached.add(unit)
+                    frontier.extend(n for n in neighbors[unit].tolist() if n in members)
+                self.assertEqual(reached, members)
+
+    def test_kmeans(self):
+        clustering = UnitClustering(self.som, n_clusters=5, method="kmeans").fit()
+        np.testing.assert_array_equal(np.unique(clustering.unit_labels), np.arange(5))
+        # every unit is closest to the centroid of its cluster
+        distances = np.linalg.norm(self.som.codebook[:, None, :] - clustering.centroids, axis=-1)
+        np.testing.assert_array_equal(np.argmin(distances, axis=1), clustering.unit_labels)
+        self.assertLessEqual(clustering.n_iter, 300)
+        again = UnitClustering(self.som, n_clusters=5, method="kmeans").fit()
+        np.testing.assert_array_equal(again.unit_labels, clustering.unit_labels)
+
+    def test_kmeans_reseeds_empty_cluster(self):
+        # the third centroid of k-means++ duplicates one of the first two, so one cluster is empty after the assignment
+        codebook = np.array([[0.], [0.], [0.], [0.], [10.]])
+        for seed in range(5):
+            labels, _ = _kmeans(codebook, 3, 1, np.random.default_rng(seed))
+            np.testing.assert_array_equal(np.bincount(labels, minlength=3) > 0, True)
+            labels, _ = _kmeans(codebook, 3, 300, np.random.default_rng(seed))
+            self.assertEqual(len(np.unique(labels)), 3)
+            self.assertEqual(len(np.unique(labels[:4])), 2)
+
+    def test_data_labels(self):
+        for method in ["ward", "kmeans"]:
+            clustering = UnitClustering(self.som, n_clusters=4, method=method).fit()
+            np.testing.assert_array_equal(clustering.labels, clustering.unit_labels[self.som.bmu_indices[:, 0]])
+            np.testing.assert_array_equal(clustering.predict(self.data), clustering.labels)
+            # the first unit is in cluster 0
+            self.assertEqual(clustering.unit_labels[0], 0)
+
+    def test_inertia_decreases_with_more_clusters(self):
+        inertia = [UnitClustering(self.som, n_clusters=k).fit().inertia for k in [1, 5, 20, 100]]
+        self.assertTrue(np.all(np.diff(inertia) < 0))
+        self.assertAlmostEqual(inertia[-1], 0)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            UnitClustering(StandardSOM((10, 10), 3))
+        with self.assertRaises(ValueError):
+            UnitClustering(self.som, n_clusters=0)
+        with self.assertRaises(ValueError):
+            UnitClustering(self.som, n_clusters=101)
+        with self.assertRaises(ValueError):
+            UnitClustering(self.som, method="test")
+        with self.assertRaises(ValueError):
+            UnitClustering(self.som, max_iter=0)
+        with self.assertRaises(ValueError):
+            UnitClustering(self.som).predict(self.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
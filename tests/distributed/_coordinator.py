@@ -0,0 +1,95 @@
+"""
+This module gathers tests for the coordinator of the distributed batch training and the local cluster of workers.
+"""
+
+import unittest
+from contextlib import ExitStack
+import numpy as np
+import pandas as pd
+
+from som.distributed import BatchCoordinator, BatchWorker, local_cluster
+from som.distributed._coordinator import _batch_update
+from som.maps import StandardSOM
+
+
+class TestBatchCoordinator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = pd.read_csv('../data/test_data.csv').values
+        cls.stack = ExitStack()
+        # three worker processes on localhost with unequal shards
+        cls.addresses = cls.stack.enter_context(local_cluster(np.array_split(cls.data, [10, 70])))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stack.close()
+
+    def test_parameters(self):
+        self.assertRaises(ValueError, BatchCoordinator, [])
+        with BatchCoordinator(self.addresses) as coordinator:
+            self.assertEqual(coordinator.n_samples, len(self.data))
+            self.assertEqual(coordinator.n_features, self.data.shape[1])
+            som = StandardSOM((4, 5), 2)
+            self.assertRaises(ValueError, coordinator.train, som, epochs=0)
+            self.assertRaises(ValueError, coordinator.train, som, neighborhood_radius=0)
+            self.assertRaises(ValueError, coordinator.train, som, final_radius=3)
+            self.assertRaises(ValueError, coordinator.train, som, codebook=np.zeros((20, 1)))
+
+    def test_same_as_sequential_batch_training(self):
+        for topology in ["rectangular", "hexagonal"]:
+            som = StandardSOM((4, 5), 2, topology=topology)
+            with BatchCoordinator(self.addresses) as coordinator:
+                coordinator.train(som, epochs=5, final_radius=0.5)
+            # the same epochs in one process on all data
+            reference = StandardSOM((4, 5), 2, topology=topology)
+            codebook = np.random.default_rng(1).random((20, self.data.shape[1])) * \
+                (self.data.max(axis=0) - self.data.min(axis=0)) + self.data.min(axis=0)
+            worker = BatchWorker(self.data)
+            for radius in np.linspace(2, 0.5, 5):
+                sums, counts, _ = worker.partial_sums(codebook)
+                codebook = _batch_update(reference, codebook, sums, counts, radius, block_size=3)
+            worker.close()
+            np.testing.assert_allclose(som.codebook, codebook)
+
+    def test_sharding_does_not_matter(self):
+        som = StandardSOM((4, 5), 2)
+        with BatchCoordinator(self.addresses) as coordinator:
+            coordinator.train(som, epochs=5)
+        with local_cluster([self.data]) as addresses:
+            with BatchCoordinator(addresses) as coordinator:
+                single = coordinator.train(StandardSOM((4, 5), 2), epochs=5)
+        np.testing.assert_allclose(som.codebook, single.codebook)
+        np.testing.assert_array_equal(som.bmu_indices, single.bmu_indices)
+
+    def test_trained_som(self):
+        som = StandardSOM((4, 5), 2)
+        with BatchCoordinator(self.addresses) as coordinator:
+            coordinator.train(som, epochs=8, random_seed=3)
+            history = coordinator.history
+            self.assertGreater(coordinator.bytes_received, 0)
+        self.assertTrue(som.trained)
+        self.assertEqual(som.iterations_trained, 8)
+        self.assertEqual(len(history), 8)
+        self.assertEqual(history["radius"].iloc[-1], 1)
+        # the BMUs are collected in the order of the workers
+        self.assertEqual(som.bmu_indices.shape, (len(self.data), 2))
+        np.testing.assert_array_equal(som.bmu_indices[:, 0], som.predict(pd.DataFrame(self.data)))
+        self.assertLess(np.mean(som.bmu_distances[:, 0]), history["quantization_error"].iloc[0])
+        # the quantization error of an epoch is measured before its update
+        self.assertGreater(history["quantization_error"].iloc[0], history["quantization_error"].iloc[-1])
+
+    def test_codebook_only(self):
+        som = StandardSOM((4, 5), 2)
+        codebook = np.tile(self.data.mean(axis=0), (20, 1))
+        with BatchCoordinator(self.addresses) as coordinator:
+            coordinator.train(som, epochs=1, codebook=codebook, collect_bmus=False)
+            # one codebook to and two arrays of its size from each worker, independent of the number of data points
+            self.assertLess(coordinator.bytes_sent, 3 * (codebook.nbytes + 200))
+        self.assertIsNone(som.bmu_indices)
+        # all data points have the same BMU, so every unit moves to the mean of the data
+        np.testing.assert_allclose(som.codebook, codebook)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+This module gathers tests for the binary message format of the distributed batch training.
+"""
+
+import socket
+import unittest
+import numpy as np
+
+from som.distributed._protocol import _EPOCH, _recv_message, _send_message
+
+
+class TestProtocol(unittest.TestCase):
+
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_round_trip(self):
+        arrays = [np.arange(12.).reshape(3, 4).T, np.ones((2, 3), dtype=np.float32), np.arange(5), np.array(7.5),
+                  np.array([True, False]), np.empty((0, 3))]
+        n_bytes = _send_message(self.sender, _EPOCH, arrays)
+        command, received, received_bytes = _recv_message(self.receiver)
+        self.assertEqual(command, _EPOCH)
+        self.assertEqual(received_bytes, n_bytes)
+        self.assertEqual(len(received), len(arrays))
+        for array, copy in zip(arrays, received):
+            self.assertEqual(copy.shape, array.shape)
+            np.testing.assert_array_equal(copy, array)
+        self.assertEqual(received[1].dtype, np.float32)
+        self.assertEqual(received[2].dtype, np.int64)
+        self.assertEqual(received[4].dtype, np.uint8)
+
+    def test_raw_encoding(self):
+        # a header per message and per array, and no overhead per value
+        codebook = np.zeros((100, 10))
+        self.assertEqual(_send_message(self.sender, _EPOCH, [codebook]), 9 + 2 + 2 * 8 + codebook.nbytes)
+
+    def test_unsupported_dtype(self):
+        self.assertRaises(ValueError, _send_message, self.sender, _EPOCH, [np.zeros(3, dtype=complex)])
+
+    def test_invalid_message(self):
+        self.sender.sendall(b"GET / HTTP/1.1\r\n")
+        self.assertRaises(ConnectionError, _recv_message, self.receiver)
+
+    def test_closed_connection(self):
+        self.sender.close()
+        self.assertRaises(ConnectionError, _recv_message, self.receiver)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+This module gathers tests for the worker of the distributed batch training.
+"""
+
+import socket
+import threading
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.distributed import BatchCoordinator, BatchWorker
+from som.distributed._protocol import _EPOCH, _ERROR, _INFO, _RESULT, _SHUTDOWN, _recv_message, _send_message
+
+
+class TestBatchWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.data = pd.read_csv('../data/test_data.csv').values
+        self.codebook = np.random.default_rng(0).normal(size=(16, self.data.shape[1]))
+
+    def serve(self, worker):
+        thread = threading.Thread(target=worker.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def test_parameters(self):
+        self.assertRaises(ValueError, BatchWorker, self.data[0])
+        self.assertRaises(ValueError, BatchWorker, self.data, chunk_size=0)
+
+    def test_partial_sums(self):
+        worker = BatchWorker(self.data, chunk_size=7)
+        sums, counts, distance_sum = worker.partial_sums(self.codebook)
+        worker.close()
+        distances = np.sqrt(np.sum(np.square(self.data[:, None, :] - self.codebook[None, :, :]), axis=-1))
+        bmus = np.argmin(distances, axis=1)
+        np.testing.assert_array_equal(counts, np.bincount(bmus, minlength=16))
+        for unit in range(16):
+            np.testing.assert_allclose(sums[unit], self.data[bmus == unit].sum(axis=0))
+        self.assertAlmostEqual(distance_sum, np.sum(np.min(distances, axis=1)))
+
+    def test_info_and_bmus(self):
+        worker = BatchWorker(self.data, chunk_size=7)
+        n_samples, mins, maxs = worker.info()
+        distances, indices = worker.bmus(self.codebook)
+        worker.close()
+        self.assertEqual(n_samples, len(self.data))
+        np.testing.assert_array_equal(mins, self.data.min(axis=0))
+        np.testing.assert_array_equal(maxs, self.data.max(axis=0))
+        self.assertEqual(indices.shape, (len(self.data), 2))
+        self.assertTrue(np.all(distances[:, 0] <= distances[:, 1]))
+
+    def test_errors_are_sent_to_the_coordinator(self):
+        worker = BatchWorker(self.data)
+        thread = self.serve(worker)
+        with socket.create_connection(worker.address, timeout=10) as sock:
+            # a codebook with the wrong number of features and an unknown command fail, the worker keeps serving
+            _send_message(sock, _EPOCH, [np.zeros((4, 1))])
+            self.assertEqual(_recv_message(sock)[0], _ERROR)
+            _send_message(sock, 99)
+            command, arrays, _ = _recv_message(sock)
+            self.assertEqual(command, _ERROR)
+            self.assertIn("not supported", arrays[0].tobytes().decode())
+            _send_message(sock, _INFO)
+            command, arrays, _ = _recv_message(sock)
+            self.assertEqual(command, _RESULT)
+            self.assertEqual(arrays[0], len(self.data))
+            _send_message(sock, _SHUTDOWN)
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+
+    def test_serves_one_coordinator_after_the_other(self):
+        worker = BatchWorker(self.data)
+        thread = self.serve(worker)
+        for _ in range(2):
+            with BatchCoordinator([worker.address], timeout=10) as coordinator:
+                self.assertEqual(coordinator.n_samples, len(self.data))
+        self.assertTrue(thread.is_alive())
+        coordinator = BatchCoordinator([worker.address], timeout=10).connect()
+        coordinator.close(shutdown=True)
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
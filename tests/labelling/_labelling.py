@@ -0,0 +1,73 @@
+"""
+This module gathers tests for the labelling of units and the classification by best-matching units.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.labelling import SOMClassifier
+from som.maps import StandardSOM
+
+
+class TestSOMClassifier(unittest.TestCase):
+    def setUp(self):
+        data = pd.read_csv('../data/test_data.csv')
+        self.labels = data['Class'].to_numpy()
+        self.data = data.drop(['Class'], axis=1)
+        self.som = StandardSOM((10, 10), 3).train(self.data, iterations=2000)
+
+    def test_histogram_and_purity(self):
+        classifier = SOMClassifier(self.som).fit(self.labels)
+        np.testing.assert_array_equal(classifier.classes, np.unique(self.labels))
+        self.assertEqual(np.sum(classifier.histogram), len(self.labels))
+        for unit, members in self.som.get_first_bmus().items():
+            hits = pd.Series(self.labels[self.som.bmu_indices[:, 0] == unit]).value_counts()
+            self.assertEqual(np.max(classifier.histogram[unit]), hits.iloc[0])
+            self.assertAlmostEqual(classifier.unit_purity[unit], hits.iloc[0] / len(members))
+        empty = np.sum(classifier.histogram, axis=1) == 0
+        self.assertTrue(np.all(np.isnan(classifier.unit_purity[empty])))
+        np.testing.assert_array_equal(classifier.filled, empty)
+        self.assertAlmostEqual(classifier.purity, np.sum(np.max(classifier.histogram, axis=1)) / len(self.labels))
+
+    def test_predict_label(self):
+        classifier = SOMClassifier(self.som).fit(self.labels)
+        predicted = classifier.predict_label(self.data)
+        np.testing.assert_array_equal(predicted, classifier.unit_labels[self.som.bmu_indices[:, 0]])
+        # the accuracy on the training data is the purity
+        self.assertAlmostEqual(np.mean(predicted == self.labels), classifier.purity)
+
+    def test_fit_on_new_data(self):
+        expected = SOMClassifier(self.som).fit(self.labels)
+        classifier = SOMClassifier(self.som).fit(self.labels, self.data.to_numpy())
+        np.testing.assert_array_equal(classifier.histogram, expected.histogram)
+        np.testing.assert_array_equal(classifier.unit_labels, expected.unit_labels)
+
+    def test_fill_from_nearest_labelled_unit(self):
+        som = StandardSOM((1, 5), 1)
+        som.trained = True
+        som.codebook = np.array([[0.], [1.], [2.6], [3.], [4.]])
+        som.bmu_indices = np.array([[0, 1], [4, 3]])
+        classifier = SOMClassifier(som).fit(["a", "b"])
+        # unit 2 is reached from units 1 and 3 and its weight vector is closer to unit 3
+        np.testing.assert_array_equal(classifier.unit_labels, ["a", "a", "b", "b", "b"])
+        np.testing.assert_array_equal(classifier.filled, [False, True, True, True, False])
+        classifier = SOMClassifier(som, fill_empty=False, unknown="?").fit(["a", "b"])
+        np.testing.assert_array_equal(classifier.unit_labels, ["a", "?", "?", "?", "b"])
+        self.assertFalse(np.any(classifier.filled))
+
+    def test_hexagonal(self):
+        som = StandardSOM((10, 10), 3, "hexagonal").train(self.data, iterations=2000)
+        classifier = SOMClassifier(som).fit(self.labels)
+        self.assertTrue(np.all(np.isin(classifier.unit_labels, classifier.classes)))
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            SOMClassifier(StandardSOM((10, 10), 3))
+        with self.assertRaises(ValueError):
+            SOMClassifier(self.som).fit(self.labels[:10])
+        with self.assertRaises(ValueError):
+            SOMClassifier(self.som).predict_label(self.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
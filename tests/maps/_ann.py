@@ -0,0 +1,121 @@
+"""
+This module gathers tests for approximate nearest neighbor indices of SOMs.
+"""
+import unittest
+import numpy as np
+
+from som.maps import HierarchicalCodebook, RandomProjectionForest
+from som.maps._distance import _euclid_k_nearest
+
+
+class TestRandomProjectionForest(unittest.TestCase):
+
+    def test_single_leaf_is_exact(self):
+        rng = np.random.default_rng(0)
+        codebook = rng.normal(size=(30, 5))
+        vectors = rng.normal(size=(100, 5))
+        distances, indices = RandomProjectionForest(n_trees=1, leaf_size=30).fit(codebook).query(vectors, k=2)
+        expected_distances, expected_indices = _euclid_k_nearest(codebook, vectors, k=2)
+        np.testing.assert_array_equal(indices, expected_indices)
+        np.testing.assert_allclose(distances, expected_distances)
+
+    def test_recall_increases_with_trees(self):
+        rng = np.random.default_rng(0)
+        codebook = rng.normal(size=(2000, 20))
+        vectors = rng.normal(size=(500, 20))
+        few = RandomProjectionForest(n_trees=1, leaf_size=16).fit(codebook).measure_recall(vectors)
+        many = RandomProjectionForest(n_trees=30, leaf_size=16).fit(codebook).measure_recall(vectors)
+        self.assertLess(few, many)
+        self.assertGreater(many, 0.5)
+
+    def test_query_returns_sorted_distinct_units(self):
+        rng = np.random.default_rng(0)
+        codebook = rng.normal(size=(500, 10))
+        vectors = rng.normal(size=(200, 10))
+        distances, indices = RandomProjectionForest(n_trees=5, leaf_size=8).fit(codebook).query(vectors, k=3)
+        self.assertTrue(np.all(np.diff(distances, axis=1) >= 0))
+        self.assertTrue(np.all(indices[:, 0] != indices[:, 1]))
+        np.testing.assert_allclose(distances, np.linalg.norm(codebook[indices] - vectors[:, None, :], axis=2))
+
+    def test_too_few_candidates_fall_back_to_exact_search(self):
+        rng = np.random.default_rng(0)
+        codebook = rng.normal(size=(100, 5))
+        vectors = rng.normal(size=(500, 5))
+        distances, indices = RandomProjectionForest(n_trees=1, leaf_size=2).fit(codebook).query(vectors, k=3)
+        self.assertTrue(np.all(indices >= 0))
+        self.assertTrue(np.all(np.isfinite(distances)))
+        np.testing.assert_allclose(distances, np.linalg.norm(codebook[indices] - vectors[:, None, :], axis=2))
+
+    def test_query_before_fit_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            RandomProjectionForest().query(np.zeros((1, 2)))
+
+    def test_number_of_trees_equal_zero_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            RandomProjectionForest(n_trees=0)
+
+    def test_leaf_size_equal_one_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            RandomProjectionForest(leaf_size=1)
+
+
+class TestHierarchicalCodebook(unittest.TestCase):
+
+    def test_block_covering_map_is_exact(self):
+        rng = np.random.default_rng(0)
+        codebook = rng.normal(size=(35, 4))
+        vectors = rng.normal(size=(100, 4))
+        for topology in ["rectangular", "hexagonal"]:
+            index = HierarchicalCodebook((5, 7), topology, block_size=7).fit(codebook)
+            distances, indices = index.query(vectors, k=3)
+            expected_distances, expected_indices = _euclid_k_nearest(codebook, vectors, k=3)
+            np.testing.assert_array_equal(indices, expected_indices)
+            np.testing.assert_allclose(distances, expected_distances)
+
+    def test_super_codebook_is_block_mean(self):
+        codebook = np.arange(30, dtype=float).reshape(30, 1)
+        # rectangular grid of height 5 and width 6, unit index i * 6 + j
+        index = HierarchicalCodebook((5, 6), block_size=4).fit(codebook)
+        self.assertEqual(index.super_codebook.shape, (4, 1))
+        self.assertAlmostEqual(index.super_codebook[0, 0], np.mean([i * 6 + j for i in range(4) for j in range(4)]))
+        self.assertAlmostEqual(index.super_codebook[3, 0], np.mean([24 + j for j in range(4, 6)]))
+        # hexagonal grid, unit index q * height + row
+        index = HierarchicalCodebook((5, 6), "hexagonal", block_size=4).fit(codebook)
+        self.assertAlmostEqual(index.super_codebook[1, 0], np.mean([q * 5 + r for q in range(4, 6) for r in range(4)]))
+
+    def test_smooth_codebook_has_full_recall(self):
+        # a smooth codebook like the one of a trained SOM
+        rows, columns = np.indices((40, 40)).reshape(2, -1) / 40
+        codebook = np.column_stack((np.sin(rows), np.cos(columns), rows * columns))
+        rng = np.random.default_rng(0)
+        vectors = codebook[rng.integers(len(codebook), size=500)] + rng.normal(scale=0.01, size=(500, 3))
+        index = HierarchicalCodebook((40, 40), block_size=4).fit(codebook)
+        self.assertEqual(index.measure_recall(vectors), 1)
+
+    def test_too_few_candidates_fall_back_to_exact_search(self):
+        rng = np.random.default_rng(0)
+        codebook = rng.normal(size=(35, 4))
+        vectors = rng.normal(size=(100, 4))
+        # a single block of one unit explores fewer than k units
+        index = HierarchicalCodebook((5, 7), block_size=1).fit(codebook)
+        distances, indices = index.query(vectors, k=12)
+        self.assertTrue(np.all(indices >= 0))
+        self.assertTrue(np.all(np.isfinite(distances)))
+        expected_distances, _ = _euclid_k_nearest(codebook, vectors, k=12)
+        np.testing.assert_allclose(distances, expected_distances)
+
+    def test_codebook_size_not_matching_map_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            HierarchicalCodebook((5, 5)).fit(np.zeros((24, 2)))
+
+    def test_block_size_equal_zero_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            HierarchicalCodebook((5, 5), block_size=0)
+
+    def test_number_of_probes_equal_zero_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            HierarchicalCodebook((5, 5), n_probes=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
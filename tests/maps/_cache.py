@@ -0,0 +1,123 @@
+"""
+This module gathers tests for the training cache of SOMs.
+"""
+
+import os
+import tempfile
+import tracemalloc
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps import ConvergenceMonitor, StandardSOM, TrainingCache
+
+
+class TestTrainingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cached_training_equals_training(self):
+        cache = TrainingCache(self.directory.name)
+        trained = StandardSOM((10, 10), 2).train(self.data, iterations=500, cache=cache)
+        self.assertFalse(trained.cache_hit)
+        cached = StandardSOM((10, 10), 2).train(self.data, iterations=500, cache=cache)
+        self.assertTrue(cached.cache_hit)
+        self.assertTrue(cached.trained)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        np.testing.assert_array_equal(cached.codebook, trained.codebook)
+        np.testing.assert_array_equal(cached.bmu_indices, trained.bmu_indices)
+        np.testing.assert_array_equal(cached.bmu_distances, trained.bmu_distances)
+        self.assertEqual(cached.iterations_trained, 500)
+
+    def test_different_parameters_or_data_miss(self):
+        cache = TrainingCache(self.directory.name)
+        StandardSOM((10, 10), 2).train(self.data, iterations=500, cache=cache)
+        StandardSOM((10, 10), 2).train(self.data, iterations=500, random_seed=2, cache=cache)
+        StandardSOM((10, 10), 2).train(self.data, iterations=500, alpha=0.5, cache=cache)
+        StandardSOM((10, 10), 3).train(self.data, iterations=500, cache=cache)
+        StandardSOM((10, 10), 2, "hexagonal").train(self.data, iterations=500, cache=cache)
+        StandardSOM((10, 10), 2).train(self.data, iterations=500, scaling="minmax", cache=cache)
+        data = self.data.copy()
+        data.iloc[0, 0] += 1e-9
+        StandardSOM((10, 10), 2).train(data, iterations=500, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 7))
+
+    def test_cached_training_restores_scaler(self):
+        cache = TrainingCache(self.directory.name)
+        trained = StandardSOM((10, 10), 2).train(self.data, iterations=500, scaling="standard", cache=cache)
+        cached = StandardSOM((10, 10), 2).train(self.data, iterations=500, scaling="standard", cache=cache)
+        self.assertTrue(cached.cache_hit)
+        np.testing.assert_array_equal(cached.scaler.offset, trained.scaler.offset)
+        np.testing.assert_array_equal(cached.predict(self.data), trained.bmu_indices[:, 0])
+
+    def test_cache_is_not_used_with_monitor(self):
+        cache = TrainingCache(self.directory.name)
+        StandardSOM((10, 10), 2).train(self.data, iterations=500, cache=cache, monitor=ConvergenceMonitor(100))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_cache_is_not_used_with_codebook_file(self):
+        cache = TrainingCache(self.directory.name)
+        StandardSOM((10, 10), 2).train(self.data, iterations=500, cache=cache)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "codebook.npy")
+            som = StandardSOM((10, 10), 2).train(self.data, iterations=500, cache=cache, codebook_file=path)
+            self.assertFalse(som.cache_hit)
+            self.assertIsInstance(som.codebook, np.memmap)
+            np.testing.assert_array_equal(np.load(path), som.codebook)
+            del som
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+    def test_incremental_bmus_after_cached_training(self):
+        cache = TrainingCache(self.directory.name)
+        StandardSOM((10, 10), 2).train(self.data, iterations=500, incremental_bmus=True, cache=cache)
+        som = StandardSOM((10, 10), 2).train(self.data, iterations=500, incremental_bmus=True, cache=cache)
+        self.assertTrue(som.cache_hit)
+        codebook = som.codebook.copy()
+        som.train(self.data, iterations=200, codebook=codebook, neighborhood_radius=0.5, incremental_bmus=True)
+        exact = StandardSOM((10, 10), 2).train(self.data, iterations=200, codebook=codebook, neighborhood_radius=0.5)
+        np.testing.assert_array_equal(som.bmu_indices[:, 0], exact.bmu_indices[:, 0])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        # room for two entries
+        cache = TrainingCache(self.directory.name, max_size=4000)
+        arrays = {"codebook": np.zeros(200)}
+        cache.put("a", arrays)
+        cache.put("b", arrays)
+        for i, key in enumerate(["a", "b"]):
+            os.utime(os.path.join(self.directory.name, key + ".npz"), (i, i))
+        # use the oldest entry
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", arrays)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["a.npz", "c.npz"])
+        self.assertIsNone(cache.get("b"))
+
+    def test_key_depends_on_shape(self):
+        cache = TrainingCache(self.directory.name, chunk_size=7)
+        data = np.arange(12.)
+        self.assertNotEqual(cache.key(data.reshape(3, 4), {}), cache.key(data.reshape(4, 3), {}))
+        self.assertEqual(cache.key(data.reshape(3, 4), {"a": 1}), TrainingCache(self.directory.name).key(
+            data.reshape(3, 4), {"a": 1}))
+
+    def test_key_of_dataframe_hashes_without_copy(self):
+        data = pd.DataFrame(np.random.default_rng(0).normal(size=(100000, 8)))
+        cache = TrainingCache(self.directory.name, chunk_size=1 << 16)
+        expected = cache.key(np.ascontiguousarray(data.to_numpy()), {})
+        tracemalloc.start()
+        key = cache.key(data, {})
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertEqual(key, expected)
+        self.assertLess(peak, data.to_numpy().nbytes / 10)
+
+    def test_maximum_size_equal_zero_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            TrainingCache(self.directory.name, max_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+This module gathers tests for the callbacks of the training of SOMs.
+"""
+import unittest
+import pandas as pd
+
+from som.maps import StandardSOM, Callback
+
+
+class RecordingCallback(Callback):
+
+    def __init__(self, interval, stop_at=None):
+        super().__init__(interval)
+        self.stop_at = stop_at
+        self.events = []
+
+    def on_train_begin(self, som, data, iterations):
+        self.events.append(("train_begin", iterations))
+
+    def on_phase_begin(self, som, phase):
+        self.events.append(("begin", phase))
+
+    def on_phase_end(self, som, phase):
+        self.events.append(("end", phase))
+
+    def on_iteration(self, som, iteration):
+        self.events.append(("iteration", iteration))
+        return iteration == self.stop_at
+
+    def on_train_end(self, som):
+        self.events.append(("train_end", som.trained))
+
+
+class TestCallbacks(unittest.TestCase):
+
+    def test_hooks_are_called_in_order(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((5, 5), 2)
+        callback = RecordingCallback(40)
+        som.train(data, iterations=100, callbacks=[callback])
+        self.assertListEqual(callback.events, [("train_begin", 100), ("begin", "init"), ("end", "init"),
+                                               ("begin", "main_loop"), ("iteration", 40), ("iteration", 80),
+                                               ("end", "main_loop"), ("begin", "find_bmu"), ("end", "find_bmu"),
+                                               ("train_end", True)])
+
+    def test_callbacks_with_different_intervals(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((5, 5), 2)
+        callback_a = RecordingCallback(30)
+        callback_b = RecordingCallback(45)
+        som.train(data, iterations=100, callbacks=[callback_a, callback_b])
+        self.assertListEqual([e[1] for e in callback_a.events if e[0] == "iteration"], [30, 60, 90])
+        self.assertListEqual([e[1] for e in callback_b.events if e[0] == "iteration"], [45, 90])
+
+    def test_callback_stops_training(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((5, 5), 2)
+        som.train(data, iterations=100, callbacks=[RecordingCallback(10, stop_at=50)])
+        self.assertEqual(som.iterations_trained, 50)
+        self.assertTrue(som.trained)
+
+    def test_timings(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((5, 5), 2)
+        som.train(data, iterations=100)
+        self.assertSetEqual(set(som.timings), {"init", "sampling", "bmu_search", "neighborhood", "update",
+                                               "find_bmu"})
+        self.assertTrue(all(t > 0 for t in som.timings.values()))
+
+    def test_interval_equal_zero_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            Callback(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,17 @@
 """
 This module gathers tests for SOM variants that can be trained in this module.
 """
+import os
+import tempfile
 import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+from scipy.spatial import cKDTree
 
-from som.maps import StandardSOM
+from som.maps import FeatureScaler, StandardSOM, RandomProjectionForest
+from som.maps._neighborhood import _grid_offsets
 
 
 class TestStandardSOM(unittest.TestCase):
@@ -34,6 +41,331 @@ class TestStandardSOM(unittest.TestCase):
         self.assertIsNotNone(som.get_first_bmus())
         self.assertIsNotNone(som.get_second_bmus())
 
+    def test_train_init_pca(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((20, 10), 2)
+        som.train(data, iterations=1000, init="pca")
+        self.assertTrue(som.trained)
+        self.assertEqual(som.codebook.shape, (200, data.shape[1]))
+
+    def test_train_init_pca_hexagonal(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((20, 10), 2, "hexagonal")
+        som.train(data, iterations=1000, init="pca")
+        self.assertTrue(som.trained)
+        self.assertEqual(som.codebook.shape, (200, data.shape[1]))
+
+    def test_train_init_sample(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((20, 10), 2)
+        som.train(data, iterations=1000, init="sample")
+        self.assertTrue(som.trained)
+        self.assertEqual(som.codebook.shape, (200, data.shape[1]))
+
+    def test_train_init_not_supported_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((50, 50), 5)
+        with self.assertRaises(ValueError):
+            som.train(data, init="test")
+
+    def test_train_with_codebook(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        codebook = np.zeros((100, data.shape[1]))
+        som = StandardSOM((10, 10), 2)
+        som.train(data, iterations=10, codebook=codebook)
+        self.assertTrue(som.trained)
+        self.assertFalse(np.shares_memory(som.codebook, codebook))
+        self.assertTrue(np.all(codebook == 0))
+
+    def test_train_codebook_wrong_shape_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 2)
+        with self.assertRaises(ValueError):
+            som.train(data, codebook=np.zeros((99, data.shape[1])))
+
+    def test_train_is_reproducible_and_keeps_global_random_state(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        state = np.random.get_state()[1].copy()
+        som_a = StandardSOM((10, 10), 2).train(data, iterations=500, random_seed=3)
+        som_b = StandardSOM((10, 10), 2).train(data, iterations=500, random_seed=3)
+        np.testing.assert_array_equal(som_a.codebook, som_b.codebook)
+        np.testing.assert_array_equal(np.random.get_state()[1], state)
+
+    def test_train_concurrently_in_threads(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        seeds = [1, 2, 3, 4]
+        expected = [StandardSOM((10, 10), 2).train(data, iterations=500, random_seed=seed).codebook
+                    for seed in seeds]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            soms = list(executor.map(lambda seed: StandardSOM((10, 10), 2).train(data, iterations=500,
+                                                                                   random_seed=seed), seeds))
+        for som, codebook in zip(soms, expected):
+            np.testing.assert_array_equal(som.codebook, codebook)
+
+    def test_train_multiresolution_rectangular(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((20, 16), 4)
+        som.train_multiresolution(data, levels=3, iterations=[2000, 1000, 500])
+        self.assertTrue(som.trained)
+        self.assertEqual(som.codebook.shape, (320, data.shape[1]))
+        self.assertEqual(som.iterations_trained, 500)
+
+    def test_train_multiresolution_hexagonal_with_map_sizes(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((20, 16), 4, "hexagonal")
+        som.train_multiresolution(data, levels=[(4, 4), (10, 8)], iterations=500, init="pca")
+        self.assertTrue(som.trained)
+        self.assertEqual(som.codebook.shape, (320, data.shape[1]))
+
+    def test_train_multiresolution_iterations_per_level_mismatch_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((20, 16), 4)
+        with self.assertRaises(ValueError):
+            som.train_multiresolution(data, levels=3, iterations=[100, 100])
+
+    def test_train_multiresolution_levels_equal_zero_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((20, 16), 4)
+        with self.assertRaises(ValueError):
+            som.train_multiresolution(data, levels=0)
+
+    def test_train_neighborhood_radius_equal_zero_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 4)
+        with self.assertRaises(ValueError):
+            som.train(data, neighborhood_radius=0)
+
+    def test_train_local_bmu_search(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        full = StandardSOM((15, 15), 3).train(data, iterations=5000, init="pca")
+        local = StandardSOM((15, 15), 3).train(data, iterations=5000, init="pca", bmu_search="local")
+        self.assertTrue(local.trained)
+        self.assertEqual(full.bmu_search_counts, {"full": 5000, "local": 0})
+        self.assertEqual(sum(local.bmu_search_counts.values()), 5000)
+        self.assertGreater(local.bmu_search_counts["local"], 0)
+        # the local search does not change the quality of the map much
+        self.assertLess(np.mean(local.bmu_distances[:, 0]), 1.1 * np.mean(full.bmu_distances[:, 0]))
+
+    def test_train_local_bmu_search_disagreement_with_full_scan(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        for topology in ["rectangular", "hexagonal"]:
+            som = StandardSOM((15, 15), 3, topology)
+            distance = som.input_space_distance
+            # the local result of the last window search, the full scan at the same time and the count of local results
+            pending = []
+            counts = {"accepted": 0, "disagreements": 0}
+
+            def resolve():
+                # the window search was accepted if the count of local results increased since
+                if pending and som.bmu_search_counts["local"] > pending[0][2]:
+                    counts["accepted"] += 1
+                    counts["disagreements"] += int(pending[0][0] > pending[0][1])
+                pending.clear()
+
+            def counting_distance(codebook, x):
+                resolve()
+                distances = distance(codebook, x)
+                if len(codebook) < len(som.positions):
+                    pending.append((np.min(distances), np.min(distance(som.codebook, x)),
+                                    som.bmu_search_counts["local"]))
+                return distances
+
+            som.input_space_distance = counting_distance
+            som.train(data, iterations=5000, bmu_search="local")
+            resolve()
+            self.assertEqual(counts["accepted"], som.bmu_search_counts["local"])
+            # the local search is approximate: it sometimes misses a closer unit outside of the window, but rarely
+            self.assertGreater(counts["disagreements"], 0)
+            self.assertLess(counts["disagreements"], 0.2 * counts["accepted"])
+
+    def test_train_local_bmu_search_hexagonal(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((15, 15), 3, "hexagonal")
+        som.train(data, iterations=2000, bmu_search="local", search_radius=3, local_search_start=0)
+        self.assertTrue(som.trained)
+        self.assertGreater(som.bmu_search_counts["local"], 0)
+
+    def test_train_local_update_equals_update_of_all_units(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        for topology in ["rectangular", "hexagonal"]:
+            local = StandardSOM((25, 30), 2, topology).train(data, iterations=2000, bmu_search="local")
+            # offsets that span the map, so the neighborhood is computed on all units
+            with mock.patch("som.maps._classes._grid_offsets",
+                            side_effect=lambda topology, radius: _grid_offsets(topology, 100)):
+                full = StandardSOM((25, 30), 2, topology).train(data, iterations=2000, bmu_search="local")
+            np.testing.assert_array_equal(local.codebook, full.codebook)
+
+    def test_train_bmu_search_not_supported_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 2)
+        with self.assertRaises(ValueError):
+            som.train(data, bmu_search="test")
+
+    def test_train_search_radius_less_than_one_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 2)
+        with self.assertRaises(ValueError):
+            som.train(data, bmu_search="local", search_radius=0.5)
+
+    def test_train_incremental_bmus_match_full_search(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((15, 15), 3)
+        som.train(data, iterations=3000, incremental_bmus=True)
+        self.assertEqual(som.bmu_refresh_counts, {"kept": 0, "requeried": len(data)})
+        for seed in [2, 3]:
+            # warm-started training rounds with a small radius and learning parameter
+            som.train(data, iterations=200, alpha=0.05, random_seed=seed, codebook=som.codebook,
+                      neighborhood_radius=0.5, incremental_bmus=True)
+            self.assertGreater(som.bmu_refresh_counts["kept"], 0)
+            self.assertEqual(sum(som.bmu_refresh_counts.values()), len(data))
+            distances, indices = cKDTree(som.codebook).query(data, k=2)
+            np.testing.assert_allclose(som.bmu_distances, distances)
+            np.testing.assert_array_equal(som.bmu_indices, indices)
+
+    def test_train_incremental_bmus_with_approximate_bmu_engine_match_full_search(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        for bmu_engine in ["hierarchical", RandomProjectionForest(n_trees=1, leaf_size=4)]:
+            som = StandardSOM((15, 15), 3)
+            som.train(data, iterations=3000, incremental_bmus=True, bmu_engine=bmu_engine)
+            som.train(data, iterations=200, alpha=0.05, random_seed=2, codebook=som.codebook,
+                      neighborhood_radius=0.5, incremental_bmus=True, bmu_engine=bmu_engine)
+            self.assertGreater(som.bmu_refresh_counts["kept"], 0)
+            self.assertTrue(0 < som.bmu_recall <= 1)
+            distances, indices = cKDTree(som.codebook).query(data, k=2)
+            np.testing.assert_allclose(som.bmu_distances, distances)
+            np.testing.assert_array_equal(som.bmu_indices, indices)
+
+    def test_refresh_bmus_without_bounds_searches_all(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 2).train(data, iterations=500)
+        som.codebook = som.codebook + 0.1
+        som.refresh_bmus(data)
+        self.assertEqual(som.bmu_refresh_counts["requeried"], len(data))
+        distances, indices = cKDTree(som.codebook).query(data, k=2)
+        np.testing.assert_array_equal(som.bmu_indices, indices)
+
+    def test_train_brute_bmu_engine(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        kdtree = StandardSOM((10, 10), 2).train(data, iterations=500)
+        brute = StandardSOM((10, 10), 2).train(data, iterations=500, bmu_engine="brute")
+        np.testing.assert_array_equal(brute.bmu_indices, kdtree.bmu_indices)
+        np.testing.assert_allclose(brute.bmu_distances, kdtree.bmu_distances)
+        self.assertIsNone(brute.bmu_recall)
+
+    def test_train_approximate_bmu_engine(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((20, 20), 3)
+        som.train(data, iterations=1000, bmu_engine=RandomProjectionForest(n_trees=10, leaf_size=16))
+        self.assertTrue(som.trained)
+        self.assertTrue(0 < som.bmu_recall <= 1)
+        self.assertEqual(som.bmu_indices.shape, (len(data), 2))
+
+    def test_train_approximate_bmu_engine_with_tiny_leaves(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 3)
+        som.train(data, iterations=1000, bmu_engine=RandomProjectionForest(n_trees=1, leaf_size=2))
+        self.assertTrue(np.all(som.bmu_indices >= 0))
+        self.assertTrue(np.all(np.isfinite(som.bmu_distances)))
+
+    def test_train_hierarchical_bmu_engine(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        for topology in ["rectangular", "hexagonal"]:
+            som = StandardSOM((12, 10), 3, topology).train(data, iterations=2000, bmu_engine="hierarchical")
+            exact = StandardSOM((12, 10), 3, topology).train(data, iterations=2000)
+            self.assertGreater(som.bmu_recall, 0.9)
+            self.assertGreater(np.mean(som.bmu_indices[:, 0] == exact.bmu_indices[:, 0]), 0.9)
+
+    def test_train_scaling_equals_training_on_scaled_data(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        scaled_data = (data - data.mean()) / data.std(ddof=0)
+        for init in ["random", "sample", "pca"]:
+            som = StandardSOM((8, 8), 2).train(data, iterations=500, init=init, scaling="standard")
+            expected = StandardSOM((8, 8), 2).train(scaled_data, iterations=500, init=init)
+            np.testing.assert_allclose(som.codebook, expected.codebook, atol=1e-8)
+            np.testing.assert_array_equal(som.bmu_indices, expected.bmu_indices)
+            np.testing.assert_array_equal(som.predict(data), expected.predict(scaled_data))
+        self.assertEqual(som.scaler.method, "standard")
+
+    def test_train_fitted_scaler(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        scaler = FeatureScaler("minmax").fit(data.to_numpy()[:100])
+        som = StandardSOM((8, 8), 2).train(data, iterations=500, scaling=scaler)
+        self.assertIs(som.scaler, scaler)
+        self.assertEqual(scaler.n_samples, 100)
+
+    def test_train_scaling_not_supported_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        with self.assertRaises(ValueError):
+            StandardSOM((10, 10), 2).train(data, scaling="test")
+
+    def test_train_codebook_file_equals_training_in_memory(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        with tempfile.TemporaryDirectory() as directory, mock.patch("som.maps._classes._TILE_ENTRIES", 20):
+            for init in ["random", "sample", "pca"]:
+                path = os.path.join(directory, init + ".npy")
+                som = StandardSOM((8, 8), 2).train(data, iterations=500, init=init, codebook_file=path,
+                                                   bmu_search="local", scaling="standard")
+                expected = StandardSOM((8, 8), 2).train(data, iterations=500, init=init, bmu_engine="brute",
+                                                        bmu_search="local", scaling="standard")
+                self.assertIsInstance(som.codebook, np.memmap)
+                self.assertEqual(som.bmu_engine, "brute")
+                np.testing.assert_array_equal(som.codebook, expected.codebook)
+                np.testing.assert_array_equal(np.load(path), expected.codebook)
+                np.testing.assert_array_equal(som.bmu_indices, expected.bmu_indices)
+                np.testing.assert_allclose(som.bmu_distances, expected.bmu_distances)
+                np.testing.assert_array_equal(som.predict(data), expected.predict(data))
+                del som
+
+    def test_train_given_codebook_into_codebook_file(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        codebook = np.random.default_rng(0).normal(size=(64, data.shape[1]))
+        with tempfile.TemporaryDirectory() as directory, mock.patch("som.maps._classes._TILE_ENTRIES", 20):
+            path = os.path.join(directory, "codebook.npy")
+            som = StandardSOM((8, 8), 2).train(data, iterations=500, codebook=codebook, codebook_file=path)
+            expected = StandardSOM((8, 8), 2).train(data, iterations=500, codebook=codebook, bmu_engine="brute")
+            np.testing.assert_array_equal(som.codebook, expected.codebook)
+            # the copy of the codebook into the file does not reset the timer of the initialization
+            self.assertLess(som.timings["init"], 60)
+            del som
+
+    def test_train_codebook_file_with_incremental_bmus_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                StandardSOM((10, 10), 2).train(data, codebook_file=os.path.join(directory, "codebook.npy"),
+                                               incremental_bmus=True)
+
+    def test_predict(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 2).train(data, iterations=500)
+        np.testing.assert_array_equal(som.predict(data), som.bmu_indices[:, 0])
+        np.testing.assert_array_equal(som.predict(data.to_numpy()[:5]), som.bmu_indices[:5, 0])
+
+    def test_kneighbors(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        for engine in ["kdtree", "brute"]:
+            som = StandardSOM((10, 10), 2).train(data, iterations=500, bmu_engine=engine)
+            distances, indices = som.kneighbors(data, k=2)
+            np.testing.assert_array_equal(indices, som.bmu_indices)
+            np.testing.assert_allclose(distances, som.bmu_distances)
+            distances, indices = som.kneighbors(data, k=5)
+            self.assertEqual(indices.shape, (len(data), 5))
+            self.assertTrue(np.all(np.diff(distances, axis=1) >= 0))
+            with self.assertRaises(ValueError):
+                som.kneighbors(data, k=0)
+            with self.assertRaises(ValueError):
+                som.kneighbors(data, k=101)
+
+    def test_predict_untrained_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            StandardSOM((10, 10), 2).predict(np.zeros((1, 3)))
+
+    def test_train_bmu_engine_not_supported_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 2)
+        with self.assertRaises(ValueError):
+            som.train(data, bmu_engine="test")
+
     def test_neighborhood_radius_less_than_zero_should_raise_value_error(self):
         with self.assertRaises(ValueError):
             StandardSOM((1, 1), -1)
@@ -0,0 +1,60 @@
+"""
+This module gathers tests for codebook functions of SOMs.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps._codebook import _init_codebook_pca, _interpolate_codebook, _principal_components
+from som.maps._neighborhood import _cartesian_positions, _positions_array_generic_2d, generate_hex_positions
+
+
+class TestCodebook(unittest.TestCase):
+
+    def test_principal_components_match_svd(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1).to_numpy(dtype=float)
+        mean, variances, components = _principal_components(data, 2, np.random.default_rng(1), chunk_size=100)
+        _, s, vt = np.linalg.svd(data - np.mean(data, axis=0), full_matrices=False)
+        np.testing.assert_allclose(mean, np.mean(data, axis=0))
+        np.testing.assert_allclose(variances, s[:2] ** 2 / (len(data) - 1), rtol=1e-6)
+        np.testing.assert_allclose(np.abs(components @ vt[:2].T), np.eye(2), atol=1e-6)
+
+    def test_init_codebook_pca_spans_principal_plane(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1).to_numpy(dtype=float)
+        coordinates = np.indices((4, 6)).transpose(1, 2, 0).reshape(-1, 2)[:, ::-1].astype(float)
+        codebook = _init_codebook_pca(coordinates, data, np.random.default_rng(1))
+        mean, variances, components = _principal_components(data, 2, np.random.default_rng(2))
+        # the corners of the grid are one standard deviation away from the mean along both components
+        projected = (codebook - mean) @ components.T
+        np.testing.assert_allclose(np.max(np.abs(projected), axis=0), np.sqrt(variances))
+        # the residual outside of the principal plane is zero
+        np.testing.assert_allclose(codebook - mean - projected @ components, 0, atol=1e-8)
+
+    def test_interpolate_codebook_reproduces_linear_functions(self):
+        coordinates = _cartesian_positions(_positions_array_generic_2d((5, 4)), "rectangular")
+        target_coordinates = _cartesian_positions(_positions_array_generic_2d((9, 7)), "rectangular")
+        codebook = np.column_stack((coordinates @ [1., 2.], coordinates @ [-3., 0.5] + 1))
+        interpolated = _interpolate_codebook(codebook, coordinates, target_coordinates)
+        # the coarse grid is stretched onto the fine grid by a factor of 2
+        expected = np.column_stack((target_coordinates / 2 @ [1., 2.], target_coordinates / 2 @ [-3., 0.5] + 1))
+        np.testing.assert_allclose(interpolated, expected)
+
+    def test_interpolate_codebook_hexagonal(self):
+        coordinates = _cartesian_positions(generate_hex_positions((5, 4)), "hexagonal")
+        target_coordinates = _cartesian_positions(generate_hex_positions((10, 8)), "hexagonal")
+        codebook = np.random.default_rng(0).normal(size=(20, 3))
+        interpolated = _interpolate_codebook(codebook, coordinates, target_coordinates)
+        self.assertEqual(interpolated.shape, (80, 3))
+        self.assertFalse(np.any(np.isnan(interpolated)))
+        self.assertTrue(np.all(interpolated >= np.min(codebook, axis=0) - 1e-12))
+        self.assertTrue(np.all(interpolated <= np.max(codebook, axis=0) + 1e-12))
+
+    def test_interpolate_codebook_single_row(self):
+        coordinates = _cartesian_positions(_positions_array_generic_2d((1, 3)), "rectangular")
+        target_coordinates = _cartesian_positions(_positions_array_generic_2d((1, 5)), "rectangular")
+        interpolated = _interpolate_codebook(np.array([[0.], [1.], [2.]]), coordinates, target_coordinates)
+        self.assertEqual(interpolated.shape, (5, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+This module gathers tests for the continual training of SOMs on streams of data.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps import ContinualTrainer, StandardSOM
+
+
+class TestContinualTrainer(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.som = StandardSOM((8, 8), 3).train(pd.DataFrame(self.rng.normal(size=(2000, 3))), iterations=2000)
+
+    def test_schedule_approaches_floors(self):
+        trainer = ContinualTrainer(self.som, alpha=0.2, neighborhood_radius=2, alpha_floor=0.02, radius_floor=0.5,
+                                   time_constant=100)
+        self.assertEqual(trainer.schedule(), (0.2, 2))
+        trainer.partial_fit(self.rng.normal(size=(2000, 3)))
+        alpha, radius = trainer.schedule()
+        self.assertAlmostEqual(alpha, 0.02)
+        self.assertAlmostEqual(radius, 0.5)
+        self.assertEqual(trainer.events, 2000)
+
+    def test_reservoir_is_uniform_and_bounded(self):
+        trainer = ContinualTrainer(self.som, reservoir_size=1000)
+        stream = np.column_stack((np.arange(20000.), self.rng.normal(size=(20000, 2))))
+        trainer.partial_fit(stream[:500])
+        self.assertEqual(len(trainer.reservoir), 500)
+        for start in range(500, 20000, 3000):
+            trainer.partial_fit(stream[start:start + 3000])
+        self.assertEqual(len(trainer.reservoir), 1000)
+        # every data point is in the reservoir at most once, and the sample covers the whole stream uniformly
+        self.assertEqual(len(np.unique(trainer.reservoir[:, 0])), 1000)
+        self.assertLess(abs(np.mean(trainer.reservoir[:, 0]) - 10000), 1000)
+
+    def test_batches_do_not_matter(self):
+        stream = self.rng.normal(size=(3000, 3))
+        som = StandardSOM((8, 8), 3).train(pd.DataFrame(stream), iterations=500)
+        codebook = som.codebook.copy()
+        whole = ContinualTrainer(som, check_interval=700).partial_fit(stream)
+        som.codebook = codebook.copy()
+        split = ContinualTrainer(som, check_interval=700)
+        for start in range(0, 3000, 1100):
+            split.partial_fit(stream[start:start + 1100])
+        np.testing.assert_array_equal(split.som.codebook, whole.som.codebook)
+        np.testing.assert_array_equal(split.reservoir, whole.reservoir)
+        pd.testing.assert_frame_equal(split.history, whole.history)
+
+    def test_drift_is_detected(self):
+        trainer = ContinualTrainer(self.som, check_interval=1000, time_constant=2000)
+        trainer.partial_fit(self.rng.normal(size=(5000, 3)))
+        self.assertEqual(trainer.drifts, 0)
+        trainer.partial_fit(self.rng.normal(loc=4, size=(3000, 3)))
+        self.assertEqual(trainer.drifts, 1)
+        history = trainer.history
+        self.assertEqual(list(history["events"]), list(range(1000, 9000, 1000)))
+        self.assertTrue(history["drift"].iloc[5])
+        # the units moved towards the new data
+        self.assertGreater(history["mean_unit_drift"].iloc[5], history["mean_unit_drift"].iloc[4])
+        self.assertGreater(trainer.unit_hits.sum(), 0)
+
+    def test_reheat_restarts_schedule(self):
+        trainer = ContinualTrainer(self.som, check_interval=1000, time_constant=2000, reheat=True)
+        trainer.partial_fit(self.rng.normal(size=(3000, 3)))
+        trainer.partial_fit(self.rng.normal(loc=4, size=(1000, 3)))
+        self.assertEqual(trainer.drifts, 1)
+        self.assertEqual(trainer.schedule(), (trainer.alpha, trainer.neighborhood_radius))
+
+    def test_memory_is_bounded(self):
+        trainer = ContinualTrainer(self.som, reservoir_size=50, check_interval=10, history_size=5)
+        trainer.partial_fit(self.rng.normal(size=(1000, 3)))
+        self.assertEqual(len(trainer.history), 5)
+        self.assertEqual(trainer.history["events"].iloc[-1], 1000)
+        self.assertEqual(trainer.reservoir.shape, (50, 3))
+
+    def test_predict_uses_the_updated_codebook(self):
+        data = self.rng.normal(size=(500, 3))
+        self.som.predict(data)
+        ContinualTrainer(self.som).partial_fit(self.rng.normal(loc=2, size=(1000, 3)))
+        expected = np.argmin(np.linalg.norm(self.som.codebook[None, :, :] - data[:, None, :], axis=-1), axis=1)
+        np.testing.assert_array_equal(self.som.predict(data), expected)
+
+    def test_stale_bmus_are_discarded(self):
+        data = pd.DataFrame(self.rng.normal(size=(500, 3)))
+        ContinualTrainer(self.som).partial_fit(self.rng.normal(loc=2, size=(1000, 3)))
+        self.assertIsNone(self.som.bmu_indices)
+        self.assertIsNone(self.som.bmu_distances)
+        # scoring the map again
+        self.som.refresh_bmus(data)
+        np.testing.assert_array_equal(self.som.bmu_indices[:, 0], self.som.predict(data))
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            ContinualTrainer(StandardSOM((8, 8), 3))
+        for params in [{"alpha": 0}, {"neighborhood_radius": 0}, {"alpha_floor": 0}, {"alpha_floor": 1},
+                       {"radius_floor": 0}, {"radius_floor": 4}, {"time_constant": 0}, {"reservoir_size": 0},
+                       {"check_interval": 0}, {"drift_threshold": 0}, {"decay": 1}, {"history_size": 0}]:
+            with self.assertRaises(ValueError):
+                ContinualTrainer(self.som, **params)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""
+This module gathers tests for distance functions of SOMs.
+"""
+import unittest
+import numpy as np
+from scipy.spatial import cKDTree
+
+from som.maps._distance import _euclid_k_nearest
+
+
+class TestDistance(unittest.TestCase):
+
+    def test_euclid_k_nearest_matches_kd_tree(self):
+        rng = np.random.default_rng(0)
+        matrix = rng.normal(size=(300, 8))
+        vectors = rng.normal(size=(1000, 8))
+        expected_distances, expected_indices = cKDTree(matrix).query(vectors, k=3)
+        distances, indices = _euclid_k_nearest(matrix, vectors, k=3, chunk_size=64)
+        np.testing.assert_array_equal(indices, expected_indices)
+        np.testing.assert_allclose(distances, expected_distances)
+
+    def test_euclid_k_nearest_all_rows(self):
+        matrix = np.array([[0.], [3.], [1.]])
+        distances, indices = _euclid_k_nearest(matrix, np.array([[0.9]]), k=3)
+        np.testing.assert_array_equal(indices, [[2, 0, 1]])
+        np.testing.assert_allclose(distances, [[0.1, 0.9, 2.1]])
+
+    def test_euclid_k_nearest_blocks(self):
+        rng = np.random.default_rng(0)
+        matrix = rng.normal(size=(300, 8))
+        vectors = rng.normal(size=(100, 8))
+        expected_distances, expected_indices = cKDTree(matrix).query(vectors, k=3)
+        for block_size in [1, 2, 7, 299]:
+            distances, indices = _euclid_k_nearest(matrix, vectors, k=3, block_size=block_size)
+            np.testing.assert_array_equal(indices, expected_indices)
+            np.testing.assert_allclose(distances, expected_distances)
+
+
+if __name__ == '__main__':
+    unittest.main()
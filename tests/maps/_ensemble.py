@@ -0,0 +1,59 @@
+"""
+This module gathers tests for the training of many SOMs at once.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps import StandardSOM, train_ensemble
+from som.quality.quantization import qe
+from som.quality.topology import topographic_error
+
+
+class TestTrainEnsemble(unittest.TestCase):
+
+    def test_matches_individual_training_rectangular(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        soms = train_ensemble((8, 6), data, [3, 2, 1], alpha=[0.9, 0.5, 0.7], random_seed=[1, 2, 3],
+                              iterations=500)
+        self.assertEqual(len(soms), 3)
+        for som, radius, alpha, seed in zip(soms, [3, 2, 1], [0.9, 0.5, 0.7], [1, 2, 3]):
+            expected = StandardSOM((8, 6), radius).train(data, iterations=500, alpha=alpha, random_seed=seed)
+            np.testing.assert_allclose(som.codebook, expected.codebook, rtol=1e-7, atol=1e-7)
+            np.testing.assert_array_equal(som.bmu_indices, expected.bmu_indices)
+            self.assertTrue(som.trained)
+            self.assertEqual(som.neighborhood_radius, radius)
+
+    def test_matches_individual_training_hexagonal(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        soms = train_ensemble((8, 6), data, 2, random_seed=[4, 5], iterations=500, topology="hexagonal",
+                              init="pca")
+        for som, seed in zip(soms, [4, 5]):
+            expected = StandardSOM((8, 6), 2, "hexagonal").train(data, iterations=500, random_seed=seed,
+                                                                 init="pca")
+            np.testing.assert_allclose(som.codebook, expected.codebook, rtol=1e-7, atol=1e-7)
+
+    def test_results_work_with_quality_measures(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        for som in train_ensemble((5, 5), data, 2, random_seed=[1, 2], iterations=100):
+            qe(som)
+            topographic_error(som)
+
+    def test_parameters_of_different_length_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        with self.assertRaises(ValueError):
+            train_ensemble((5, 5), data, [1, 2], random_seed=[1, 2, 3])
+
+    def test_learning_rate_equal_zero_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        with self.assertRaises(ValueError):
+            train_ensemble((5, 5), data, 1, alpha=[0.5, 0])
+
+    def test_neighborhood_radius_equal_zero_should_raise_value_error(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        with self.assertRaises(ValueError):
+            train_ensemble((5, 5), data, [1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+This module gathers tests for the convergence monitoring of SOMs.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps import StandardSOM, ConvergenceMonitor
+
+
+class TestConvergenceMonitor(unittest.TestCase):
+
+    def test_curve_is_recorded(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 3)
+        monitor = ConvergenceMonitor(interval=100, sample_size=200, topographic_error=True, early_stopping=False)
+        som.train(data, iterations=1000, monitor=monitor)
+        self.assertEqual(som.iterations_trained, 1000)
+        self.assertIsNone(monitor.stopped_iteration)
+        self.assertListEqual(list(som.convergence_curve["iteration"]), list(range(100, 1001, 100)))
+        self.assertTrue(np.all(som.convergence_curve["quantization_error"] > 0))
+        self.assertTrue(np.all(som.convergence_curve["topographic_error"].between(0, 1)))
+
+    def test_early_stopping(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 3)
+        monitor = ConvergenceMonitor(interval=100, tol=np.inf, patience=2)
+        som.train(data, iterations=1000, monitor=monitor)
+        self.assertEqual(monitor.stopped_iteration, 300)
+        self.assertEqual(som.iterations_trained, 300)
+        self.assertEqual(len(som.convergence_curve), 3)
+        self.assertTrue(np.all(np.isnan(som.convergence_curve["topographic_error"])))
+        self.assertTrue(som.trained)
+
+    def test_min_iterations(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 3)
+        monitor = ConvergenceMonitor(interval=100, tol=np.inf, patience=1, min_iterations=500)
+        som.train(data, iterations=1000, monitor=monitor)
+        self.assertEqual(som.iterations_trained, 500)
+
+    def test_train_without_monitor(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 3)
+        som.train(data, iterations=100)
+        self.assertEqual(som.iterations_trained, 100)
+        self.assertIsNone(som.convergence_curve)
+
+    def test_interval_equal_zero_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            ConvergenceMonitor(interval=0)
+
+    def test_sample_size_equal_zero_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            ConvergenceMonitor(sample_size=0)
+
+    def test_patience_equal_zero_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            ConvergenceMonitor(patience=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
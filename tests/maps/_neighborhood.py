@@ -0,0 +1,39 @@
+"""
+This module gathers tests for neighborhood-related functions of SOMs.
+"""
+import unittest
+import numpy as np
+
+from som.maps._distance import _euclid_distance, _hex_distance
+from som.maps._neighborhood import _grid_offsets, _grid_window, _offset_units, _positions_array_generic_2d, \
+    generate_hex_positions
+
+
+class TestNeighborhood(unittest.TestCase):
+
+    def test_grid_window_rectangular(self):
+        positions = _positions_array_generic_2d((7, 5))
+        for radius in [1, 2, 2.5]:
+            window = _grid_window((7, 5), "rectangular", radius)
+            for unit in range(len(positions)):
+                expected = np.flatnonzero(_euclid_distance(positions, positions[unit]) <= radius)
+                np.testing.assert_array_equal(np.sort(window[unit][window[unit] >= 0]), expected)
+
+    def test_grid_window_hexagonal(self):
+        positions = generate_hex_positions((7, 5))
+        for radius in [1, 2, 3]:
+            window = _grid_window((7, 5), "hexagonal", radius)
+            for unit in range(len(positions)):
+                expected = np.flatnonzero(_hex_distance(positions, positions[unit]) <= radius)
+                np.testing.assert_array_equal(np.sort(window[unit][window[unit] >= 0]), expected)
+
+    def test_offset_units_of_some_units(self):
+        for topology in ["rectangular", "hexagonal"]:
+            window = _grid_window((7, 5), topology, 2)
+            units = np.array([0, 6, 17, 34])
+            np.testing.assert_array_equal(_offset_units((7, 5), topology, _grid_offsets(topology, 2), units),
+                                          window[units])
+
+
+if __name__ == '__main__':
+    unittest.main()
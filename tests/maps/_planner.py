@@ -0,0 +1,124 @@
+"""
+This module gathers tests for the planning of the memory and the runtime of a training.
+"""
+
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps import StandardSOM, measure_rates, plan_training
+
+
+class TestPlanTraining(unittest.TestCase):
+
+    def test_estimates_grow_with_the_data_and_the_map(self):
+        small = plan_training((1000, 10), (10, 10), available_memory=1 << 40)
+        more_data = plan_training((100000, 10), (10, 10), available_memory=1 << 40)
+        larger_map = plan_training((1000, 10), (50, 50), available_memory=1 << 40)
+        for engine in ["kdtree", "brute"]:
+            self.assertLess(small.estimates.loc[engine, "peak_bytes"], more_data.estimates.loc[engine, "peak_bytes"])
+            self.assertLess(small.estimates.loc[engine, "peak_bytes"], larger_map.estimates.loc[engine, "peak_bytes"])
+            self.assertLess(small.estimates.loc[engine, "seconds"], more_data.estimates.loc[engine, "seconds"])
+            self.assertLess(small.estimates.loc[engine, "seconds"], larger_map.estimates.loc[engine, "seconds"])
+
+    def test_bmu_arrays_and_data_copy_are_counted(self):
+        plan = plan_training((10 ** 6, 4), (10, 10), available_memory=1 << 40)
+        float32 = plan_training((10 ** 6, 4), (10, 10), dtype="float32", available_memory=1 << 40)
+        # (n, 2) float64 distances and int64 indices
+        self.assertGreaterEqual(plan.estimates.loc["kdtree", "find_bmu_bytes"], 10 ** 6 * 32)
+        # float64 copy of the data
+        self.assertEqual(float32.estimates.loc["kdtree", "find_bmu_bytes"] -
+                         plan.estimates.loc["kdtree", "find_bmu_bytes"], 10 ** 6 * 4 * 8)
+
+    def test_engine_follows_the_dimension(self):
+        self.assertEqual(plan_training((10000, 2), (20, 20), available_memory=1 << 40).bmu_engine, "kdtree")
+        self.assertEqual(plan_training((10000, 200), (20, 20), available_memory=1 << 40).bmu_engine, "brute")
+
+    def test_chunk_size_fits_the_memory(self):
+        plan = plan_training((10 ** 6, 50), (40, 40), bmu_engines=["brute"], available_memory=1 << 40)
+        self.assertEqual(plan.chunk_size, 10 ** 6)
+        budget = plan.estimates.loc["brute", "train_bytes"] + 34 * 10 ** 6
+        small = plan_training((10 ** 6, 50), (40, 40), bmu_engines=["brute"], available_memory=budget)
+        self.assertTrue(small.fits)
+        self.assertLess(small.chunk_size, 10 ** 6)
+        self.assertLessEqual(small.peak_bytes, budget)
+
+    def test_codebook_file_if_the_codebook_does_not_fit(self):
+        plan = plan_training((1000, 1000), (100, 100), available_memory=1 << 40)
+        self.assertFalse(plan.use_codebook_file)
+        plan = plan_training((1000, 1000), (100, 100), available_memory=plan.estimates["train_bytes"].min() // 2)
+        self.assertTrue(plan.use_codebook_file)
+        self.assertEqual(plan.bmu_engine, "brute")
+        self.assertTrue(plan.fits)
+
+    def test_nothing_fits(self):
+        plan = plan_training((1000, 10), (10, 10), available_memory=1)
+        self.assertFalse(plan.fits)
+        self.assertEqual(plan.chunk_size, 1)
+
+    def test_measure_rates(self):
+        rates = measure_rates(size=1 << 16)
+        self.assertEqual(set(rates), {"elementwise", "flops", "iteration_overhead"})
+        self.assertTrue(all(rate > 0 for rate in rates.values()))
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            plan_training((0, 10), (10, 10), available_memory=1 << 30)
+        with self.assertRaises(ValueError):
+            plan_training((10, 10), (0, 10), available_memory=1 << 30)
+        with self.assertRaises(ValueError):
+            plan_training((10, 10), (10, 10), available_memory=0)
+        with self.assertRaises(ValueError):
+            plan_training((10, 10), (10, 10), iterations=0, available_memory=1 << 30)
+        with self.assertRaises(ValueError):
+            plan_training((10, 10), (10, 10), bmu_engines=["annoy"], available_memory=1 << 30)
+
+
+class TestPlannedTraining(unittest.TestCase):
+
+    def setUp(self):
+        self.data = pd.read_csv('../data/test_data.csv')
+
+    def test_plan_is_applied_and_usage_recorded(self):
+        plan = plan_training(self.data.shape, (10, 10), iterations=1000, bmu_engines=["brute"],
+                             available_memory=1 << 40)
+        som = StandardSOM((10, 10), 3).train(self.data, iterations=1000, plan=plan)
+        self.assertEqual(som.bmu_engine, "brute")
+        self.assertEqual(som.bmu_chunk_size, plan.chunk_size)
+        self.assertEqual(som.resource_usage["estimated_peak_bytes"], plan.peak_bytes)
+        self.assertEqual(som.resource_usage["estimated_seconds"], plan.seconds)
+        self.assertGreaterEqual(som.resource_usage["peak_bytes"], 0)
+        self.assertGreater(som.resource_usage["seconds"], 0)
+        # same result as without a plan
+        expected = StandardSOM((10, 10), 3).train(self.data, iterations=1000, bmu_engine="brute")
+        np.testing.assert_array_equal(som.codebook, expected.codebook)
+        np.testing.assert_array_equal(som.bmu_indices, expected.bmu_indices)
+        # the next training without a plan records nothing
+        som.train(self.data, iterations=10)
+        self.assertIsNone(som.resource_usage)
+
+    def test_small_chunks_give_the_same_bmus(self):
+        plan = plan_training(self.data.shape, (10, 10), iterations=100, available_memory=1 << 40)
+        plan.chunk_size = 7
+        som = StandardSOM((10, 10), 3).train(self.data, iterations=100, plan=plan)
+        expected = StandardSOM((10, 10), 3).train(self.data, iterations=100, bmu_engine=plan.bmu_engine)
+        np.testing.assert_array_equal(som.bmu_indices, expected.bmu_indices)
+        np.testing.assert_allclose(som.bmu_distances, expected.bmu_distances)
+        np.testing.assert_array_equal(som.predict(self.data), expected.predict(self.data))
+
+    def test_plan_with_codebook_file(self):
+        plan = plan_training(self.data.shape, (10, 10), iterations=100, available_memory=1 << 40)
+        plan.use_codebook_file = True
+        with self.assertRaises(ValueError):
+            StandardSOM((10, 10), 3).train(self.data, iterations=100, plan=plan)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "codebook.npy")
+            som = StandardSOM((10, 10), 3).train(self.data, iterations=100, plan=plan, codebook_file=path)
+            self.assertIsNotNone(som.resource_usage)
+            del som
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+This module gathers tests for the scaling of features.
+"""
+
+import unittest
+import numpy as np
+
+from som.maps import FeatureScaler
+
+
+class TestFeatureScaler(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = rng.normal(loc=1e6, scale=[1., 10., 100.], size=(1000, 3))
+
+    def test_chunked_fit_equals_numpy(self):
+        scaler = FeatureScaler(chunk_size=77).fit(self.data)
+        self.assertEqual(scaler.n_samples, 1000)
+        np.testing.assert_allclose(scaler.mean, np.mean(self.data, axis=0))
+        np.testing.assert_allclose(scaler.var, np.var(self.data, axis=0), rtol=1e-8)
+        np.testing.assert_array_equal(scaler.min, np.min(self.data, axis=0))
+        np.testing.assert_array_equal(scaler.max, np.max(self.data, axis=0))
+
+    def test_standard(self):
+        scaled = FeatureScaler("standard", chunk_size=100).fit(self.data).transform(self.data)
+        np.testing.assert_allclose(np.mean(scaled, axis=0), 0, atol=1e-8)
+        np.testing.assert_allclose(np.std(scaled, axis=0), 1)
+
+    def test_minmax(self):
+        scaler = FeatureScaler("minmax").fit(self.data)
+        scaled = scaler.transform(self.data)
+        np.testing.assert_allclose(np.min(scaled, axis=0), 0)
+        np.testing.assert_allclose(np.max(scaled, axis=0), 1)
+        np.testing.assert_allclose(scaler.inverse_transform(scaled), self.data)
+
+    def test_constant_feature_is_only_shifted(self):
+        data = np.column_stack((self.data[:, 0], np.full(len(self.data), 5.)))
+        scaled = FeatureScaler().fit(data).transform(data)
+        np.testing.assert_array_equal(scaled[:, 1], 0)
+
+    def test_scaling_not_supported_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            FeatureScaler("test")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+This module gathers tests for the successive halving search.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps import StandardSOM
+from som.model_selection import SuccessiveHalvingSearch
+
+
+class TestSuccessiveHalvingSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        self.grid = {"map_size": [(5, 5), (8, 8)], "neighborhood_radius": [1, 3]}
+
+    def test_budgets(self):
+        grid = {"map_size": [(5, 5)], "neighborhood_radius": [1, 2, 3], "alpha": [0.5, 0.7, 0.9]}
+        self.assertEqual(SuccessiveHalvingSearch(grid, iterations=900).budgets(), [100, 300, 900])
+        self.assertEqual(SuccessiveHalvingSearch(grid, iterations=900, factor=2).budgets(), [56, 112, 225, 450, 900])
+        self.assertEqual(SuccessiveHalvingSearch({"map_size": [(5, 5)], "neighborhood_radius": [1]}).budgets(),
+                         [10000])
+
+    def test_small_budget_with_many_candidates(self):
+        grid = {"map_size": [(3, 3)], "neighborhood_radius": list(np.linspace(0.5, 3, 27))}
+        self.assertEqual(SuccessiveHalvingSearch(grid, iterations=10).budgets(), [1, 2, 3, 10])
+        self.assertEqual(SuccessiveHalvingSearch(grid, iterations=2).budgets(), [1, 2])
+        for iterations in [10, 2]:
+            search = SuccessiveHalvingSearch(grid, iterations=iterations, n_jobs=1).fit(self.data)
+            budgets = search.budgets()
+            # every round trains, and the last round promotes a single candidate
+            self.assertEqual(search.best_som.iterations_trained, budgets[-1] - budgets[-2])
+            self.assertEqual(search.results["round"].nunique(), len(budgets))
+            self.assertEqual(search.results[search.results["round"] == len(budgets) - 1]["promoted"].sum(), 1)
+
+    def test_fit(self):
+        search = SuccessiveHalvingSearch(self.grid, iterations=400, factor=2, n_jobs=1).fit(self.data)
+        results = search.results
+        self.assertEqual(list(results["round"]), [0, 0, 0, 0, 1, 1, 2])
+        self.assertEqual(list(results["iterations"]), [100, 100, 100, 100, 200, 200, 400])
+        self.assertEqual(list(results.groupby("round")["promoted"].sum()), [2, 1, 1])
+        # the promoted candidates are the ones with the best score
+        first = results[results["round"] == 0]
+        self.assertEqual(set(first[first["promoted"]]["candidate"]), set(first.nsmallest(2, "score")["candidate"]))
+        self.assertEqual(set(results[results["round"] == 1]["candidate"]), set(first[first["promoted"]]["candidate"]))
+        self.assertEqual(search.best_params, search.candidates[results["candidate"].iloc[-1]])
+        self.assertTrue(search.best_som.trained)
+        self.assertEqual(search.best_som.map_size, search.best_params["map_size"])
+        self.assertIn("neighborhood_radius", results.columns)
+
+    def test_process_pool_equals_serial_search(self):
+        serial = SuccessiveHalvingSearch(self.grid, iterations=200, factor=2, n_jobs=1).fit(self.data)
+        parallel = SuccessiveHalvingSearch(self.grid, iterations=200, factor=2, n_jobs=2).fit(self.data)
+        pd.testing.assert_frame_equal(serial.results, parallel.results)
+        np.testing.assert_array_equal(serial.best_som.codebook, parallel.best_som.codebook)
+
+    def test_single_candidate_equals_training(self):
+        grid = {"map_size": [(6, 6)], "neighborhood_radius": [2], "alpha": [0.5], "random_seed": [3]}
+        search = SuccessiveHalvingSearch(grid, iterations=300, n_jobs=1).fit(self.data)
+        som = StandardSOM((6, 6), 2).train(self.data, iterations=300, alpha=0.5, random_seed=3)
+        np.testing.assert_array_equal(search.best_som.codebook, som.codebook)
+
+    def test_unknown_parameter_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            SuccessiveHalvingSearch({"map_size": [(5, 5)], "neighborhood_radius": [1], "test": [1]})
+
+    def test_missing_map_size_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            SuccessiveHalvingSearch({"neighborhood_radius": [1]})
+
+    def test_factor_equal_one_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            SuccessiveHalvingSearch(self.grid, factor=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+This module gathers tests for the compact codebooks for scoring.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps import StandardSOM
+from som.maps._distance import _euclid_k_nearest
+from som.scoring import CompactCodebook, export_codebook
+
+
+class TestCompactCodebook(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.codebook = rng.normal(size=(400, 16))
+        self.vectors = rng.normal(size=(300, 16))
+        self.distances, self.indices = _euclid_k_nearest(self.codebook, self.vectors, k=3)
+
+    def test_rerank_is_exact(self):
+        for dtype in ["int8", "float16"]:
+            distances, indices = CompactCodebook.quantize(self.codebook, dtype).query(self.vectors, k=3)
+            np.testing.assert_array_equal(indices, self.indices)
+            np.testing.assert_allclose(distances, self.distances, rtol=1e-5)
+
+    def test_quantized_search_without_rerank(self):
+        compact_codebook = CompactCodebook.quantize(self.codebook, "int8", rerank=False)
+        distances, indices = compact_codebook.query(self.vectors, k=3, chunk_size=64, unit_chunk_size=100)
+        self.assertGreater(np.mean(indices[:, 0] == self.indices[:, 0]), 0.9)
+        np.testing.assert_allclose(distances[:, 0], self.distances[:, 0], rtol=0.05)
+        self.assertTrue(np.all(np.diff(distances, axis=1) >= 0))
+
+    def test_memory(self):
+        self.assertLessEqual(CompactCodebook.quantize(self.codebook, "int8", rerank=False).nbytes * 4,
+                             self.codebook.nbytes)
+        self.assertLessEqual(CompactCodebook.quantize(self.codebook, "float16", rerank=False).nbytes * 3,
+                             self.codebook.nbytes)
+
+    def test_constant_feature(self):
+        codebook = np.column_stack((self.codebook[:, 0], np.full(len(self.codebook), 2.)))
+        compact_codebook = CompactCodebook.quantize(codebook, rerank=False)
+        self.assertTrue(np.all(np.isfinite(compact_codebook.norms)))
+        vectors = np.column_stack((self.codebook[:5, 0], np.full(5, 2.)))
+        np.testing.assert_array_equal(compact_codebook.predict(vectors), np.arange(5))
+
+    def test_save_and_load(self):
+        compact_codebook = CompactCodebook.quantize(self.codebook, "float16")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "codebook.npz")
+            compact_codebook.save(path)
+            loaded = CompactCodebook.load(path)
+        np.testing.assert_array_equal(loaded.codes, compact_codebook.codes)
+        np.testing.assert_array_equal(loaded.predict(self.vectors), compact_codebook.predict(self.vectors))
+
+    def test_export_trained_som(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 2).train(data, iterations=500)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "codebook.npz")
+            export_codebook(som, path)
+            loaded = CompactCodebook.load(path)
+        np.testing.assert_array_equal(loaded.predict(data.to_numpy()), som.bmu_indices[:, 0])
+
+    def test_export_trained_som_with_scaling(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        # features of very different scales, so the BMUs differ without the scaling
+        data = data * np.logspace(0, 3, data.shape[1])
+        for scaling in ["standard", "minmax"]:
+            som = StandardSOM((10, 10), 2).train(data, iterations=500, scaling=scaling)
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "codebook.npz")
+                export_codebook(som, path)
+                loaded = CompactCodebook.load(path)
+            np.testing.assert_array_equal(loaded.input_offset, som.scaler.offset)
+            np.testing.assert_array_equal(loaded.predict(data.to_numpy()), som.predict(data))
+
+    def test_import_without_heavy_dependencies(self):
+        code = "import sys, som.scoring; " \
+               "print(sorted(set(sys.modules) & {'pandas', 'scipy', 'matplotlib', 'som.maps'}))"
+        # from the root of the repository, so som is importable wherever the tests are run from
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root)
+        self.assertEqual(output.stdout.strip(), "[]")
+
+    def test_export_untrained_som_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            export_codebook(StandardSOM((10, 10), 2))
+
+    def test_code_type_not_supported_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            CompactCodebook.quantize(self.codebook, "int16")
+
+    def test_wrong_number_of_features_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            CompactCodebook.quantize(self.codebook).query(np.zeros((1, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+This module gathers tests for the micro-batching scoring server.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps import StandardSOM
+from som.scoring import CompactCodebook, ScoringServer
+
+
+async def http_request(reader, writer, method, target, body=None):
+    payload = b"" if body is None else json.dumps(body).encode()
+    writer.write((method + " " + target + " HTTP/1.1\r\nContent-Length: " + str(len(payload)) + "\r\n\r\n").encode() +
+                 payload)
+    await writer.drain()
+    status = (await reader.readline()).decode().split(" ", 1)[1].strip()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode()
+        if not line.strip():
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+class TestScoringServer(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.model = CompactCodebook.quantize(rng.normal(size=(100, 4)))
+        self.vectors = rng.normal(size=(50, 4))
+        self.bmus = self.model.predict(self.vectors)
+
+    async def test_concurrent_vectors_are_batched(self):
+        server = ScoringServer(self.model, max_batch_size=16, max_wait=0.05)
+        await server.start()
+        results = await asyncio.gather(*[server.predict(vector) for vector in self.vectors])
+        await server.close()
+        np.testing.assert_array_equal(np.concatenate(results), self.bmus)
+        stats = server.stats()
+        self.assertEqual(stats["requests"], 50)
+        self.assertEqual(stats["vectors"], 50)
+        self.assertLessEqual(stats["batches"], 5)
+        self.assertLessEqual(stats["mean_batch_size"], 16)
+        self.assertGreater(stats["throughput"], 0)
+        self.assertGreaterEqual(stats["latency_p99"], stats["latency_p50"])
+
+    async def test_http(self):
+        server = ScoringServer(self.model, max_wait=0)
+        await server.start("127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.ports[0])
+        status, answer = await http_request(reader, writer, "POST", "/predict", {"vector": self.vectors[0].tolist()})
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(answer["bmu"], self.bmus[0])
+        # keep-alive connection
+        status, answer = await http_request(reader, writer, "POST", "/predict", {"vectors": self.vectors.tolist()})
+        self.assertEqual(answer["bmus"], self.bmus.tolist())
+        status, answer = await http_request(reader, writer, "GET", "/stats")
+        self.assertEqual(answer["vectors"], 51)
+        status, _ = await http_request(reader, writer, "POST", "/predict", {"vectors": "test"})
+        self.assertEqual(status, "400 Bad Request")
+        status, _ = await http_request(reader, writer, "GET", "/test")
+        self.assertEqual(status, "404 Not Found")
+        writer.close()
+        await server.close()
+
+    async def test_unix_socket_with_standard_som(self):
+        data = pd.read_csv('../data/test_data.csv').drop(['Class'], axis=1)
+        som = StandardSOM((10, 10), 2).train(data, iterations=500)
+        server = ScoringServer(som)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "som.sock")
+            await server.start(path=path)
+            reader, writer = await asyncio.open_unix_connection(path)
+            status, answer = await http_request(reader, writer, "POST", "/predict",
+                                                {"vectors": data.to_numpy()[:20].tolist()})
+            writer.close()
+            await server.close()
+        self.assertEqual(answer["bmus"], som.bmu_indices[:20, 0].tolist())
+
+    async def test_model_error_is_answered(self):
+        server = ScoringServer(self.model)
+        await server.start()
+        with self.assertRaises(ValueError):
+            await server.predict(np.zeros((1, 3)))
+        np.testing.assert_array_equal(await server.predict(self.vectors[:2]), self.bmus[:2])
+        await server.close()
+        self.assertEqual(server.stats()["errors"], 1)
+
+    async def test_malformed_request_does_not_fail_its_batch(self):
+        server = ScoringServer(self.model, max_wait=0.05)
+        await server.start()
+        results = await asyncio.gather(server.predict(np.zeros((1, 3))), server.predict(self.vectors[:2]),
+                                       return_exceptions=True)
+        await server.close()
+        self.assertIsInstance(results[0], ValueError)
+        np.testing.assert_array_equal(results[1], self.bmus[:2])
+        self.assertEqual(server.stats()["errors"], 1)
+
+    async def test_malformed_http_request_does_not_fail_its_batch(self):
+        server = ScoringServer(self.model, max_wait=0.05)
+        await server.start("127.0.0.1", 0)
+        connections = [await asyncio.open_connection("127.0.0.1", server.ports[0]) for _ in range(2)]
+        (status, answer), (valid_status, valid_answer) = await asyncio.gather(
+            http_request(*connections[0], "POST", "/predict", {"vectors": [[0, 0, 0]]}),
+            http_request(*connections[1], "POST", "/predict", {"vectors": self.vectors[:2].tolist()}))
+        for _, writer in connections:
+            writer.close()
+        await server.close()
+        self.assertEqual(status, "400 Bad Request")
+        self.assertIn("4 features", answer["error"])
+        self.assertEqual(valid_status, "200 OK")
+        self.assertEqual(valid_answer["bmus"], self.bmus[:2].tolist())
+
+    async def test_requests_of_different_width_are_batched_separately(self):
+        class Model:
+            def predict(self, vectors):
+                return np.full(len(vectors), vectors.shape[1])
+
+        server = ScoringServer(Model(), max_wait=0.05)
+        self.assertIsNone(server.n_features)
+        await server.start()
+        results = await asyncio.gather(server.predict(np.zeros((1, 3))), server.predict(np.zeros((2, 2))))
+        await server.close()
+        self.assertEqual([result.tolist() for result in results], [[3], [2, 2]])
+
+    async def test_malformed_content_length_is_answered(self):
+        server = ScoringServer(self.model)
+        await server.start("127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.ports[0])
+        writer.write(b"POST /predict HTTP/1.1\r\nContent-Length: test\r\n\r\n")
+        await writer.drain()
+        status = (await reader.readline()).decode().split(" ", 1)[1].strip()
+        writer.close()
+        await server.close()
+        self.assertEqual(status, "400 Bad Request")
+
+    async def test_predict_before_start_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            await ScoringServer(self.model).predict(self.vectors)
+
+    def test_maximum_batch_size_equal_zero_should_raise_value_error(self):
+        with self.assertRaises(ValueError):
+            ScoringServer(self.model, max_batch_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
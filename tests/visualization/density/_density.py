@@ -2,10 +2,11 @@
 This module gathers tests for density visualizations of SOM variants that can be trained in this module.
 """
 import unittest
+import numpy as np
 import pandas as pd
 
 from som.maps import StandardSOM
-from som.visualization.density import hit_histogram
+from som.visualization.density import hit_histogram, sdh_map, smoothed_data_histogram
 
 
 class TestStandardSOM(unittest.TestCase):
@@ -34,5 +35,38 @@ class TestStandardSOM(unittest.TestCase):
         hit_histogram(som)
 
 
+class TestSmoothedDataHistogram(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.read_csv('../../data/test_data.csv').drop(['Class'], axis=1)
+        self.som = StandardSOM((10, 10), 3).train(self.data, iterations=2000)
+
+    def test_k1_is_hit_histogram(self):
+        sdh = smoothed_data_histogram(self.som, self.data, k=1)
+        np.testing.assert_array_equal(sdh, np.bincount(self.som.bmu_indices[:, 0], minlength=100))
+
+    def test_rank_weights(self):
+        sdh = smoothed_data_histogram(self.som, self.data, k=2)
+        expected = np.bincount(self.som.bmu_indices[:, 0], minlength=100) * 2 / 3 + \
+            np.bincount(self.som.bmu_indices[:, 1], minlength=100) / 3
+        np.testing.assert_allclose(sdh, expected)
+        self.assertAlmostEqual(np.sum(smoothed_data_histogram(self.som, self.data, k=5)), len(self.data))
+
+    def test_chunks(self):
+        np.testing.assert_allclose(smoothed_data_histogram(self.som, self.data, k=4, chunk_size=7),
+                                   smoothed_data_histogram(self.som, self.data.to_numpy(), k=4))
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            smoothed_data_histogram(self.som, self.data, k=0)
+        with self.assertRaises(ValueError):
+            smoothed_data_histogram(self.som, self.data, k=101)
+        with self.assertRaises(ValueError):
+            smoothed_data_histogram(self.som, self.data, chunk_size=0)
+
+    def test_plot(self):
+        sdh_map(self.som, self.data)
+        sdh_map(StandardSOM((10, 10), 3, "hexagonal").train(self.data, iterations=2000), self.data, k=2)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
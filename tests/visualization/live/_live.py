@@ -0,0 +1,74 @@
+"""
+This module gathers tests for the live monitor of the training of SOMs.
+"""
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from som.maps import StandardSOM
+from som.visualization.live import LiveMonitor
+
+
+class TestLiveMonitor(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.read_csv('../../data/test_data.csv').drop(['Class'], axis=1)
+
+    def test_redraws_every_interval_without_throttling(self):
+        monitor = LiveMonitor(interval=100, seconds=0, max_overhead=1, display=False)
+        som = StandardSOM((10, 10), 3).train(self.data, iterations=500, callbacks=[monitor])
+        # initial frame and one per interval, the last one shows the trained map
+        self.assertEqual(monitor.frames, 6)
+        self.assertGreater(monitor.draw_time, 0)
+        self.assertTrue(som.trained)
+
+    def test_seconds_throttle_redraws(self):
+        monitor = LiveMonitor(interval=10, seconds=3600, display=False)
+        StandardSOM((10, 10), 3).train(self.data, iterations=500, callbacks=[monitor])
+        self.assertEqual(monitor.frames, 2)
+
+    def test_training_is_unchanged(self):
+        monitor = LiveMonitor(interval=50, seconds=0, max_overhead=1, values=0, display=False)
+        som = StandardSOM((10, 10), 3, "hexagonal").train(self.data, iterations=300, callbacks=[monitor])
+        expected = StandardSOM((10, 10), 3, "hexagonal").train(self.data, iterations=300)
+        np.testing.assert_array_equal(som.codebook, expected.codebook)
+        np.testing.assert_array_equal(monitor._collection.get_array(), som.codebook[:, 0])
+
+    def test_umatrix_and_function_values(self):
+        monitor = LiveMonitor(display=False)
+        som = StandardSOM((4, 5), 3).train(self.data, iterations=100, callbacks=[monitor])
+        umatrix = monitor._collection.get_array()
+        # unit 0 of a rectangular grid has the neighbors 1 and 5
+        expected = (np.linalg.norm(som.codebook[0] - som.codebook[1]) +
+                    np.linalg.norm(som.codebook[0] - som.codebook[5])) / 2
+        self.assertAlmostEqual(umatrix[0], expected)
+        monitor = LiveMonitor(values=lambda trained: np.arange(20), display=False)
+        StandardSOM((4, 5), 3).train(self.data, iterations=100, callbacks=[monitor])
+        np.testing.assert_array_equal(monitor._collection.get_array(), np.arange(20))
+
+    def test_headless_frames_written_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "training.gif")
+            monitor = LiveMonitor(interval=100, seconds=0, max_overhead=1, output=path)
+            StandardSOM((10, 10), 3).train(self.data, iterations=300, callbacks=[monitor])
+            self.assertFalse(monitor.display)
+            with Image.open(path) as image:
+                self.assertEqual(image.n_frames, monitor.frames)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            LiveMonitor(interval=0)
+        with self.assertRaises(ValueError):
+            LiveMonitor(seconds=-1)
+        with self.assertRaises(ValueError):
+            LiveMonitor(max_overhead=0)
+        with self.assertRaises(ValueError):
+            LiveMonitor(values="test")
+        with self.assertRaises(ValueError):
+            LiveMonitor(fps=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
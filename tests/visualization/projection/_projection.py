@@ -0,0 +1,65 @@
+"""
+This module gathers tests for the projection of data points onto SOM variants that can be trained in this module.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+from som.maps import StandardSOM
+from som.visualization.projection import project, projection_map, projection_raster
+
+
+class TestProjection(unittest.TestCase):
+    def setUp(self):
+        data = pd.read_csv('../../data/test_data.csv')
+        self.labels = data['Class']
+        self.data = data.drop(['Class'], axis=1)
+        self.som = StandardSOM((10, 12), 3).train(self.data, iterations=2000)
+
+    def test_project_between_first_and_second_bmu(self):
+        som = StandardSOM((2, 2), 1)
+        indices = np.array([[0, 1], [0, 1], [3, 2], [1, 1]])
+        distances = np.array([[0., 1.], [1., 1.], [1., 3.], [0., 0.]])
+        np.testing.assert_allclose(project(som, indices, distances), [[0, 0], [0.5, 0], [0.75, 1], [1, 0]])
+
+    def test_raster_counts_every_data_point(self):
+        density, class_counts, classes, extent = projection_raster(self.som)
+        self.assertEqual(np.sum(density), len(self.data))
+        self.assertIsNone(class_counts)
+        self.assertIsNone(classes)
+        # rectangular grid with one pixel per unit
+        density, _, _, extent = projection_raster(self.som, resolution=1)
+        self.assertEqual(density.shape, (10, 12))
+        np.testing.assert_allclose(extent, (-0.5, 11.5, -0.5, 9.5))
+
+    def test_class_counts(self):
+        density, class_counts, classes, _ = projection_raster(self.som, labels=self.labels, chunk_size=100)
+        np.testing.assert_array_equal(classes, np.unique(self.labels))
+        np.testing.assert_array_equal(np.sum(class_counts, axis=0), density)
+        np.testing.assert_array_equal(np.sum(class_counts, axis=(1, 2)), self.labels.value_counts().sort_index())
+
+    def test_new_data_equals_training_data(self):
+        expected = projection_raster(self.som, labels=self.labels)
+        result = projection_raster(self.som, self.data.to_numpy(), self.labels, chunk_size=99)
+        np.testing.assert_array_equal(result[0], expected[0])
+        np.testing.assert_array_equal(result[1], expected[1])
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            projection_raster(self.som, resolution=0)
+        with self.assertRaises(ValueError):
+            projection_raster(self.som, chunk_size=0)
+        with self.assertRaises(ValueError):
+            projection_raster(self.som, labels=self.labels[:10])
+        with self.assertRaises(ValueError):
+            projection_raster(StandardSOM((10, 12), 3))
+
+    def test_plot(self):
+        projection_map(self.som)
+        projection_map(self.som, labels=self.labels)
+        som = StandardSOM((10, 12), 3, "hexagonal").train(self.data, iterations=2000)
+        projection_map(som, self.data, self.labels, resolution=2)
+
+
+if __name__ == '__main__':
+    unittest.main()